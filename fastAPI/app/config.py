@@ -34,6 +34,9 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     LOG_FILE: Optional[str] = os.getenv("LOG_FILE")  # If set, will log to this file
+    JSON_PRETTY: bool = os.getenv("JSON_PRETTY", "false").lower() == "true"  # Indent stored analyses and API responses for debugging
+    ANALYSIS_STORAGE_FORMAT: str = os.getenv("ANALYSIS_STORAGE_FORMAT", "json")  # "json", or "pack" for compressed report packs with a summary header
+    ANALYSIS_PACK_CODEC: str = os.getenv("ANALYSIS_PACK_CODEC", "zstd")  # Report pack compression; zlib when zstandard is not installed
     
     # File storage settings
     UPLOAD_DIR: str = "uploads"  # Where original uploaded files are stored
@@ -42,8 +45,42 @@ class Settings(BaseSettings):
     REPORTS_DIR: str = "reports"  # Where generated reports are stored
     REPORTS_JSON_DIR: str = "processed"  # For compatibility, same as PROCESSED_DIR
     REPORTS_PDF_DIR: str = "uploads"     # For compatibility, same as UPLOAD_DIR
-    REPORTS_TEXT_DIR: str = "reports"    # For compatibility, same as REPORTS_DIR 
-    
+    REPORTS_TEXT_DIR: str = "reports"    # For compatibility, same as REPORTS_DIR
+    RUNS_DIR: str = "runs"  # Where analysis run state is persisted
+    INDEX_DIR: str = "index"  # Where the report catalog is kept
+    VIEWS_DIR: str = "views"  # Precomputed insights/recommendations/abnormal views per report
+    TRENDS_DIR: str = "trends"  # Per-patient lab value series for dashboard trends
+    LAB_SERIES_CACHE_ENTRIES: int = int(os.getenv("LAB_SERIES_CACHE_ENTRIES", 1024))  # Patient series kept in memory
+    TEXT_INDEX_PATH: str = os.getenv("TEXT_INDEX_PATH", "index/text_search.db")  # SQLite full-text index of extracted text
+    TEXT_SEARCH_MAX_CANDIDATES: int = int(os.getenv("TEXT_SEARCH_MAX_CANDIDATES", 0))  # Matches ranked per search (0 for all); results flagged truncated past it
+    REPORT_CACHE_MAX_ENTRIES: int = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", 256))  # Parsed reports kept in memory
+    SCRATCH_DIR: str = "scratch"  # Per-request working directories for batch uploads
+    STORAGE_SHARD_DEPTH: int = int(os.getenv("STORAGE_SHARD_DEPTH", 2))  # Hashed subdirectory levels for uploads, text, processed and views; 0 for flat directories
+    BLOB_BACKEND: str = os.getenv("BLOB_BACKEND", "local")  # "local", "s3" for storage shared by several API nodes, or "memory" for tests
+    S3_BUCKET: Optional[str] = os.getenv("S3_BUCKET")  # Bucket used when BLOB_BACKEND=s3
+    S3_PREFIX: str = os.getenv("S3_PREFIX", "")  # Key prefix inside the bucket, e.g. "healthinsight/"
+    S3_ENDPOINT_URL: Optional[str] = os.getenv("S3_ENDPOINT_URL")  # For S3-compatible services such as MinIO
+    S3_REGION: Optional[str] = os.getenv("S3_REGION")  # Region of the bucket, if the service needs one
+    BLOB_PART_SIZE: int = int(os.getenv("BLOB_PART_SIZE", 8 * 1024 * 1024))  # Multipart upload part size for large files
+    PERSIST_FSYNC: str = os.getenv("PERSIST_FSYNC", "data")  # "always" (files and directory renames), "data" (file contents) or "none" (leave flushing to the OS)
+    WRITE_BEHIND_BATCH_SIZE: int = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", 64))  # Max views/catalog updates written per batch
+    WRITE_BEHIND_INTERVAL: float = float(os.getenv("WRITE_BEHIND_INTERVAL", 0.05))  # Seconds to wait for more updates before writing a batch
+    WRITE_BEHIND_QUEUE_SIZE: int = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", 1000))  # Queued updates before savers wait
+
+    # Background job settings
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", 2))  # Concurrent analysis jobs
+    JOB_EXECUTOR_WORKERS: int = int(os.getenv("JOB_EXECUTOR_WORKERS", 4))  # Threads for blocking stages
+    JOB_QUEUE_SIZE: int = int(os.getenv("JOB_QUEUE_SIZE", 100))  # Max queued jobs before rejecting
+    EXTRACTION_WORKERS: int = int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 2))  # Processes for OCR/PDF extraction
+    OCR_PDF_DPI: int = int(os.getenv("OCR_PDF_DPI", 300))  # Resolution PDF pages are rasterized at for OCR
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 50))  # PDFs this long are extracted across processes
+    PDF_LAYOUT_EXTRACTION: bool = os.getenv("PDF_LAYOUT_EXTRACTION", "true").lower() == "true"  # Rebuild result tables from word positions
+
+    # OCR cache settings
+    OCR_CACHE_ENABLED: bool = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+    OCR_CACHE_DIR: str = os.getenv("OCR_CACHE_DIR", "cache/ocr")  # Page text keyed by page image hash
+    OCR_CACHE_MAX_MB: int = int(os.getenv("OCR_CACHE_MAX_MB", 256))  # Least recently used pages are evicted beyond this
+
     # Upload settings
     MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", 10485760))  # 10MB
     
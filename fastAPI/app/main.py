@@ -4,6 +4,7 @@ Health Insight Today API
 
 import logging
 import os
+import shutil
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -11,6 +12,13 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
 from app.routes import api_router
+from app.utils.json_io import FastJSONResponse
+from app.services.job_queue import job_queue
+from app.services.analysis_pipeline import analysis_records
+from app.services.text_index import text_index_updates
+from app.services.extraction_pool import shutdown_extraction_pool
+from app.services.run_store import run_store
+from app.services.file_store import upload_store
 
 # Configure logging
 log_config = {
@@ -30,7 +38,8 @@ app = FastAPI(
     title=settings.APP_NAME,
     description=settings.APP_DESCRIPTION,
     version=settings.APP_VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    default_response_class=FastJSONResponse
 )
 
 # Add CORS middleware
@@ -75,11 +84,21 @@ async def startup_event():
         Path(settings.TEXT_DIR).mkdir(parents=True, exist_ok=True)
         Path(settings.REPORTS_DIR).mkdir(parents=True, exist_ok=True)
         Path(settings.PROCESSED_DIR).mkdir(parents=True, exist_ok=True)
+        Path(settings.RUNS_DIR).mkdir(parents=True, exist_ok=True)
+        Path(settings.SCRATCH_DIR).mkdir(parents=True, exist_ok=True)
         logger.info("✅ Required directories created.")
     except Exception as e:
         logger.error(f"❌ Error creating directories: {e}")
         raise
     
+    # Start the writers for views, catalog rows and the text index before any run can complete
+    await analysis_records.start()
+    await text_index_updates.start()
+    
+    # Start background analysis workers (resumes unfinished runs)
+    await job_queue.start()
+    logger.info(f"✅ Job queue started with {job_queue.workers} workers.")
+    
     logger.info(f"Server starting at http://{settings.HOST}:{settings.PORT}")
     logger.info(f"Documentation available at http://{settings.HOST}:{settings.PORT}/docs")
     logger.info("="*80)
@@ -90,10 +109,24 @@ async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down server...")
     
-    # Clean up temporary files
+    # Stop background workers; unfinished runs resume on next start
+    await job_queue.stop()
+    # Write the views, catalog rows and text index updates still queued
+    await analysis_records.stop()
+    await text_index_updates.stop()
+    shutdown_extraction_pool()
+    
+    # Clean up temporary files, keeping uploads of runs that still need processing
     try:
-        temp_files = Path(settings.UPLOAD_DIR).glob("*")
+        pending_uploads = {
+            Path(run["job"]["file_path"]).resolve()
+            for run in run_store.list_incomplete()
+            if run.get("job", {}).get("file_path")
+        }
+        temp_files = upload_store.iter_files()
         for file in temp_files:
+            if file.resolve() in pending_uploads:
+                continue
             try:
                 file.unlink()
                 logger.debug(f"Cleaned up {file}")
@@ -101,5 +134,8 @@ async def shutdown_event():
                 logger.error(f"Error cleaning up {file}: {e}")
     except Exception as e:
         logger.error(f"Error during cleanup: {e}")
+
+    # Remove scratch directories left by interrupted batch requests
+    shutil.rmtree(settings.SCRATCH_DIR, ignore_errors=True)
     
     logger.info("Server shutdown complete.") 
\ No newline at end of file
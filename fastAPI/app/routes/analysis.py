@@ -13,6 +13,7 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from app.config import settings
+from app.services.file_store import upload_store
 from app.services.pdf_processor import process_pdf
 from app.services.image_processor import process_image
 from app.services.mcp_service import MCPService, MCPRequest
@@ -42,10 +43,7 @@ async def process_file_upload(file: UploadFile, force_ocr: bool = False) -> str:
     # Generate unique filename
     file_id = str(uuid.uuid4())
     filename = f"{file_id}_{file.filename}"
-    file_path = os.path.join(settings.UPLOAD_DIR, filename)
-    
-    # Ensure upload directory exists
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    file_path = str(upload_store.prepare(filename))
     
     try:
         # Save uploaded file
@@ -2,13 +2,15 @@
 Dashboard routes for health summaries and insights
 """
 
+import asyncio
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime, timedelta
 from pydantic import BaseModel, Field
 
 from fastapi import APIRouter, HTTPException, Query
 
+from app.services.lab_series import lab_series
 from app.services.mcp_service import MCPService, MCPRequest, MCPContext
 from app.services.templates import template_registry
 
@@ -21,6 +23,9 @@ router = APIRouter()
 # Initialize services
 mcp_service = MCPService()
 
+# Days of lab results each summary timeframe covers; None for all
+TIMEFRAME_DAYS = {"recent": None, "weekly": 7, "monthly": 30, "yearly": 365}
+
 class HealthMetric(BaseModel):
     """Model for health metric"""
     name: str = Field(..., description="Name of the metric")
@@ -53,7 +58,7 @@ class HealthSummary(BaseModel):
 @router.get("/summary", response_model=HealthSummary)
 async def get_health_summary(
     user_id: str,
-    timeframe: str = Query("recent", enum=["recent", "weekly", "monthly", "yearly"]),
+    timeframe: Literal["recent", "weekly", "monthly", "yearly"] = Query("recent"),
     provider: str = "claude",
     model: Optional[str] = None
 ):
@@ -67,9 +72,12 @@ async def get_health_summary(
         model: Specific model to use
     """
     try:
-        # Get user's health data
-        # TODO: Implement data retrieval
-        health_data = {}  # Placeholder
+        # Get the user's latest lab values from their trend series
+        days = TIMEFRAME_DAYS[timeframe]
+        start = datetime.now() - timedelta(days=days) if days else None
+        series = await asyncio.get_running_loop().run_in_executor(None, lab_series.find, user_id)
+        latest = series.latest(start) if series is not None else []
+        health_data = {"metrics": latest} if latest else {}
         
         if not health_data:
             raise HTTPException(
@@ -149,56 +157,48 @@ async def get_health_trends(
     user_id: str,
     metrics: Optional[List[str]] = Query(None),
     start_date: datetime = Query(default_factory=lambda: datetime.now() - timedelta(days=90)),
-    end_date: datetime = Query(default_factory=datetime.now)
+    end_date: datetime = Query(default_factory=datetime.now),
+    window: int = Query(3, ge=1, le=20, description="Measurements in each rolling mean")
 ):
     """
     Get trends for specified health metrics
     
+    Each metric's measurements come with a rolling mean and the percent
+    change from the measurement before; the trend has the percent change
+    over the period, the least-squares slope per day and its r².
+    
     Args:
-        user_id: User ID
-        metrics: List of metrics to analyze
+        user_id: User ID (or the patient ID or name on the reports)
+        metrics: List of metrics to analyze; names are matched after
+            canonicalization, e.g. "Hb" and "Hemoglobin" are the same metric
         start_date: Start date for trend analysis
         end_date: End date for trend analysis
+        window: Number of measurements in each rolling mean
     """
     try:
-        # TODO: Implement trend analysis
-        # For now, return sample data
+        # One small columnar read per user; no reports are opened
+        series = await asyncio.get_running_loop().run_in_executor(None, lab_series.find, user_id)
+        if series is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No lab results found for user {user_id}"
+            )
+        
         return {
-            "trends": [
-                {
-                    "metric": "Blood Glucose",
-                    "unit": "mg/dL",
-                    "data_points": [
-                        {"timestamp": "2024-01-01T08:00:00", "value": 95},
-                        {"timestamp": "2024-02-01T08:00:00", "value": 92},
-                        {"timestamp": "2024-03-01T08:00:00", "value": 88}
-                    ],
-                    "trend": "decreasing",
-                    "change_rate": -7.37,
-                    "statistical_significance": True
-                },
-                {
-                    "metric": "Total Cholesterol",
-                    "unit": "mg/dL",
-                    "data_points": [
-                        {"timestamp": "2024-01-01T08:00:00", "value": 210},
-                        {"timestamp": "2024-02-01T08:00:00", "value": 195},
-                        {"timestamp": "2024-03-01T08:00:00", "value": 185}
-                    ],
-                    "trend": "decreasing",
-                    "change_rate": -11.90,
-                    "statistical_significance": True
-                }
-            ],
+            "trends": series.trends(metrics, start_date, end_date, window),
             "metadata": {
                 "user_id": user_id,
                 "start_date": start_date.isoformat(),
                 "end_date": end_date.isoformat(),
                 "metrics_analyzed": metrics or "all",
+                "rolling_window": window,
                 "analysis_timestamp": datetime.now().isoformat()
             }
         }
         
+    except HTTPException:
+        raise
+        
     except Exception as e:
         logger.error(f"Error analyzing health trends: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -4,26 +4,31 @@ Document processing routes for handling file uploads and text extraction
 
 import os
 import uuid
+import asyncio
 import logging
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from pathlib import Path
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
 from pydantic import BaseModel, Field
 
-from app.config import settings
+from app.services.blob_store import get_blob_store
+from app.services.file_store import upload_store
+from app.services.text_index import text_index, text_index_updates
+from app.services.document_processor.file_info import IMAGE_EXTENSIONS
 from app.services.document_processor import (
     extract_text_from_file,
-    is_pdf_file,
-    is_image_file,
-    save_uploaded_file,
+    save_and_classify_upload,
     cleanup_temp_file
 )
+from app.utils.json_io import dumps, loads
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Record of where a document's upload is stored, kept beside its text
+UPLOAD_RECORD_SUFFIX = ".upload.json"
+
 # Create router
 router = APIRouter()
 
@@ -45,6 +50,24 @@ class DocumentList(BaseModel):
     page: int
     page_size: int
 
+class SearchHit(BaseModel):
+    """Model for a document matching a text search"""
+    document_id: str = Field(..., description="Unique identifier for the document")
+    filename: Optional[str] = Field(None, description="Original filename, if known")
+    run_id: Optional[str] = Field(None, description="Analysis run of the document, if any")
+    indexed_at: str = Field(..., description="When the text was indexed")
+    score: float = Field(..., description="Relevance (BM25); higher is better")
+    snippet: str = Field(..., description="HTML-escaped excerpt with matches in <mark> tags")
+
+class SearchResults(BaseModel):
+    """Model for text search response"""
+    query: str
+    results: List[SearchHit]
+    page: int
+    page_size: int
+    has_more: bool
+    truncated: bool = Field(False, description="Whether matches past TEXT_SEARCH_MAX_CANDIDATES were left unranked")
+
 @router.post("/upload", response_model=ProcessedDocument)
 async def upload_document(file: UploadFile = File(...)):
     """
@@ -62,25 +85,21 @@ async def upload_document(file: UploadFile = File(...)):
         original_filename = file.filename or "document"
         file_extension = os.path.splitext(original_filename)[1].lower()
         
-        # Create directories if they don't exist
-        upload_dir = Path(settings.UPLOAD_DIR)
-        text_dir = Path(settings.TEXT_DIR)
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        text_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Define file paths
-        file_path = upload_dir / f"{document_id}{file_extension}"
-        text_path = text_dir / f"{document_id}.txt"
+        # Local working copy of the upload, and the stored text's key
+        file_path = upload_store.prepare(f"{document_id}{file_extension}")
+        text_key = f"{document_id}.txt"
+        uploads = get_blob_store("uploads")
+        texts = get_blob_store("text")
+        loop = asyncio.get_running_loop()
         
-        # Save the uploaded file
+        # Save the uploaded file, sharing it through the upload store
         logger.info(f"Saving uploaded file {original_filename} to {file_path}")
-        saved_file_path = await save_uploaded_file(file, file_path)
+        saved_file_path, file_info = await save_and_classify_upload(file, file_path)
         
         # Check if the file is valid (PDF or image)
-        is_pdf = is_pdf_file(original_filename, str(saved_file_path))
-        is_image = is_image_file(original_filename, str(saved_file_path))
+        is_pdf = file_info.is_pdf
         
-        if not (is_pdf or is_image):
+        if not file_info.is_supported:
             # If invalid file type, delete it and raise an exception
             if saved_file_path.exists():
                 saved_file_path.unlink()
@@ -89,29 +108,24 @@ async def upload_document(file: UploadFile = File(...)):
                 detail="Unsupported file type. Only PDF and image files are accepted."
             )
         
+        # Only supported files reach the shared upload store; the record
+        # keeps its key, whose extension comes from the client's file name
+        await loop.run_in_executor(None, uploads.put_file, saved_file_path.name, saved_file_path)
+        upload_record = dumps({"key": saved_file_path.name, "filename": original_filename})
+        await loop.run_in_executor(None, texts.put, f"{document_id}{UPLOAD_RECORD_SUFFIX}", upload_record)
+        
         # Extract text from the file
         start_time = datetime.now()
-        text, metadata = await extract_text_from_file(saved_file_path)
+        text, metadata = await extract_text_from_file(saved_file_path, file_info=file_info)
         processing_time = (datetime.now() - start_time).total_seconds()
         
-        # Save extracted text to text directory
-        with open(text_path, "w", encoding="utf-8") as text_file:
-            text_file.write(text)
-        
-        # Get file size
-        file_size = saved_file_path.stat().st_size
+        # Save extracted text to the text store
+        await loop.run_in_executor(None, texts.put, text_key, text.encode("utf-8"))
+        await text_index_updates.submit({"document_id": document_id, "text": text, "filename": original_filename})
         
-        # Determine MIME type
-        if is_pdf:
-            mime_type = "application/pdf"
-        elif file_extension in ['.jpg', '.jpeg']:
-            mime_type = "image/jpeg"
-        elif file_extension == '.png':
-            mime_type = "image/png"
-        elif file_extension in ['.tiff', '.tif']:
-            mime_type = "image/tiff"
-        else:
-            mime_type = file.content_type or "application/octet-stream"
+        # Size and MIME type were recorded while the upload was saved
+        file_size = file_info.size
+        mime_type = file_info.mime_type
         
         # Return document metadata
         logger.info(f"Successfully processed document {document_id}")
@@ -120,8 +134,8 @@ async def upload_document(file: UploadFile = File(...)):
             filename=original_filename,
             mimetype=mime_type,
             size_bytes=file_size,
-            file_path=str(file_path.relative_to(Path(settings.UPLOAD_DIR).parent)),
-            text_path=str(text_path.relative_to(Path(settings.TEXT_DIR).parent)),
+            file_path=uploads.location(saved_file_path.name),
+            text_path=texts.location(text_key),
             has_text=bool(text.strip()),
             metadata={
                 "file_type": "PDF" if is_pdf else "Image",
@@ -176,6 +190,45 @@ async def list_documents(
             detail=f"Error listing documents: {str(e)}"
         )
 
+@router.get("/search", response_model=SearchResults)
+async def search_documents(
+    q: str = Query(..., min_length=1, max_length=500, description="Words to find; \"...\" for a phrase, word* for a prefix"),
+    page: int = Query(1, ge=1, le=100),
+    page_size: int = Query(20, ge=1, le=100)
+):
+    """
+    Search the extracted text of uploaded documents and analyzed reports
+    
+    Args:
+        q: Search query; every term must match
+        page: Page number (1-based)
+        page_size: Number of results per page
+    """
+    try:
+        found = await asyncio.get_running_loop().run_in_executor(
+            None, text_index.search, q, page_size, (page - 1) * page_size
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        logger.error(f"Text search unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching documents: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error searching documents: {str(e)}"
+        )
+    
+    return SearchResults(
+        query=q,
+        results=found["results"],
+        page=page,
+        page_size=page_size,
+        has_more=found["has_more"],
+        truncated=found["truncated"]
+    )
+
 @router.get("/{document_id}/text")
 async def get_document_text(document_id: str):
     """
@@ -185,15 +238,15 @@ async def get_document_text(document_id: str):
         document_id: Unique identifier of the document
     """
     try:
-        text_file = Path(settings.TEXT_DIR) / f"{document_id}.txt"
-        
-        if not text_file.exists():
+        try:
+            text = get_blob_store("text").get(f"{document_id}.txt")
+        except FileNotFoundError:
             raise HTTPException(
                 status_code=404,
                 detail=f"Text not found for document {document_id}"
             )
             
-        return {"text": text_file.read_text(encoding='utf-8')}
+        return {"text": text.decode("utf-8")}
         
     except HTTPException:
         raise
@@ -205,6 +258,37 @@ async def get_document_text(document_id: str):
             detail=f"Error retrieving document text: {str(e)}"
         )
 
+def delete_upload(document_id: str) -> bool:
+    """
+    Delete the stored upload of a document.
+    
+    Uploads are stored as "{document_id}{ext}" and the key is recorded
+    beside the document's text. Uploads saved before keys were recorded
+    are found by trying the PDF and image extensions.
+    
+    Returns:
+        Whether an upload was deleted
+    """
+    uploads = get_blob_store("uploads")
+    texts = get_blob_store("text")
+    record_key = f"{document_id}{UPLOAD_RECORD_SUFFIX}"
+    try:
+        key = loads(texts.get(record_key))["key"]
+    except FileNotFoundError:
+        key = None
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable upload record of document {document_id}: {str(e)}")
+        key = None
+    
+    if key is not None:
+        deleted = uploads.delete(key)
+        texts.delete(record_key)
+        return deleted
+    for ext in (".pdf", *sorted(IMAGE_EXTENSIONS)):
+        if uploads.delete(f"{document_id}{ext}"):
+            return True
+    return False
+
 @router.delete("/{document_id}")
 async def delete_document(document_id: str):
     """
@@ -214,17 +298,14 @@ async def delete_document(document_id: str):
         document_id: Unique identifier of the document
     """
     try:
-        upload_dir = Path(settings.UPLOAD_DIR)
+        loop = asyncio.get_running_loop()
         
         # Delete original file if it exists
-        file_path = upload_dir / document_id
-        if file_path.exists():
-            file_path.unlink()
+        await loop.run_in_executor(None, delete_upload, document_id)
             
         # Delete text file if it exists
-        text_file = upload_dir / f"{document_id}.txt"
-        if text_file.exists():
-            text_file.unlink()
+        await loop.run_in_executor(None, get_blob_store("text").delete, f"{document_id}.txt")
+        await loop.run_in_executor(None, text_index.remove, document_id)
             
         # TODO: Delete from database
             
@@ -2,19 +2,18 @@
 API routes for health analysis functionality.
 """
 
-import json
 import os
 import time
 import uuid
 import logging
 import asyncio
 from datetime import datetime
+from functools import partial
 from typing import Optional, Dict, Any, List, Literal
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Query, Request, Response
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
-from pathlib import Path
 
 from app.config import settings
 from app.services.pdf_processor import process_pdf
@@ -22,12 +21,30 @@ from app.services.image_processor import process_image
 from app.services.mcp_service import MCPService
 from app.services.llm_advanced_processor import LLMProcessor
 from app.services.basic_analyzer import get_health_insights
+from app.services.report_views import report_views, build_views, views_etag
+from app.services.report_cache import report_cache, report_files
+from app.services.report_catalog import LISTING_FIELDS, listing_fields, report_catalog
+from app.services.report_fields import parse_fields, project
+from app.services.report_pack import decode_document, read_summary
+from app.services.blob_store import get_blob_store
+from app.services.file_store import upload_store
+from app.services import diet_service, grocery_service, specialist_service
+from app.models.schemas import MealPlanResponse, GroceryResponse, SpecialistsResponse
 from app.services.document_processor import (
     extract_text_from_file,
     is_pdf_file,
     is_image_file,
-    save_uploaded_file
+    save_and_classify_upload
 )
+from app.services.analysis_pipeline import analyze_saved_file, get_mcp_system_message
+from app.services.run_store import run_store, create_run, update_run
+from app.services.job_queue import job_queue
+from app.utils.metrics import StageTimer
+from app.utils.http_cache import (
+    make_etag, is_not_modified, not_modified_response, set_cache_headers,
+    cache_headers, REVALIDATE_CACHE_CONTROL
+)
+from app.utils.json_io import FastJSONResponse, dumps
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -84,69 +101,6 @@ def get_llm_processor():
     """Get an initialized LLM processor"""
     return LLMProcessor()
 
-def get_mcp_system_message():
-    """Get the system message for blood test analysis"""
-    return """You are an AI medical assistant specialized in analyzing blood test reports.
-
-Your ONLY job is to return JSON with exactly these fields and nesting:
-{
-  "report_info": {
-    "report_id": string,
-    "report_type": string,
-    "report_date": string (YYYY-MM-DD),
-    "lab_name": string
-  },
-  "patient_info": {
-    "name": string,
-    "age": number,
-    "gender": string,
-    "id": string if available
-  },
-  "test_sections": [
-    {
-      "section_name": string,
-      "parameters": [
-        {
-          "name": string,
-          "value": number | string,
-          "unit": string,
-          "reference_range": string,
-          "is_abnormal": boolean,
-          "direction": "high" | "low" | null
-        }
-      ]
-    }
-  ],
-  "abnormal_parameters": [
-    {
-      "name": string,
-      "value": number | string,
-      "unit": string,
-      "reference_range": string,
-      "direction": "high" | "low"
-    }
-  ],
-  "health_insights": [
-    {
-      "condition": string,
-      "confidence": number,
-      "parameters": [string],
-      "description": string,
-      "recommendations": [
-        {
-          "type": "dietary" | "lifestyle" | "medical" | "testing",
-          "text": string
-        }
-      ]
-    }
-  ]
-}
-
-DO NOT add, remove, or rename any fields. Follow the schema EXACTLY as shown above.
-Use the same field names and nesting structure for all responses.
-Return ONLY the JSON object without any additional text before or after it.
-"""
-
 def is_image_file(filename: str) -> bool:
     """Check if the file is an image based on extension"""
     image_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.webp'}
@@ -168,17 +122,12 @@ def extract_text_from_file(file_path: str) -> str:
 
 def save_json_analysis(analysis: Dict[str, Any], filename_base: str) -> str:
     """Save JSON analysis to a file"""
-    # Create directory if it doesn't exist
-    os.makedirs(settings.PROCESSED_DIR, exist_ok=True)
-    
     # Generate filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{filename_base}_{timestamp}.json"
-    file_path = os.path.join(settings.PROCESSED_DIR, filename)
     
-    # Save to file with pretty formatting
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(analysis, f, indent=2, default=str)
+    # Save to the processed store with pretty formatting
+    get_blob_store("processed").put(filename, dumps(analysis, pretty=True))
         
     return filename
 
@@ -344,6 +293,33 @@ class AbnormalParametersResponse(BaseModel):
     report_id: str
     count: int
 
+class ReportBundle(BaseModel):
+    """Sections of a report assembled in one response; sections not requested are null"""
+    report_id: str
+    report: Optional[Dict[str, Any]] = None
+    insights: Optional[List[InsightItem]] = None
+    recommendations: Optional[RecommendationsResponse] = None
+    abnormal_parameters: Optional[AbnormalParametersResponse] = None
+    meal_plan: Optional[MealPlanResponse] = None
+    shopping: Optional[GroceryResponse] = None
+    specialists: Optional[SpecialistsResponse] = None
+    errors: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="Status code and detail of sections that failed")
+
+class RunStatus(BaseModel):
+    """Status of a background analysis run"""
+    run_id: str
+    status: str
+    stage: str
+    progress: float = Field(..., ge=0.0, le=1.0, description="Fraction of pipeline stages completed")
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    filename: Optional[str] = None
+    created_at: str
+    updated_at: str
+    timings: Dict[str, float] = Field(default_factory=dict, description="Seconds spent in each completed stage")
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+    error: Optional[str] = None
+
 @router.get("/providers")
 async def get_providers():
     """
@@ -384,13 +360,15 @@ async def analyze_report_with_mcp(
     3. Extract text from PDF/image
     4. Process text with appropriate LLM
     5. Return analysis results
+    
+    For large reports prefer `POST /runs`, which returns immediately and
+    processes the report in the background.
     """
-    processor = get_llm_processor()
     run_id = str(uuid.uuid4())
     start_time = time.time()
     
     # Create run status tracking
-    run_status = create_run(
+    create_run(
         run_id=run_id,
         provider=provider,
         model=model,
@@ -401,150 +379,22 @@ async def analyze_report_with_mcp(
     try:
         logger.info(f"Processing blood test report with {provider}/{model}, run_id: {run_id}")
         
-        # Generate unique document ID and prepare paths
-        document_id = str(uuid.uuid4())
-        original_filename = file.filename or "document"
-        file_extension = os.path.splitext(original_filename)[1].lower()
-        
-        # Create directories if they don't exist
-        upload_dir = Path(settings.UPLOAD_DIR)
-        text_dir = Path(settings.TEXT_DIR)
-        json_dir = Path(settings.REPORTS_JSON_DIR)
-        
-        for directory in [upload_dir, text_dir, json_dir]:
-            directory.mkdir(parents=True, exist_ok=True)
+        timer = StageTimer()
+        document_id, saved_file_path, file_info = await save_report_upload(run_id, file, timer)
         
-        # Define file paths
-        file_path = upload_dir / f"{document_id}{file_extension}"
-        text_path = text_dir / f"{document_id}.txt"
-        json_path = json_dir / f"{run_id}.json"
-        
-        # Save the uploaded file
-        logger.info(f"[{run_id}] Saving uploaded file {original_filename} to {file_path}")
-        update_run(run_id, status="saving_file")
-        saved_file_path = await save_uploaded_file(file, file_path)
-        
-        # Check if the file is valid (PDF or image)
-        is_pdf = is_pdf_file(original_filename, str(saved_file_path))
-        is_image = is_image_file(original_filename, str(saved_file_path))
-        
-        if not (is_pdf or is_image):
-            # If invalid file type, delete it and raise an exception
-            if saved_file_path.exists():
-                saved_file_path.unlink()
-            
-            update_run(run_id, status="failed", error="Unsupported file type")
-            raise HTTPException(
-                status_code=400, 
-                detail="Unsupported file type. Only PDF and image files are accepted."
-            )
-        
-        # Extract text from the file
-        logger.info(f"[{run_id}] Extracting text from {file_path}")
-        update_run(run_id, status="extracting_text")
-        text, metadata = await extract_text_from_file(saved_file_path)
-        
-        if not text or len(text.strip()) < 50:
-            update_run(run_id, status="failed", error="Text extraction failed or produced insufficient text")
-            raise HTTPException(
-                status_code=422,
-                detail="Failed to extract sufficient text from the document. Please try a clearer image or a properly formatted PDF."
-            )
-        
-        # Save extracted text to text directory
-        with open(text_path, "w", encoding="utf-8") as text_file:
-            text_file.write(text)
-        
-        # Update run with metadata
-        update_run(
-            run_id, 
-            status="processing_text",
-            metadata={
-                "document_id": document_id,
-                "file_type": "PDF" if is_pdf else "Image",
-                "word_count": metadata.get("word_count", 0),
-                "char_count": metadata.get("char_count", 0),
-                "page_count": metadata.get("page_count", 1),
-                "ocr_used": metadata.get("ocr_used", False),
-                "text_extraction_time": metadata.get("extraction_duration", 0)
-            }
+        return await analyze_saved_file(
+            run_id=run_id,
+            document_id=document_id,
+            file_path=saved_file_path,
+            original_filename=file.filename or "document",
+            provider=provider,
+            model=model,
+            context=context,
+            include_text=include_text,
+            start_time=start_time,
+            timer=timer,
+            file_info=file_info
         )
-        
-        # Process with LLM
-        logger.info(f"[{run_id}] Processing text with {provider}/{model}")
-        
-        system_message = get_mcp_system_message()
-        user_message = f"Blood Test Report Content:\n\n{text}"
-        
-        if context:
-            user_message += f"\n\nAdditional Context:\n{context}"
-        
-        messages = [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": user_message}
-        ]
-        
-        # Process with retries
-        max_retries = 2
-        retry_count = 0
-        
-        while retry_count <= max_retries:
-            try:
-                response = await processor.process_messages(
-                    messages=messages,
-                    provider=provider,
-                    model=model
-                )
-                break
-            except Exception as e:
-                retry_count += 1
-                logger.warning(f"[{run_id}] LLM processing attempt {retry_count} failed: {str(e)}")
-                
-                if retry_count > max_retries:
-                    update_run(run_id, status="failed", error=f"LLM processing failed after {max_retries} retries")
-                    raise HTTPException(
-                        status_code=500,
-                        detail=f"Failed to process report after {max_retries} attempts: {str(e)}"
-                    )
-                
-                # Wait before retrying
-                await asyncio.sleep(2)
-        
-        # Validate response
-        analysis_content = response.get("content", "")
-        
-        # Try to parse as JSON
-        try:
-            analysis_json = json.loads(analysis_content)
-            
-            # Save JSON to file
-            with open(json_path, "w", encoding="utf-8") as json_file:
-                json.dump(analysis_json, json_file, indent=2)
-                
-            update_run(run_id, status="completed")
-            
-            # Prepare result
-            result = {
-                "run_id": run_id,
-                "provider": provider,
-                "model": model,
-                "analysis": analysis_json,
-                "processing_time": time.time() - start_time
-            }
-            
-            if include_text:
-                result["text"] = text
-                
-            return result
-            
-        except json.JSONDecodeError:
-            logger.error(f"[{run_id}] Invalid JSON response from LLM: {analysis_content[:500]}...")
-            update_run(run_id, status="failed", error="Invalid JSON response from LLM")
-            
-            raise HTTPException(
-                status_code=500,
-                detail="The analysis result was not a valid JSON object. Please try again."
-            )
             
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -557,45 +407,104 @@ async def analyze_report_with_mcp(
             status_code=500,
             detail=f"Error processing report: {str(e)}"
         )
-        
-# Helper functions for tracking runs
 
-def create_run(run_id: str, provider: str, model: str, filename: str, status: str) -> Dict[str, Any]:
-    """Create and store a new run status"""
-    run_data = {
-        "run_id": run_id,
-        "provider": provider,
-        "model": model,
-        "filename": filename,
-        "status": status,
-        "start_time": time.time(),
-        "updated_time": time.time(),
-        "metadata": {}
-    }
+async def save_report_upload(run_id: str, file: UploadFile, timer: StageTimer) -> tuple:
+    """Save an uploaded report under a new document ID, classifying it while it streams in"""
+    document_id = str(uuid.uuid4())
+    original_filename = file.filename or "document"
+    file_extension = os.path.splitext(original_filename)[1].lower()
+    
+    file_path = upload_store.prepare(f"{document_id}{file_extension}")
+    
+    logger.info(f"[{run_id}] Saving uploaded file {original_filename} to {file_path}")
+    update_run(run_id, status="saving_file")
+    with timer.stage("upload"):
+        saved_file_path, file_info = await save_and_classify_upload(file, file_path)
+        # Extraction reads the local copy; the upload store shares it with other nodes
+        await asyncio.get_running_loop().run_in_executor(
+            None, get_blob_store("uploads").put_file, saved_file_path.name, saved_file_path
+        )
     
-    # In a production app, you would store this in a database
-    # For now, we'll log it and return the data
-    logger.info(f"Created run: {run_id} ({status})")
-    return run_data
+    return document_id, saved_file_path, file_info
 
-def update_run(run_id: str, status: str = None, error: str = None, metadata: Dict[str, Any] = None) -> None:
-    """Update an existing run status"""
-    update_data = {
-        "updated_time": time.time()
-    }
+@router.post("/runs", response_model=RunStatus, status_code=202)
+async def submit_analysis_run(
+    file: UploadFile = File(...),
+    context: Optional[str] = Form(None),
+    provider: str = Form("ollama"),
+    model: str = Form("mistral")
+):
+    """
+    Queue a blood test report for analysis and return immediately.
     
-    if status:
-        update_data["status"] = status
-        
-    if error:
-        update_data["error"] = error
-        
-    if metadata:
-        update_data["metadata"] = metadata
+    The upload is saved, a run is created and the OCR and LLM stages are
+    processed by the background job queue. Poll `GET /runs/{run_id}` for
+    stage, progress and timings; the analysis is available from
+    `GET /reports/{run_id}` once the run is completed.
+    """
+    run_id = str(uuid.uuid4())
+    
+    create_run(
+        run_id=run_id,
+        provider=provider,
+        model=model,
+        filename=file.filename or "unknown",
+        status="started"
+    )
+    
+    timer = StageTimer()
+    try:
+        document_id, saved_file_path, file_info = await save_report_upload(run_id, file, timer)
+    except Exception as e:
+        logger.error(f"[{run_id}] Error saving upload: {str(e)}", exc_info=True)
+        update_run(run_id, status="failed", error=str(e))
+        raise HTTPException(status_code=500, detail=f"Error saving upload: {str(e)}")
     
-    # In a production app, you would update this in a database
-    # For now, we'll just log it
-    logger.info(f"Updated run: {run_id} ({status or 'metadata update'})")
+    run_store.set_job(run_id, {
+        "document_id": document_id,
+        "file_path": str(saved_file_path),
+        "file_info": file_info.to_dict(),
+        "context": context,
+        "stage_durations": timer.durations
+    })
+    update_run(run_id, status="queued")
+    job_queue.submit(run_id)
+    
+    return run_status_response(run_store.get(run_id))
+
+@router.get("/runs/{run_id}", response_model=RunStatus)
+async def get_run_status(run_id: str):
+    """
+    Get the status of an analysis run
+    
+    - **run_id**: The unique identifier of the run
+    
+    Returns:
+        Current stage, progress (0-1), per-stage timings in seconds and
+        any error for the run
+    """
+    run_data = run_store.get(run_id)
+    if run_data is None:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    
+    return run_status_response(run_data)
+
+def run_status_response(run_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a stored run for the API"""
+    return {
+        "run_id": run_data["run_id"],
+        "status": run_data["status"],
+        "stage": run_data.get("stage", run_data["status"]),
+        "progress": run_data.get("progress", 0.0),
+        "provider": run_data.get("provider"),
+        "model": run_data.get("model"),
+        "filename": run_data.get("filename"),
+        "created_at": datetime.fromtimestamp(run_data["start_time"]).isoformat(),
+        "updated_at": datetime.fromtimestamp(run_data["updated_time"]).isoformat(),
+        "timings": run_data.get("timings", {}),
+        "metadata": run_data.get("metadata", {}),
+        "error": run_data.get("error")
+    }
 
 @router.post("/save")
 async def save_analysis(
@@ -636,13 +545,11 @@ async def save_analysis(
             if not filename_base:
                 filename_base = f"health_analysis_{str(uuid.uuid4())[:8]}"
         
-        # Create reports directory if it doesn't exist
-        os.makedirs(settings.REPORTS_DIR, exist_ok=True)
-        
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{filename_base}_{timestamp}.json"
-        file_path = os.path.join(settings.REPORTS_DIR, filename)
+        reports_store = get_blob_store("reports")
+        file_path = reports_store.location(filename)
         
         # Add metadata if not present
         if "metadata" not in analysis:
@@ -655,9 +562,10 @@ async def save_analysis(
             "file_path": file_path
         })
         
-        # Save to file with pretty formatting
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(analysis, f, indent=2)
+        # Save to the reports store with pretty formatting, off the event loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, reports_store.put, filename, dumps(analysis, pretty=True)
+        )
         
         return {
             "message": "Analysis saved successfully",
@@ -683,161 +591,62 @@ async def get_reports():
     try:
         reports = []
         
-        # Check both directories for reports
-        for directory in [settings.REPORTS_DIR, settings.PROCESSED_DIR, settings.UPLOAD_DIR]:
-            # Create directory if it doesn't exist
-            os.makedirs(directory, exist_ok=True)
-            
-            # List JSON files in the directory
-            if os.path.exists(directory):
-                for filename in os.listdir(directory):
-                    if filename.endswith(".json") and "_analysis" in filename:
-                        file_path = os.path.join(directory, filename)
-                        
-                        try:
-                            # Read the file to get basic info
-                            with open(file_path, "r", encoding="utf-8") as f:
-                                data = json.load(f)
-                            
-                            # Extract basic info - handle different formats
-                            if "patient_info" in data:
-                                patient_info = data.get("patient_info", {})
-                                name = patient_info.get("name", "Unknown")
-                            elif "patient" in data:
-                                patient_info = data.get("patient", {})
-                                name = patient_info.get("name", "Unknown")
-                            else:
-                                name = "Unknown"
-                                
-                            # Try to find date information
-                            date = None
-                            if "metadata" in data and "processing_timestamp" in data["metadata"]:
-                                date = data["metadata"]["processing_timestamp"].split("T")[0]
-                            elif "test_info" in data and "date" in data["test_info"]:
-                                date = data["test_info"]["date"]
-                            elif "report_info" in data and "report_date" in data["report_info"]:
-                                date = data["report_info"]["report_date"]
-                            else:
-                                date = "Unknown"
-                            
-                            # Extract report_id from report_info, but prefer using file_id as the consistent ID
-                            report_id = None
-                            if "file_info" in data and "file_id" in data["file_info"]:
-                                report_id = data["file_info"]["file_id"]
-                            elif "report_info" in data and "report_id" in data["report_info"]:
-                                report_id = data["report_info"]["report_id"]
-                            else:
-                                # Use filename without extension as fallback
-                                report_id = os.path.splitext(filename)[0]
-                            
-                            # Get provider information
-                            provider = data.get("metadata", {}).get("provider", "Unknown")
-                            
-                            # Check both model and model_used fields
-                            model = None
-                            if "metadata" in data:
-                                if "model_used" in data["metadata"]:
-                                    model = data["metadata"]["model_used"]
-                                elif "model" in data["metadata"]:
-                                    model = data["metadata"]["model"]
-                            
-                            if not model:
-                                model = "Unknown"
-                            
-                            # Extract run_id, first from metadata, then from file_info
-                            run_id = None
-                            if "metadata" in data and "run_id" in data["metadata"]:
-                                run_id = data["metadata"]["run_id"]
-                            elif "file_info" in data and "file_id" in data["file_info"]:
-                                # Use file_id as run_id if available
-                                run_id = data["file_info"]["file_id"]
-                            else:
-                                # Extract UUID from filename if present or use part of the filename
-                                file_parts = filename.split("_")
-                                if len(file_parts) > 0 and len(file_parts[0]) > 8:
-                                    run_id = file_parts[0]
-                                else:
-                                    run_id = str(uuid.uuid4())
-                            
-                            # Extract context_id from metadata if available
-                            context_id = None
-                            if "metadata" in data and "context_id" in data["metadata"]:
-                                context_id = data["metadata"]["context_id"]
-                                
-                            # Ensure context_id is never null
-                            if not context_id:
-                                # Try to get from file_id
-                                if "file_info" in data and "file_id" in data["file_info"]:
-                                    context_id = data["file_info"]["file_id"]
-                                else:
-                                    # Generate based on report_id
-                                    context_id = str(uuid.uuid4())
-                                    logger.debug(f"Generated new context_id for report: {report_id}")
-                            
-                            # Extract token usage if available
-                            tokens_in = data.get("metadata", {}).get("tokens_in", 0)
-                            tokens_out = data.get("metadata", {}).get("tokens_out", 0)
-                            
-                            # Check usage field at root level as alternative source
-                            if "usage" in data and isinstance(data["usage"], dict):
-                                if tokens_in == 0:
-                                    tokens_in = data["usage"].get("prompt_tokens", 0)
-                                if tokens_out == 0:
-                                    tokens_out = data["usage"].get("completion_tokens", 0)
-                            
-                            tokens = {
-                                "in": tokens_in,
-                                "out": tokens_out
-                            }
-                            
-                            # Add file details with new fields
-                            reports.append({
-                                "filename": filename,
-                                "path": file_path,
-                                "directory": directory,
-                                "patient_name": name,
-                                "report_date": date,
-                                "file_date": datetime.fromtimestamp(
-                                    os.path.getmtime(file_path)
-                                ).strftime("%Y-%m-%d %H:%M:%S"),
-                                "file_size": os.path.getsize(file_path),
-                                "provider": provider,
-                                "model": model,
-                                "report_id": report_id,
-                                "run_id": run_id,
-                                "user_id": data.get("metadata", {}).get("user_id", None),
-                                "context_id": context_id,
-                                "tokens": tokens,
-                                "medical_report_id": data.get("report_info", {}).get("report_id", "")
-                            })
-                            
-                        except Exception as e:
-                            # Log the error but don't fail the whole request
-                            logger.error(f"Error parsing report file {file_path}: {str(e)}")
-                            
-                            # Add with limited information
-                            file_id = os.path.splitext(filename)[0]
-                            
-                            reports.append({
-                                "filename": filename,
-                                "path": file_path,
-                                "directory": directory,
-                                "error": f"Could not parse file: {str(e)}",
-                                "file_date": datetime.fromtimestamp(
-                                    os.path.getmtime(file_path)
-                                ).strftime("%Y-%m-%d %H:%M:%S"),
-                                "file_size": os.path.getsize(file_path),
-                                # Add default values for the new fields without estimation
-                                "report_id": file_id,
-                                "run_id": file_id,
-                                "user_id": None,
-                                "context_id": file_id,
-                                "tokens": {"in": 0, "out": 0},  # Use 0 for actual values
-                                "medical_report_id": "",
-                                "provider": "Unknown",
-                                "model": "Unknown"
-                            })
+        # Catalog rows describe reports without opening them; a row is used
+        # only while its file is unchanged
+        catalog = {(row.get("area"), row.get("key")): row for row in report_catalog.rows()}
         
+        # Check every store holding analyses
+        for store, info in report_files():
+            filename = info.key
+            if "_analysis" in filename:
+                file_path = store.location(filename)
+                directory = store.area
+                file_date = datetime.fromtimestamp(info.modified).strftime("%Y-%m-%d %H:%M:%S")
+                
+                try:
+                    row = catalog.get((directory, filename))
+                    if row is not None and row.get("version") == info.version:
+                        fields = {field: row.get(field) for field in LISTING_FIELDS}
+                    else:
+                        # Read the file to get basic info; report packs
+                        # carry it in their header
+                        fields = listing_fields(read_summary(partial(store.read_range, filename)), filename)
+                    
+                    # Add file details with new fields
+                    reports.append({
+                        "filename": filename,
+                        "path": file_path,
+                        "directory": directory,
+                        "file_date": file_date,
+                        "file_size": info.size,
+                        **fields
+                    })
+                    
+                except Exception as e:
+                    # Log the error but don't fail the whole request
+                    logger.error(f"Error parsing report file {file_path}: {str(e)}")
+                    
+                    # Add with limited information
+                    file_id = os.path.splitext(filename)[0]
+                    
+                    reports.append({
+                        "filename": filename,
+                        "path": file_path,
+                        "directory": directory,
+                        "error": f"Could not parse file: {str(e)}",
+                        "file_date": file_date,
+                        "file_size": info.size,
+                        # Add default values for the new fields without estimation
+                        "report_id": file_id,
+                        "run_id": file_id,
+                        "user_id": None,
+                        "context_id": file_id,
+                        "tokens": {"in": 0, "out": 0},  # Use 0 for actual values
+                        "medical_report_id": "",
+                        "provider": "Unknown",
+                        "model": "Unknown"
+                    })
+
         # Sort reports by file date, newest first
         reports.sort(key=lambda x: x.get("file_date", ""), reverse=True)
         
@@ -848,20 +657,28 @@ async def get_reports():
         raise HTTPException(status_code=500, detail=f"Error listing reports: {str(e)}")
 
 @router.get("/report/{filename}")
-async def get_report(filename: str):
+async def get_report(filename: str, request: Request):
     """
     Get a specific health report by filename
     
     - **filename**: The filename of the report to retrieve
+    
+    Responds 304 when If-None-Match has the file's current ETag.
     """
     try:
-        # Search for the file in all possible directories
-        for directory in [settings.REPORTS_DIR, settings.PROCESSED_DIR, settings.UPLOAD_DIR]:
-            file_path = os.path.join(directory, filename)
-            
-            if os.path.exists(file_path):
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+        # Search for the file in all possible stores
+        for area in ["reports", "processed", "uploads"]:
+            store = get_blob_store(area)
+            info = store.stat(filename)
+            if info is not None:
+                file_path = store.location(filename)
+                directory = store.area
+                # Files addressed by name can be overwritten, so clients revalidate
+                etag = make_etag(info.version, "report")
+                if is_not_modified(request, etag):
+                    return not_modified_response(etag, REVALIDATE_CACHE_CONTROL)
+                
+                data = decode_document(store.get(filename))
                 
                 # Add file location info
                 if isinstance(data, dict) and "metadata" not in data:
@@ -871,7 +688,8 @@ async def get_report(filename: str):
                     data["metadata"]["file_path"] = file_path
                     data["metadata"]["directory"] = directory
                 
-                return data
+                # Plain JSON needs no jsonable_encoder pass
+                return FastJSONResponse(data, headers=cache_headers(etag, REVALIDATE_CACHE_CONTROL))
         
         # If we get here, the file wasn't found
         raise HTTPException(
@@ -879,7 +697,7 @@ async def get_report(filename: str):
             detail=f"Report not found: {filename}"
         )
     
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         logger.error(f"Error parsing report file {filename}: {str(e)}")
         raise HTTPException(
             status_code=400, 
@@ -893,84 +711,63 @@ async def get_report(filename: str):
         )
 
 @router.get("/reports/{run_id}")
-async def get_report_by_id(run_id: str):
+async def get_report_by_id(
+    run_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. 'patient_info,abnormal_parameters' or 'report_info.report_date' (default: all)")
+):
     """
     Get a specific health report by run_id (or report_id)
     
     - **run_id**: The unique identifier of the report to retrieve
+    - **fields**: Optional comma-separated fields to return; nested fields use dots
+    
+    Returns:
+        The complete report JSON with all analysis data, or only the
+        requested fields. Responds 304 without loading the report when
+        If-None-Match has its ETag.
+    """
+    field_list = None
+    if fields:
+        try:
+            field_list = parse_fields(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    
+    # The ETag comes from the content hash kept with the report's views
+    views = await load_report_views(run_id)
+    etag = views_etag(views, "report:fields=" + ",".join(field_list) if field_list else "report")
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    data = await load_report(run_id, field_list)
+    # Plain JSON needs no jsonable_encoder pass
+    return FastJSONResponse(data, headers=cache_headers(etag))
+
+async def load_report(run_id: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Load a report by run_id (or report_id).
+    
+    Args:
+        run_id: The unique identifier of the report
+        fields: Field paths to keep (default: the whole report)
     
     Returns:
-        The complete report JSON with all analysis data
+        The report, shared with the report cache; callers must not modify it
+    
+    Raises:
+        HTTPException: 404 if the report does not exist, 400 if it cannot be parsed
     """
     try:
-        # Search for files with this run_id in all possible directories
-        for directory in [settings.REPORTS_JSON_DIR, settings.REPORTS_DIR, settings.PROCESSED_DIR, settings.UPLOAD_DIR]:
-            # Skip if directory doesn't exist
-            if not os.path.exists(directory):
-                continue
-                
-            # Look for files with the run_id in their name
-            for filename in os.listdir(directory):
-                if run_id in filename and filename.endswith('.json'):
-                    file_path = os.path.join(directory, filename)
-                    logger.info(f"Found report file for run_id {run_id}: {file_path}")
-                    
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    
-                    # Validate the run_id matches, either in metadata or file_info
-                    file_run_id = None
-                    if "metadata" in data and "run_id" in data["metadata"]:
-                        file_run_id = data["metadata"]["run_id"]
-                    elif "file_info" in data and "file_id" in data["file_info"]:
-                        file_run_id = data["file_info"]["file_id"]
-                    
-                    # If file_run_id exists and doesn't match requested run_id, skip this file
-                    if file_run_id and file_run_id != run_id:
-                        continue
-                    
-                    # Add file location info if not present
-                    if "metadata" not in data:
-                        data["metadata"] = {}
-                    
-                    # Update metadata with file location
-                    data["metadata"]["file_path"] = file_path
-                    data["metadata"]["directory"] = directory
-                    
-                    return data
-        
-        # If we get here, no file with matching run_id was found
-        # Try searching inside files as a fallback
-        for directory in [settings.REPORTS_JSON_DIR, settings.REPORTS_DIR, settings.PROCESSED_DIR, settings.UPLOAD_DIR]:
-            if not os.path.exists(directory):
-                continue
-                
-            for filename in os.listdir(directory):
-                if filename.endswith('.json'):
-                    file_path = os.path.join(directory, filename)
-                    
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            data = json.load(f)
-                        
-                        # Check if run_id or report_id matches in the content
-                        if (("metadata" in data and "run_id" in data["metadata"] and data["metadata"]["run_id"] == run_id) or
-                            ("file_info" in data and "file_id" in data["file_info"] and data["file_info"]["file_id"] == run_id) or
-                            ("report_info" in data and "report_id" in data["report_info"] and data["report_info"]["report_id"] == run_id)):
-                            
-                            logger.info(f"Found report with matching ID in content: {file_path}")
-                            
-                            # Add file location info
-                            if "metadata" not in data:
-                                data["metadata"] = {}
-                            
-                            data["metadata"]["file_path"] = file_path
-                            data["metadata"]["directory"] = directory
-                            
-                            return data
-                    except Exception as e:
-                        logger.warning(f"Error reading file {file_path}: {str(e)}")
-                        continue
+        # Parsed reports are shared through the report cache; locating and
+        # parsing a report that is not cached yet is blocking file work
+        loop = asyncio.get_running_loop()
+        if fields:
+            data = await loop.run_in_executor(None, report_cache.get_fields, run_id, fields)
+        else:
+            data = await loop.run_in_executor(None, report_cache.get, run_id)
+        if data is not None:
+            return data
         
         # If we get here, the file wasn't found
         raise HTTPException(
@@ -978,7 +775,7 @@ async def get_report_by_id(run_id: str):
             detail=f"Report not found for ID: {run_id}"
         )
     
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         logger.error(f"Error parsing report file for run_id {run_id}: {str(e)}")
         raise HTTPException(
             status_code=400, 
@@ -994,6 +791,76 @@ async def get_report_by_id(run_id: str):
             detail=f"Error retrieving report: {str(e)}"
         )
 
+async def load_report_views(run_id: str) -> Dict[str, Any]:
+    """
+    Get the precomputed views of a report.
+
+    Views are written when an analysis is saved; for older analyses, or
+    ones changed since, they are built from the report and stored now.
+
+    Raises:
+        HTTPException: 404 if the report does not exist
+    """
+    views = report_views.read(run_id)
+    if views is None:
+        report_data = await load_report(run_id)
+        views = build_views(report_data, run_id, report_cache.source(run_id))
+        try:
+            report_views.write(run_id, views)
+        except OSError as e:
+            logger.warning(f"Error storing views for {run_id}: {str(e)}")
+    return views
+
+def insights_section(run_id: str, views: Dict[str, Any]) -> List[InsightItem]:
+    """Validated insights of a report's views"""
+    if views["insights_error"]:
+        raise HTTPException(**views["insights_error"])
+        
+    # Validate each insight with Pydantic
+    try:
+        return [InsightItem(**insight) for insight in views["insights"]]
+    except Exception as validation_error:
+        logger.error(f"Validation error in insights for {run_id}: {str(validation_error)}")
+        raise HTTPException(
+            status_code=422,
+            detail=f"Invalid insight format: {str(validation_error)}"
+        )
+
+def recommendations_section(run_id: str, views: Dict[str, Any]) -> Dict[str, Any]:
+    """Recommendations response built from a report's views"""
+    if views["insights_error"]:
+        raise HTTPException(**views["insights_error"])
+    
+    # Recommendations of all insights, already sorted by type
+    all_recommendations = views["recommendations"]
+    
+    return {
+        "recommendations": all_recommendations,
+        "report_id": run_id,
+        "count": len(all_recommendations)
+    }
+
+def abnormal_section(run_id: str, views: Dict[str, Any]) -> Dict[str, Any]:
+    """Abnormal parameters response built from a report's views"""
+    # Validate the structure of each abnormal parameter
+    validated_params = []
+    for param in views["abnormal_parameters"]:
+        try:
+            validated_params.append(AbnormalParameter(**param))
+        except Exception as validation_error:
+            logger.warning(f"Invalid abnormal parameter in report {run_id}: {str(validation_error)}")
+            # Skip invalid parameters
+            continue
+    
+    if not validated_params:
+        logger.info(f"No abnormal parameters found in report: {run_id}")
+    
+    return {
+        "parameters": validated_params,
+        "report_id": run_id,
+        "count": len(validated_params)
+    }
+
 @router.get(
     "/reports/{run_id}/insights", 
     response_model=List[InsightItem],
@@ -1065,7 +932,7 @@ async def get_report_by_id(run_id: str):
         }
     }
 )
-async def get_report_insights(run_id: str):
+async def get_report_insights(run_id: str, request: Request, response: Response):
     """
     Get just the health insights from a specific report
     
@@ -1080,94 +947,13 @@ async def get_report_insights(run_id: str):
         - recommendations: List of recommended actions by type
     """
     try:
-        # Reuse the existing report loading logic
-        report_data = await get_report_by_id(run_id)
-        
-        # Extract health_insights
-        if not report_data or "health_insights" not in report_data:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Health insights not found for report: {run_id}"
-            )
-            
-        insights = report_data.get("health_insights", [])
-        
-        # Determine the format and handle accordingly
-        if isinstance(insights, list):
-            # It's already an array format
-            logger.info(f"Health insights for {run_id} is an array with {len(insights)} items")
-        elif isinstance(insights, dict):
-            # It's an object format, convert to array
-            logger.info(f"Health insights for {run_id} is an object, converting to array format")
-            
-            # Handle the specific format in the example (clinical_interpretation + recommendations)
-            if "clinical_interpretation" in insights and "recommendations" in insights:
-                # Extract abnormal parameters from the report if available
-                abnormal_params = []
-                if "abnormal_parameters" in report_data and isinstance(report_data["abnormal_parameters"], list):
-                    abnormal_params = [param.get("name", "") for param in report_data["abnormal_parameters"] if "name" in param]
-                
-                # Convert to array format with a single comprehensive entry
-                insights = [{
-                    "condition": "Comprehensive Health Assessment",
-                    "confidence": 0.9,
-                    "parameters": abnormal_params if abnormal_params else ["Multiple Parameters"],
-                    "description": insights["clinical_interpretation"],
-                    "recommendations": [
-                        {
-                            # Categorize recommendations
-                            "type": "medical" if "consult" in rec.lower() or "doctor" in rec.lower() or "follow up" in rec.lower() 
-                                   else "dietary" if "diet" in rec.lower() or "food" in rec.lower() or "nutrition" in rec.lower()
-                                   else "lifestyle" if "lifestyle" in rec.lower() or "exercise" in rec.lower() or "sun" in rec.lower()
-                                   else "testing" if "test" in rec.lower() or "monitor" in rec.lower() 
-                                   else "medical",
-                            "text": rec
-                        }
-                        for rec in insights["recommendations"]
-                    ]
-                }]
-            else:
-                # For other object formats, create a generic insight
-                insights = [{
-                    "condition": "Health Analysis",
-                    "confidence": 0.8,
-                    "parameters": ["Multiple Parameters"],
-                    "description": "Analysis of multiple health parameters from your blood test.",
-                    "recommendations": [
-                        {
-                            "type": "medical",
-                            "text": "Please consult with your healthcare provider to discuss these results in detail."
-                        }
-                    ]
-                }]
-                
-                # Try to extract any recommendations
-                if isinstance(insights, dict) and "recommendations" in insights and isinstance(insights["recommendations"], list):
-                    insights[0]["recommendations"] = [
-                        {
-                            "type": "medical",
-                            "text": rec
-                        }
-                        for rec in insights["recommendations"] if isinstance(rec, str)
-                    ]
-        else:
-            # Neither array nor object
-            logger.warning(f"Health insights for {run_id} is neither array nor object: {type(insights)}")
-            raise HTTPException(
-                status_code=422,
-                detail=f"Invalid format: health_insights should be an array or object, got {type(insights)}"
-            )
-            
-        # Validate each insight with Pydantic
-        try:
-            validated_insights = [InsightItem(**insight) for insight in insights]
-            return validated_insights
-        except Exception as validation_error:
-            logger.error(f"Validation error in insights for {run_id}: {str(validation_error)}")
-            raise HTTPException(
-                status_code=422,
-                detail=f"Invalid insight format: {str(validation_error)}"
-            )
+        views = await load_report_views(run_id)
+        etag = views_etag(views, "insights")
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        insights = insights_section(run_id, views)
+        set_cache_headers(response, etag)
+        return insights
     
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -1226,7 +1012,7 @@ async def get_report_insights(run_id: str):
         }
     }
 )
-async def get_report_recommendations(run_id: str):
+async def get_report_recommendations(run_id: str, request: Request, response: Response):
     """
     Get all recommendations from a specific report
     
@@ -1237,22 +1023,13 @@ async def get_report_recommendations(run_id: str):
         including each recommendation's type and text content.
     """
     try:
-        # First get the insights
-        insights = await get_report_insights(run_id)
-        
-        # Extract all recommendations from all insights
-        all_recommendations = []
-        for insight in insights:
-            all_recommendations.extend(insight.recommendations)
-            
-        # Sort recommendations by type for better organization
-        all_recommendations.sort(key=lambda x: x.type)
-        
-        return {
-            "recommendations": all_recommendations,
-            "report_id": run_id,
-            "count": len(all_recommendations)
-        }
+        views = await load_report_views(run_id)
+        etag = views_etag(views, "recommendations")
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        recommendations = recommendations_section(run_id, views)
+        set_cache_headers(response, etag)
+        return recommendations
     
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -1365,7 +1142,7 @@ def get_health_insights(text: str) -> dict:
         }
     }
 )
-async def get_abnormal_parameters(run_id: str):
+async def get_abnormal_parameters(run_id: str, request: Request, response: Response):
     """
     Get abnormal parameters from a specific report
     
@@ -1380,142 +1157,13 @@ async def get_abnormal_parameters(run_id: str):
         - direction: Whether the value is "high" or "low"
     """
     try:
-        # Reuse the existing report loading logic
-        report_data = await get_report_by_id(run_id)
-        
-        # Extract abnormal_parameters
-        if not report_data:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Report not found for ID: {run_id}"
-            )
-            
-        logger.info(f"Processing abnormal parameters for report: {run_id}")
-        
-        # Look for abnormal parameters in the standard location
-        if "abnormal_parameters" in report_data and isinstance(report_data["abnormal_parameters"], list):
-            abnormal_params = report_data["abnormal_parameters"]
-            logger.info(f"Found {len(abnormal_params)} abnormal parameters in report")
-            
-            # Validate the structure of each abnormal parameter
-            validated_params = []
-            for param in abnormal_params:
-                try:
-                    # Handle the case where we have the expected structure
-                    if "name" in param and "value" in param and "unit" in param and "reference_range" in param and "direction" in param:
-                        validated_param = AbnormalParameter(**param)
-                        validated_params.append(validated_param)
-                    # Handle alternate structure with test_name and result instead of name and value
-                    elif "test_name" in param and "result" in param and "unit" in param and "reference_range" in param:
-                        # Map the fields to our expected structure
-                        converted_param = {
-                            "name": param["test_name"],
-                            "value": param["result"],
-                            "unit": param["unit"],
-                            "reference_range": param["reference_range"],
-                            "direction": "low" if "below" in param.get("status", "").lower() else 
-                                        "high" if "above" in param.get("status", "").lower() else 
-                                        "unknown"
-                        }
-                        validated_param = AbnormalParameter(**converted_param)
-                        validated_params.append(validated_param)
-                    else:
-                        logger.warning(f"Abnormal parameter has unexpected structure: {param}")
-                except Exception as validation_error:
-                    logger.warning(f"Invalid abnormal parameter in report {run_id}: {str(validation_error)}")
-                    logger.warning(f"Parameter data: {param}")
-                    # Skip invalid parameters
-                    continue
-                    
-            return {
-                "parameters": validated_params,
-                "report_id": run_id,
-                "count": len(validated_params)
-            }
-                
-        # If abnormal_parameters not found, look at test_sections for abnormal values
-        elif "test_sections" in report_data and isinstance(report_data["test_sections"], list):
-            # Extract abnormal parameters from test sections
-            abnormal_params = []
-            
-            for section in report_data["test_sections"]:
-                if "parameters" in section and isinstance(section["parameters"], list):
-                    for param in section["parameters"]:
-                        # Check if parameter is marked as abnormal
-                        if param.get("is_abnormal", False):
-                            # Determine direction if not specified
-                            if "direction" not in param and "value" in param and "reference_range" in param:
-                                # Try to determine direction from value and reference range
-                                direction = None
-                                try:
-                                    # Handle numeric values
-                                    if isinstance(param["value"], (int, float)):
-                                        # Parse reference range
-                                        ref_range = str(param["reference_range"])
-                                        if "-" in ref_range:
-                                            # Range format: min-max
-                                            min_val, max_val = ref_range.split("-", 1)
-                                            try:
-                                                min_val = float(min_val.strip().replace("<", "").replace(">", ""))
-                                                max_val = float(max_val.strip().replace("<", "").replace(">", ""))
-                                                
-                                                if param["value"] < min_val:
-                                                    direction = "low"
-                                                elif param["value"] > max_val:
-                                                    direction = "high"
-                                            except ValueError:
-                                                # Couldn't convert to float
-                                                pass
-                                        elif "<" in ref_range:
-                                            # Format: < max
-                                            try:
-                                                max_val = float(ref_range.replace("<", "").strip())
-                                                if param["value"] > max_val:
-                                                    direction = "high"
-                                            except ValueError:
-                                                pass
-                                        elif ">" in ref_range:
-                                            # Format: > min
-                                            try:
-                                                min_val = float(ref_range.replace(">", "").strip())
-                                                if param["value"] < min_val:
-                                                    direction = "low"
-                                            except ValueError:
-                                                pass
-                                except:
-                                    # Ignore errors in direction determination
-                                    pass
-                                
-                                # Create abnormal parameter with direction
-                                abnormal_param = {
-                                    "name": param.get("name", "Unknown"),
-                                    "value": param.get("value", "N/A"),
-                                    "unit": param.get("unit", ""),
-                                    "reference_range": param.get("reference_range", ""),
-                                    "direction": direction or "unknown"
-                                }
-                                
-                                try:
-                                    validated_param = AbnormalParameter(**abnormal_param)
-                                    abnormal_params.append(validated_param)
-                                except Exception:
-                                    # Skip invalid parameters
-                                    continue
-                                    
-            if abnormal_params:
-                return {
-                    "parameters": abnormal_params,
-                    "report_id": run_id,
-                    "count": len(abnormal_params)
-                }
-                
-        # No abnormal parameters found
-        logger.info(f"No abnormal parameters found in report: {run_id}")
-        return {
-            "parameters": [],
-            "report_id": run_id,
-            "count": 0
-        }
+        views = await load_report_views(run_id)
+        etag = views_etag(views, "abnormal_parameters")
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        parameters = abnormal_section(run_id, views)
+        set_cache_headers(response, etag)
+        return parameters
     
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -1525,4 +1173,120 @@ async def get_abnormal_parameters(run_id: str):
         raise HTTPException(
             status_code=500, 
             detail=f"Error retrieving abnormal parameters: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+# Sections of the report bundle, in response order
+BUNDLE_SECTIONS = ("report", "insights", "recommendations", "abnormal_parameters", "meal_plan", "shopping", "specialists")
+# Sections computed from the precomputed report views
+VIEW_SECTIONS = {
+    "insights": insights_section,
+    "recommendations": recommendations_section,
+    "abnormal_parameters": abnormal_section
+}
+# Sections that need the user's location
+LOCATION_SECTIONS = ("shopping", "specialists")
+
+def parse_bundle_include(include: Optional[str], location: Optional[str]) -> List[str]:
+    """
+    Sections selected by the bundle's include parameter.
+
+    Accepts section names with hyphens or underscores and "abnormal" for
+    abnormal_parameters. Without a selection every section is included,
+    except those needing a location when none is given.
+
+    Raises:
+        HTTPException: 422 for unknown sections, or location sections without a location
+    """
+    if not include:
+        return [section for section in BUNDLE_SECTIONS if location or section not in LOCATION_SECTIONS]
+
+    requested = set()
+    for name in include.split(","):
+        name = name.strip().lower().replace("-", "_")
+        if not name:
+            continue
+        name = "abnormal_parameters" if name == "abnormal" else name
+        if name not in BUNDLE_SECTIONS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Unknown bundle section: {name}. Available sections: {', '.join(BUNDLE_SECTIONS)}"
+            )
+        requested.add(name)
+
+    missing_location = [section for section in LOCATION_SECTIONS if section in requested and not location]
+    if missing_location:
+        raise HTTPException(
+            status_code=422,
+            detail=f"location is required for: {', '.join(missing_location)}"
+        )
+    return [section for section in BUNDLE_SECTIONS if section in requested]
+
+@router.get("/reports/{run_id}/bundle", response_model=ReportBundle)
+async def get_report_bundle(
+    run_id: str,
+    include: Optional[str] = Query(None, description="Comma-separated sections: report, insights, recommendations, abnormal, meal-plan, shopping, specialists (default: all)"),
+    preferences: Optional[str] = Query(None, description="Comma-separated dietary preferences for the meal plan"),
+    location: Optional[str] = Query(None, description="User's location, required for shopping and specialists"),
+    specialty: Optional[str] = Query(None, description="Optional medical specialty to filter specialists by"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields of the report section to return (default: all)")
+):
+    """
+    Get several sections of a report in one request
+    
+    - **run_id**: The unique identifier of the report
+    - **include**: Sections to return (default: all; shopping and specialists only with a location)
+    - **fields**: Optional fields to keep in the report section, as for the report endpoint
+    - **preferences**: Optional dietary preferences for the meal plan
+    - **location**: User's location for shopping and specialist recommendations
+    - **specialty**: Optional specialty to filter specialists by
+    
+    The report is loaded once and the sections are assembled concurrently.
+    Each section has the same content as its own endpoint; a section that
+    fails is left null and its status code and detail are listed under
+    ``errors`` instead of failing the whole bundle.
+    """
+    sections = parse_bundle_include(include, location)
+    field_list = None
+    if fields:
+        try:
+            field_list = parse_fields(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    
+    # Load the report once up front; a missing report fails the whole bundle
+    report_data = await load_report(run_id)
+    
+    loop = asyncio.get_running_loop()
+    bundle: Dict[str, Any] = {"report_id": run_id, "errors": {}}
+    if "report" in sections:
+        bundle["report"] = project(report_data, field_list) if field_list else report_data
+    
+    views_task = None
+    if any(section in VIEW_SECTIONS for section in sections):
+        views_task = asyncio.ensure_future(load_report_views(run_id))
+    
+    async def view_section(name: str):
+        return VIEW_SECTIONS[name](run_id, await views_task)
+    
+    def service_section(name: str):
+        # The services are blocking; they find the report in the report cache
+        if name == "meal_plan":
+            return loop.run_in_executor(None, diet_service.get_mock_meal_plan, run_id, preferences)
+        if name == "shopping":
+            return loop.run_in_executor(None, grocery_service.get_mock_groceries, run_id, location)
+        return loop.run_in_executor(None, specialist_service.get_mock_specialists, run_id, specialty, location)
+    
+    async def collect(name: str, awaitable):
+        try:
+            bundle[name] = await awaitable
+        except HTTPException as e:
+            bundle["errors"][name] = {"status_code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            logger.error(f"Error building bundle section {name} for run_id {run_id}: {str(e)}")
+            bundle["errors"][name] = {"status_code": 500, "detail": str(e)}
+    
+    await asyncio.gather(*(
+        collect(name, view_section(name) if name in VIEW_SECTIONS else service_section(name))
+        for name in sections if name != "report"
+    ))
+    return bundle
@@ -1,9 +1,11 @@
 """
-Health check endpoints
+Health check and metrics endpoints
 """
 
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from app.config import settings
+from app.utils.metrics import registry
 
 router = APIRouter(
     tags=["System"]
@@ -16,4 +18,12 @@ async def health_check():
         "status": "healthy",
         "version": settings.APP_VERSION,
         "environment": settings.ENV
-    } 
\ No newline at end of file
+    }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Pipeline stage timings and in-flight gauges in Prometheus text format"""
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
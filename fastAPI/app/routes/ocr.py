@@ -1,11 +1,22 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Query
 import os
+import json
+import time
 import shutil
-from typing import List, Optional
+import asyncio
+import logging
+import tempfile
+from typing import List, Optional, Tuple, Dict, Any, AsyncIterator, BinaryIO
 from app.services.pdf_processor import process_pdf
 from app.services.image_processor import process_image, process_multiple_images
+from app.services.staged_pipeline import Stage, StagedPipeline
+from app.services.extraction_pool import get_extraction_pool
+from app.services.blob_store import get_blob_store
+from app.services.file_store import upload_store
 from app.config import settings
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/ocr",
@@ -45,93 +56,184 @@ async def extract_text(
             detail="Only PDF and image files (PNG, JPG, JPEG, GIF, BMP, TIFF, WEBP) are accepted"
         )
     
-    # Create directories if they don't exist
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    os.makedirs(settings.PROCESSED_DIR, exist_ok=True)
-    
-    # Save uploaded file
-    file_path = f"{settings.UPLOAD_DIR}/{filename}"
+    # Save uploaded file locally for extraction, then share it
+    file_path = str(upload_store.prepare(filename))
     with open(file_path, "wb") as f:
         f.write(await file.read())
+    get_blob_store("uploads").put_file(filename, file_path)
     
     # Process file based on type
-    text_file_path = f"{settings.PROCESSED_DIR}/{os.path.splitext(filename)[0]}.txt"
-    
     if is_pdf_file(filename) and not force_ocr:
         # Process PDF using PDF processor
-        extracted_text = process_pdf(file_path, text_file_path, clean_text)
+        extracted_text = process_pdf(file_path, None, clean_text)
     else:
         # Process image or forced OCR on PDF
-        extracted_text = process_image(file_path, text_file_path, clean_text)
+        extracted_text = process_image(file_path, None, clean_text)
     
+    get_blob_store("processed").put(f"{os.path.splitext(filename)[0]}.txt", extracted_text.encode("utf-8"))
     return extracted_text
 
+def extract_batch_file(file_path: str, force_ocr: bool, clean_text: bool) -> Tuple[str, float]:
+    """Extract text from one batch file; runs in the shared extraction pool"""
+    start = time.perf_counter()
+    if is_pdf_file(file_path) and not force_ocr:
+        # Process PDF using PDF processor (don't save individual file)
+        text = process_pdf(file_path, None, clean_text)
+    else:
+        # Process image or forced OCR on PDF
+        text = process_image(file_path, None, clean_text)
+    return text, time.perf_counter() - start
+
+def copy_upload(source: BinaryIO, file_path: str) -> None:
+    """Copy an upload's spooled file to a path"""
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(source, f)
+
+async def save_batch_uploads(files: List[UploadFile]) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Save batch uploads into a new scratch directory.
+
+    Each request gets its own directory, so concurrent uploads of files
+    with the same name do not overwrite each other.
+
+    Returns:
+        The scratch directory and (original filename, saved path) pairs in upload order
+    """
+    os.makedirs(settings.SCRATCH_DIR, exist_ok=True)
+    scratch_dir = tempfile.mkdtemp(prefix="batch-", dir=settings.SCRATCH_DIR)
+    loop = asyncio.get_running_loop()
+    saved = []
+    try:
+        for idx, file in enumerate(files):
+            filename = os.path.basename(file.filename or f"file_{idx+1}")
+            # Prefix with the position so duplicate names within a batch stay distinct
+            file_path = os.path.join(scratch_dir, f"{idx:03d}_{filename}")
+            # Copy off the event loop; batches can be large
+            await loop.run_in_executor(None, copy_upload, file.file, file_path)
+            saved.append((filename, file_path))
+    except Exception:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        raise
+    return scratch_dir, saved
+
+async def extract_batch(saved: List[Tuple[str, str]], force_ocr: bool, clean_text: bool) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Extract all batch files concurrently, yielding each result as it finishes.
+
+    Files go through a single-stage pipeline backed by the shared extraction
+    pool, so the batch takes about as long as its slowest file.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_extraction_pool()
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def extract_stage(item):
+        idx, (filename, file_path) = item
+        text, duration = await loop.run_in_executor(pool, extract_batch_file, file_path, force_ocr, clean_text)
+        return {"index": idx, "filename": filename, "status": "ok", "text": text, "duration": round(duration, 3)}
+
+    def on_error(item, stage, e):
+        idx, (filename, _) = item
+        results.put_nowait({"index": idx, "filename": filename, "status": "error", "error": str(e)})
+
+    pipeline = StagedPipeline(
+        [Stage("extract", extract_stage, workers=settings.EXTRACTION_WORKERS)],
+        queue_size=len(saved),
+        on_complete=results.put_nowait,
+        on_error=on_error
+    )
+    task = asyncio.create_task(pipeline.run(enumerate(saved)))
+    try:
+        for _ in saved:
+            yield await results.get()
+        report = await task
+        logger.info(f"Batch extraction of {len(saved)} files: {report.summary()}")
+    finally:
+        task.cancel()
+
+def combine_batch_results(results: List[Dict[str, Any]]) -> str:
+    """Combine per-file results in upload order"""
+    combined_text = ""
+    for result in sorted(results, key=lambda r: r["index"]):
+        idx, filename = result["index"], result["filename"]
+        if result["status"] == "ok":
+            combined_text += f"\n--- File {idx+1}: {filename} ---\n{result['text']}\n"
+        else:
+            combined_text += f"\n--- File {idx+1}: {filename} (Error) ---\nError: {result['error']}\n"
+    return combined_text
+
+def save_combined_text(output_filename: str, combined_text: str) -> str:
+    """Save the combined batch text to the processed store, returning its location"""
+    store = get_blob_store("processed")
+    key = f"{os.path.basename(output_filename)}.txt"
+    store.put(key, combined_text.encode("utf-8"))
+    return store.location(key)
+
 @router.post("/extract-text-batch", response_class=PlainTextResponse)
 async def extract_text_batch(
     files: List[UploadFile] = File(...),
     output_filename: str = Form(..., description="Name for the output text file"),
     force_ocr: bool = Form(False, description="Force OCR even for PDFs"),
-    clean_text: bool = Form(True, description="Clean and normalize extracted text")
+    clean_text: bool = Form(True, description="Clean and normalize extracted text"),
+    stream: bool = Form(False, description="Stream per-file results as NDJSON as they finish")
 ):
     """
     Extract text from multiple files (PDFs or images) and combine the results.
+
+    Files are extracted concurrently. With ``stream`` set, one JSON object per
+    file is streamed (``application/x-ndjson``) as soon as that file is done,
+    followed by a final summary line; otherwise the combined text is returned.
+    The combined text is saved to the processed directory either way.
     
     - **files**: List of PDF or image files to process
     - **output_filename**: Name for the output text file (without extension)
     - **force_ocr**: For PDFs, whether to force OCR instead of native text extraction
     - **clean_text**: Whether to clean and normalize extracted text
+    - **stream**: Whether to stream per-file results as NDJSON
     """
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
     
-    # Create directories if they don't exist
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    os.makedirs(settings.PROCESSED_DIR, exist_ok=True)
-    
-    # Process each file
-    processed_paths = []
-    file_paths = []
-    
     for file in files:
         if not (is_pdf_file(file.filename) or is_image_file(file.filename)):
             raise HTTPException(
                 status_code=400, 
                 detail=f"File {file.filename} is not a supported format. Only PDFs and images are accepted."
             )
-        
-        # Save uploaded file
-        file_path = f"{settings.UPLOAD_DIR}/{file.filename}"
-        file_paths.append(file_path)
-        
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-        
-        processed_paths.append(file_path)
-    
-    # Combined output path
-    combined_text_path = f"{settings.PROCESSED_DIR}/{output_filename}.txt"
     
-    # Process all files and combine results
-    combined_text = ""
-    
-    for idx, file_path in enumerate(processed_paths):
+    scratch_dir, saved = await save_batch_uploads(files)
+    start = time.perf_counter()
+
+    if not stream:
         try:
-            if is_pdf_file(file_path) and not force_ocr:
-                # Process PDF using PDF processor (don't save individual file)
-                text = process_pdf(file_path, None, clean_text)
-            else:
-                # Process image or forced OCR on PDF
-                text = process_image(file_path, None, clean_text)
-                
-            combined_text += f"\n--- File {idx+1}: {os.path.basename(file_path)} ---\n{text}\n"
-        except Exception as e:
-            combined_text += f"\n--- File {idx+1}: {os.path.basename(file_path)} (Error) ---\nError: {str(e)}\n"
-    
-    # Save combined text
-    with open(combined_text_path, "w", encoding="utf-8") as f:
-        f.write(combined_text)
-    
-    return combined_text
+            results = [result async for result in extract_batch(saved, force_ocr, clean_text)]
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+        combined_text = combine_batch_results(results)
+        save_combined_text(output_filename, combined_text)
+        return combined_text
+
+    async def ndjson_results():
+        results = []
+        try:
+            async for result in extract_batch(saved, force_ocr, clean_text):
+                results.append(result)
+                yield json.dumps(result) + "\n"
+
+            combined_text_path = save_combined_text(output_filename, combine_batch_results(results))
+            yield json.dumps({
+                "status": "done",
+                "files": len(results),
+                "failed": sum(1 for r in results if r["status"] != "ok"),
+                "output_path": combined_text_path,
+                "duration": round(time.perf_counter() - start, 3)
+            }) + "\n"
+        finally:
+            # Also runs if the client disconnects mid-stream
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    return StreamingResponse(ndjson_results(), media_type="application/x-ndjson")
 
 @router.post("/extract-text-multipage", response_class=PlainTextResponse)
 async def extract_text_multipage(
@@ -160,10 +262,6 @@ async def extract_text_multipage(
             detail=f"Maximum {MAX_PAGES} pages allowed per document. You provided {len(files)} files."
         )
     
-    # Create directories if they don't exist
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    os.makedirs(settings.PROCESSED_DIR, exist_ok=True)
-    
     # Save the uploaded files
     file_paths = []
     for idx, file in enumerate(files):
@@ -174,9 +272,11 @@ async def extract_text_multipage(
             )
         
         # Save with a standardized name including page number
-        file_path = f"{settings.UPLOAD_DIR}/{document_name}_page{idx+1}_{file.filename}"
+        page_name = f"{document_name}_page{idx+1}_{file.filename}"
+        file_path = str(upload_store.prepare(page_name))
         with open(file_path, "wb") as f:
             f.write(await file.read())
+        get_blob_store("uploads").put_file(page_name, file_path)
         
         file_paths.append(file_path)
     
@@ -202,8 +302,12 @@ async def extract_text_multipage(
             print(f"Warning: Could not parse page order '{page_order}': {str(e)}. Using default order.")
     
     # Process all images as a single document
-    combined_text_path = f"{settings.PROCESSED_DIR}/{document_name}.txt"
-    combined_text = process_multiple_images(ordered_paths, combined_text_path, clean_text)
+    # Pages are OCR'd in parallel in the extraction pool; wait off the event loop
+    loop = asyncio.get_running_loop()
+    combined_text = await loop.run_in_executor(
+        None, process_multiple_images, ordered_paths, None, clean_text
+    )
+    get_blob_store("processed").put(f"{document_name}.txt", combined_text.encode("utf-8"))
     
     return combined_text
 
@@ -214,12 +318,9 @@ async def get_extracted_text(filename: str):
     """
     # Ensure filename doesn't have .pdf extension
     base_filename = os.path.splitext(filename)[0]
-    text_file_path = f"{settings.PROCESSED_DIR}/{base_filename}.txt"
-    
-    if not os.path.exists(text_file_path):
+    try:
+        data = get_blob_store("processed").get(f"{base_filename}.txt")
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"No extracted text found for {filename}")
     
-    with open(text_file_path, "r", encoding="utf-8") as f:
-        text = f.read()
-    
-    return text 
\ No newline at end of file
+    return data.decode("utf-8") 
\ No newline at end of file
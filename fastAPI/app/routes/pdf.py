@@ -3,7 +3,8 @@ import os
 import shutil
 from typing import List, Optional
 from app.services.pdf_processor import process_pdf
-from app.config import settings
+from app.services.blob_store import get_blob_store
+from app.services.file_store import upload_store
 from fastapi.responses import PlainTextResponse
 
 router = APIRouter(
@@ -31,18 +32,15 @@ async def extract_text(
             detail="Only PDF files are accepted"
         )
     
-    # Create directories if they don't exist
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    os.makedirs(settings.PROCESSED_DIR, exist_ok=True)
-    
-    # Save uploaded file
-    file_path = f"{settings.UPLOAD_DIR}/{filename}"
+    # Save uploaded file locally for extraction, then share it
+    file_path = str(upload_store.prepare(filename))
     with open(file_path, "wb") as f:
         f.write(await file.read())
+    get_blob_store("uploads").put_file(filename, file_path)
     
     # Process file
-    text_file_path = f"{settings.PROCESSED_DIR}/{os.path.splitext(filename)[0]}.txt"
-    extracted_text = process_pdf(file_path, text_file_path, clean_text)
+    extracted_text = process_pdf(file_path, None, clean_text)
+    get_blob_store("processed").put(f"{os.path.splitext(filename)[0]}.txt", extracted_text.encode("utf-8"))
     
     return extracted_text
 
@@ -53,12 +51,9 @@ async def get_extracted_text(filename: str):
     """
     # Ensure filename doesn't have .pdf extension
     base_filename = os.path.splitext(filename)[0]
-    text_file_path = f"{settings.PROCESSED_DIR}/{base_filename}.txt"
-    
-    if not os.path.exists(text_file_path):
+    try:
+        data = get_blob_store("processed").get(f"{base_filename}.txt")
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"No extracted text found for {filename}")
     
-    with open(text_file_path, "r", encoding="utf-8") as f:
-        text = f.read()
-    
-    return text 
\ No newline at end of file
+    return data.decode("utf-8") 
\ No newline at end of file
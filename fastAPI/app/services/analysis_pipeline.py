@@ -0,0 +1,533 @@
+"""
+Report analysis pipeline shared by the upload endpoint and background jobs
+"""
+
+import json
+import time
+import asyncio
+import logging
+from concurrent.futures import Executor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.services.llm_advanced_processor import LLMProcessor
+from app.services.document_processor import (
+    FileInfo,
+    classify_file,
+    extract_text
+)
+from app.services.run_store import update_run
+from app.services.blob_store import get_blob_store
+from app.services.lab_series import lab_series
+from app.services.report_catalog import report_catalog, summary_row
+from app.services.report_views import report_views
+from app.services.report_pack import PACK_SUFFIX, analysis_suffix, decode_document, encode_document
+from app.services.text_index import text_index_updates
+from app.services.write_behind import WriteBehindQueue
+from app.utils.http_cache import content_hash
+from app.utils.metrics import StageTimer, pipeline_in_flight
+from app.utils.text_cleaner import normalize_whitespace
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Number of retries for LLM calls
+LLM_MAX_RETRIES = 2
+
+def get_mcp_system_message():
+    """Get the system message for blood test analysis"""
+    return """You are an AI medical assistant specialized in analyzing blood test reports.
+
+Your ONLY job is to return JSON with exactly these fields and nesting:
+{
+  "report_info": {
+    "report_id": string,
+    "report_type": string,
+    "report_date": string (YYYY-MM-DD),
+    "lab_name": string
+  },
+  "patient_info": {
+    "name": string,
+    "age": number,
+    "gender": string,
+    "id": string if available
+  },
+  "test_sections": [
+    {
+      "section_name": string,
+      "parameters": [
+        {
+          "name": string,
+          "value": number | string,
+          "unit": string,
+          "reference_range": string,
+          "is_abnormal": boolean,
+          "direction": "high" | "low" | null
+        }
+      ]
+    }
+  ],
+  "abnormal_parameters": [
+    {
+      "name": string,
+      "value": number | string,
+      "unit": string,
+      "reference_range": string,
+      "direction": "high" | "low"
+    }
+  ],
+  "health_insights": [
+    {
+      "condition": string,
+      "confidence": number,
+      "parameters": [string],
+      "description": string,
+      "recommendations": [
+        {
+          "type": "dietary" | "lifestyle" | "medical" | "testing",
+          "text": string
+        }
+      ]
+    }
+  ]
+}
+
+DO NOT add, remove, or rename any fields. Follow the schema EXACTLY as shown above.
+Use the same field names and nesting structure for all responses.
+Return ONLY the JSON object without any additional text before or after it.
+"""
+
+def build_messages(text: str, context: Optional[str] = None) -> list:
+    """Build the LLM messages for a report's extracted text"""
+    user_message = f"Blood Test Report Content:\n\n{text}"
+
+    if context:
+        user_message += f"\n\nAdditional Context:\n{context}"
+
+    return [
+        {"role": "system", "content": get_mcp_system_message()},
+        {"role": "user", "content": user_message}
+    ]
+
+async def call_llm(processor: LLMProcessor, run_id: str, messages: list, provider: str, model: str) -> Dict[str, Any]:
+    """Call the LLM with retries"""
+    retry_count = 0
+
+    while True:
+        try:
+            return await processor.process_messages(
+                messages=messages,
+                provider=provider,
+                model=model
+            )
+        except Exception as e:
+            retry_count += 1
+            logger.warning(f"[{run_id}] LLM processing attempt {retry_count} failed: {str(e)}")
+
+            if retry_count > LLM_MAX_RETRIES:
+                update_run(run_id, status="failed", error=f"LLM processing failed after {LLM_MAX_RETRIES} retries")
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to process report after {LLM_MAX_RETRIES} attempts: {str(e)}"
+                )
+
+            # Wait before retrying
+            await asyncio.sleep(2)
+
+def write_text(key: str, text: str) -> str:
+    """
+    Store extracted text
+
+    Returns:
+        Where the text was stored
+    """
+    text_blobs = get_blob_store("text")
+    text_blobs.put(key, text.encode("utf-8"))
+    return text_blobs.location(key)
+
+def write_analysis(key: str, analysis: Dict[str, Any]) -> str:
+    """
+    Store an analysis document, as JSON or as a report pack depending on
+    the key's suffix
+
+    Returns:
+        SHA-256 of the written bytes, used for the report's ETags
+    """
+    data = encode_document(key, analysis)
+    get_blob_store("processed").put(key, data)
+    return content_hash(data)
+
+def analysis_row(key: str, analysis: Any, digest: str) -> Optional[Dict[str, Any]]:
+    """
+    Write the views of an analysis just stored under key
+
+    Returns:
+        Its catalog row, or None for documents that are not JSON objects
+    """
+    if not isinstance(analysis, dict):
+        return None
+    processed = get_blob_store("processed")
+    report_views.save(analysis, processed, key, digest)
+    return summary_row(analysis, processed, key)
+
+def record_series(analyses: List[Any]) -> None:
+    """Append the lab values of analyses to their patients' trend series"""
+    try:
+        lab_series.append_reports(analyses)
+    except Exception as e:
+        # Trend series can be rebuilt from the analyses with build_trends.py
+        logger.error(f"Error appending lab values to trend series: {str(e)}")
+
+def record_analysis(key: str, analysis: Any, digest: str) -> None:
+    """Write the views, catalog row and trend series of an analysis just stored under key"""
+    row = analysis_row(key, analysis, digest)
+    if row is not None:
+        report_catalog.record(row)
+    record_series([analysis])
+
+def record_analyses(batch: List[Tuple[str, Any, str]]) -> None:
+    """
+    Write the views of a batch of stored analyses and append their catalog
+    rows and trend series together
+
+    Args:
+        batch: (key, analysis, digest) of each analysis
+    """
+    rows = []
+    for key, analysis, digest in batch:
+        try:
+            row = analysis_row(key, analysis, digest)
+        except Exception as e:
+            # Views are rebuilt when next read; keep the rest of the batch
+            logger.error(f"Error writing views for {key}: {str(e)}")
+            continue
+        if row is not None:
+            rows.append(row)
+    report_catalog.record_many(rows)
+    record_series([analysis for _, analysis, _ in batch])
+
+# Views, catalog rows and trend series are derived from the stored analysis,
+# so they are written behind the response; views lost in a crash are rebuilt
+# on read
+analysis_records = WriteBehindQueue("analysis-records", record_analyses)
+
+def save_analysis(key: str, analysis: Any) -> str:
+    """
+    Store an analysis in the processed store, with its views and its catalog row
+
+    Returns:
+        Where the analysis was stored
+    """
+    digest = write_analysis(key, analysis)
+    record_analysis(key, analysis, digest)
+    return get_blob_store("processed").location(key)
+
+def complete_stored_run(run_id: str) -> Optional[str]:
+    """
+    Complete an interrupted run whose analysis was already stored.
+
+    Run-scoped responses are cached as immutable, so a run is never analyzed
+    a second time once its analysis exists; the stored one is kept and its
+    views, catalog row and trend series, which may have been lost with the
+    write-behind queue, are recorded again.
+
+    Args:
+        run_id: Run to check
+
+    Returns:
+        Location of the stored analysis, or None if the run stored none
+    """
+    processed = get_blob_store("processed")
+    for suffix in dict.fromkeys([analysis_suffix(), ".json", PACK_SUFFIX]):
+        key = f"{run_id}_analysis{suffix}"
+        try:
+            data = processed.get(key)
+        except FileNotFoundError:
+            continue
+        record_analysis(key, decode_document(data), content_hash(data))
+        location = processed.location(key)
+        update_run(run_id, status="completed", metadata={"json_path": location})
+        return location
+    return None
+
+class AnalysisRun:
+    """
+    State of one report as it moves through the pipeline stages.
+
+    The stage functions below each take an ``AnalysisRun``, fill in their
+    part (text, analysis, paths) and record their timing on ``timer``.
+    """
+
+    def __init__(self, run_id: str, document_id: str, file_path: Path, original_filename: str,
+                 provider: str, model: str, context: Optional[str] = None,
+                 start_time: Optional[float] = None, timer: Optional[StageTimer] = None,
+                 file_info: Optional[FileInfo] = None):
+        self.run_id = run_id
+        self.document_id = document_id
+        self.file_path = Path(file_path)
+        self.original_filename = original_filename
+        self.provider = provider
+        self.model = model
+        self.context = context
+        self.start_time = start_time or time.time()
+        self.timer = timer or StageTimer()
+        self.file_info = file_info
+        self.file_type = "unknown"
+        self.ocr_used: Any = "unknown"
+        self.text: Optional[str] = None
+        self.llm_text: Optional[str] = None
+        self.extraction_metadata: Dict[str, Any] = {}
+        self.text_path: Optional[str] = None
+        self.llm_response: Optional[Dict[str, Any]] = None
+        self.analysis: Optional[Any] = None
+        self.json_path: Optional[str] = None
+
+    @property
+    def page_count(self) -> int:
+        if "page_count" in self.extraction_metadata:
+            return self.extraction_metadata["page_count"]
+        if self.file_info and self.file_info.page_count_hint:
+            return self.file_info.page_count_hint
+        return 1
+
+    def observe(self, outcome: str) -> None:
+        """Feed this run's stage timings into the pipeline metrics"""
+        self.timer.observe(self.provider, self.model, self.file_type, self.ocr_used, outcome)
+
+async def extract_stage(run: AnalysisRun, executor: Optional[Executor] = None,
+                        delete_unsupported: bool = True) -> AnalysisRun:
+    """
+    Validate the file type, extract its text and store the text.
+
+    Args:
+        run: The run being processed
+        executor: Thread or process pool for extraction, which is CPU bound
+        delete_unsupported: Whether to delete the file if it is not a PDF or image
+
+    Returns:
+        The run with text and extraction metadata filled in
+    """
+    loop = asyncio.get_running_loop()
+    run_id = run.run_id
+
+    # Check if the file is valid (PDF or image); uploads were classified while saved
+    if run.file_info is None:
+        with run.timer.stage("mime_sniff"):
+            run.file_info = await loop.run_in_executor(
+                executor, classify_file, run.file_path, run.original_filename
+            )
+    run.file_type = run.file_info.kind
+
+    if not run.file_info.is_supported:
+        # If invalid file type, delete it and raise an exception
+        if delete_unsupported and run.file_path.exists():
+            run.file_path.unlink()
+
+        update_run(run_id, status="failed", error="Unsupported file type")
+        raise HTTPException(
+            status_code=400,
+            detail="Unsupported file type. Only PDF and image files are accepted."
+        )
+
+    # Extract text from the file
+    logger.info(f"[{run_id}] Extracting text from {run.file_path}")
+    update_run(run_id, status="extracting_text")
+    with run.timer.stage("extract_text"):
+        text, metadata = await loop.run_in_executor(
+            executor, extract_text, run.file_path, False, run.file_info
+        )
+    run.ocr_used = metadata.get("ocr_used", False)
+    for stage, seconds in metadata.get("timings", {}).items():
+        run.timer.add(f"extract_{stage}", seconds)
+
+    if not text or len(text.strip()) < 50:
+        update_run(run_id, status="failed", error="Text extraction failed or produced insufficient text")
+        raise HTTPException(
+            status_code=422,
+            detail="Failed to extract sufficient text from the document. Please try a clearer image or a properly formatted PDF."
+        )
+
+    run.text = text
+    run.extraction_metadata = metadata
+
+    # Save extracted text to the text store; I/O bound, so not in a process pool
+    with run.timer.stage("save_text"):
+        run.text_path = await loop.run_in_executor(None, write_text, f"{run.document_id}.txt", text)
+    await text_index_updates.submit({
+        "document_id": run.document_id,
+        "text": text,
+        "filename": run.original_filename,
+        "run_id": run_id
+    })
+
+    # Update run with metadata
+    update_run(
+        run_id,
+        status="processing_text",
+        metadata={
+            "document_id": run.document_id,
+            "file_type": "PDF" if run.file_info.is_pdf else "Image",
+            "mime_type": run.file_info.mime_type,
+            "word_count": metadata.get("word_count", 0),
+            "char_count": metadata.get("char_count", 0),
+            "page_count": metadata.get("page_count", 1),
+            "ocr_used": metadata.get("ocr_used", False),
+            "text_extraction_time": metadata.get("extraction_duration", 0)
+        }
+    )
+    return run
+
+def compact_stage(run: AnalysisRun) -> AnalysisRun:
+    """
+    Collapse redundant whitespace in the text sent to the LLM.
+
+    PDFs whose result tables were rebuilt from word positions send the
+    layout text instead, which has one aligned row per result.
+    """
+    with run.timer.stage("compact"):
+        run.llm_text = normalize_whitespace(run.extraction_metadata.get("layout_text") or run.text)
+    logger.debug(f"[{run.run_id}] Compacted text from {len(run.text)} to {len(run.llm_text)} characters")
+    return run
+
+async def llm_stage(run: AnalysisRun) -> AnalysisRun:
+    """Send the extracted text to the LLM"""
+    logger.info(f"[{run.run_id}] Processing text with {run.provider}/{run.model}")
+    processor = LLMProcessor()
+    with run.timer.stage("llm"):
+        run.llm_response = await call_llm(
+            processor, run.run_id, build_messages(run.llm_text or run.text, run.context),
+            run.provider, run.model
+        )
+    return run
+
+def parse_stage(run: AnalysisRun) -> AnalysisRun:
+    """Parse the LLM response and attach run metadata and file info"""
+    run_id = run.run_id
+    update_run(run_id, status="parsing_response")
+    analysis_content = run.llm_response.get("content", "")
+
+    try:
+        with run.timer.stage("parse_json"):
+            analysis_json = json.loads(analysis_content)
+    except json.JSONDecodeError:
+        logger.error(f"[{run_id}] Invalid JSON response from LLM: {analysis_content[:500]}...")
+        update_run(run_id, status="failed", error="Invalid JSON response from LLM")
+
+        raise HTTPException(
+            status_code=500,
+            detail="The analysis result was not a valid JSON object. Please try again."
+        )
+
+    processing_time = time.time() - run.start_time
+
+    # Record run metadata and file info the same way as earlier analyses
+    if isinstance(analysis_json, dict):
+        analysis_json.setdefault("metadata", {}).update({
+            "processing_time": round(processing_time, 2),
+            "processing_timestamp": datetime.now().isoformat(),
+            "model_used": run.model,
+            "provider": run.provider,
+            "run_id": run_id
+        })
+        analysis_json.setdefault("file_info", {}).update({
+            "filename": run.original_filename,
+            "file_id": run_id,
+            "file_size": run.file_path.stat().st_size if run.file_path.exists() else 0,
+            "upload_time": datetime.fromtimestamp(run.start_time).isoformat(),
+            "text_path": run.text_path
+        })
+        if run.extraction_metadata.get("table_rows"):
+            # Rows as laid out in the PDF, for parsers that need no LLM
+            analysis_json["table_rows"] = run.extraction_metadata["table_rows"]
+
+    run.analysis = analysis_json
+    return run
+
+async def persist_stage(run: AnalysisRun, executor: Optional[Executor] = None) -> AnalysisRun:
+    """Write the analysis to the processed store and queue its views and catalog row"""
+    loop = asyncio.get_running_loop()
+    key = f"{run.run_id}_analysis{analysis_suffix()}"
+
+    update_run(run.run_id, status="saving_results")
+    with run.timer.stage("save_analysis"):
+        # Atomic and durable (per PERSIST_FSYNC) before the run completes
+        digest = await loop.run_in_executor(executor, write_analysis, key, run.analysis)
+        run.json_path = get_blob_store("processed").location(key)
+    await analysis_records.submit((key, run.analysis, digest))
+
+    update_run(run.run_id, status="completed", metadata={
+        "json_path": run.json_path,
+        "stage_durations": {stage: round(seconds, 4) for stage, seconds in run.timer.durations.items()}
+    })
+    return run
+
+async def analyze_saved_file(
+    run_id: str,
+    document_id: str,
+    file_path: Path,
+    original_filename: str,
+    provider: str,
+    model: str,
+    context: Optional[str] = None,
+    include_text: bool = False,
+    executor: Optional[Executor] = None,
+    start_time: Optional[float] = None,
+    timer: Optional[StageTimer] = None,
+    file_info: Optional[FileInfo] = None
+) -> Dict[str, Any]:
+    """
+    Run text extraction and LLM analysis for an uploaded file.
+
+    Blocking stages (extraction, disk writes) run in ``executor`` so the
+    event loop stays free while a report is processed.
+
+    Args:
+        run_id: Unique identifier of the run
+        document_id: Identifier used to name the stored upload and text
+        file_path: Path of the saved upload
+        original_filename: Name of the file as uploaded
+        provider: LLM provider to use
+        model: LLM model to use
+        context: Optional additional context for the LLM
+        include_text: Whether to include the extracted text in the result
+        executor: Executor for blocking stages (defaults to the loop's executor)
+        start_time: When the run started (defaults to now)
+        timer: Stage timer already holding earlier stages such as the upload
+        file_info: Classification made while the upload was saved
+
+    Returns:
+        Analysis result with run_id, provider, model, analysis and processing_time
+    """
+    run = AnalysisRun(
+        run_id, document_id, file_path, original_filename, provider, model,
+        context=context, start_time=start_time, timer=timer, file_info=file_info
+    )
+    outcome = "failed"
+
+    with pipeline_in_flight.track_inprogress():
+        try:
+            await extract_stage(run, executor)
+            compact_stage(run)
+            await llm_stage(run)
+            parse_stage(run)
+            await persist_stage(run, executor)
+            outcome = "completed"
+        finally:
+            run.observe(outcome)
+
+    # Prepare result
+    result = {
+        "run_id": run_id,
+        "provider": provider,
+        "model": model,
+        "analysis": run.analysis,
+        "processing_time": time.time() - run.start_time
+    }
+
+    if include_text:
+        result["text"] = run.text
+
+    return result
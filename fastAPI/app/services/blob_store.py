@@ -0,0 +1,556 @@
+"""
+Blob storage for uploads, extracted text, analyses, views, saved reports
+and lab value series.
+
+Each storage area is a ``BlobStore`` addressed by file name. The backend
+is chosen with ``BLOB_BACKEND``:
+
+- ``local``: files under the configured directories, sharded by
+  ``FileStore`` (the default, and the layout of existing deployments)
+- ``s3``: an S3-compatible bucket (AWS, MinIO, Ceph, ...) shared by
+  several API nodes; needs the ``boto3`` package
+- ``memory``: an in-process stand-in for tests and local experiments
+
+Stores support streaming puts and gets, multipart uploads and range
+reads. Code that needs a real file, such as PDF and OCR extraction, uses
+``local_path``, which yields the file itself on the local backend and a
+temporary copy otherwise.
+"""
+
+import os
+import time
+import logging
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from app.config import settings
+from app.services.file_store import FileStore, processed_store, sync_directory, sync_file, text_store, upload_store
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+    ClientError = None
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Read size for streaming gets and file puts
+CHUNK_SIZE = 1024 * 1024
+# S3 rejects multipart parts smaller than this, except the last one
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+@dataclass(frozen=True)
+class BlobInfo:
+    """Metadata of a stored blob"""
+    key: str
+    size: int
+    version: str  # Changes whenever the blob is rewritten
+    modified: float  # Unix timestamp of the last write
+
+def _key(key: str) -> str:
+    # Keys come from URLs; keep only the last path component
+    return Path(key).name
+
+class MultipartUpload(ABC):
+    """
+    A blob written in parts.
+
+    Parts are written in order with ``write`` and the blob appears only
+    when ``complete`` is called; used as a context manager, the upload is
+    aborted if it was not completed.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.completed = False
+
+    @abstractmethod
+    def write(self, data: bytes) -> None:
+        """Append a part"""
+        pass
+
+    @abstractmethod
+    def _complete(self) -> BlobInfo:
+        pass
+
+    @abstractmethod
+    def abort(self) -> None:
+        """Discard the parts written so far"""
+        pass
+
+    def complete(self) -> BlobInfo:
+        """Publish the blob"""
+        info = self._complete()
+        self.completed = True
+        return info
+
+    def __enter__(self) -> "MultipartUpload":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if not self.completed:
+            self.abort()
+
+class BlobStore(ABC):
+    """Base class for blob storage backends"""
+
+    def __init__(self, area: str):
+        """
+        Initialize the store.
+
+        Args:
+            area: Storage area name, e.g. "processed"
+        """
+        self.area = area
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[BlobInfo]:
+        """Metadata of a blob, or None if there is no such blob"""
+        pass
+
+    @abstractmethod
+    def read_range(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """
+        Read part of a blob.
+
+        Args:
+            key: Blob name
+            start: First byte
+            end: Byte after the last one (None for the end of the blob)
+
+        Returns:
+            The bytes, fewer if the blob ends first
+
+        Raises:
+            FileNotFoundError: If there is no such blob
+        """
+        pass
+
+    @abstractmethod
+    def multipart(self, key: str) -> MultipartUpload:
+        """Start writing a blob in parts"""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Delete a blob, returning whether it existed"""
+        pass
+
+    @abstractmethod
+    def list(self) -> Iterator[BlobInfo]:
+        """Every blob in the store; lookups by name should use ``stat``"""
+        pass
+
+    @abstractmethod
+    def location(self, key: str) -> str:
+        """Where a blob is stored, for logs and API responses"""
+        pass
+
+    def get(self, key: str) -> bytes:
+        """Read a whole blob"""
+        return self.read_range(key)
+
+    def exists(self, key: str) -> bool:
+        """Whether a blob is stored under this name"""
+        return self.stat(key) is not None
+
+    def iter_chunks(self, key: str, start: int = 0, end: Optional[int] = None,
+                    chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Stream a blob, or a byte range of it, in chunks"""
+        position = start
+        while end is None or position < end:
+            chunk_end = position + chunk_size if end is None else min(position + chunk_size, end)
+            chunk = self.read_range(key, position, chunk_end)
+            if not chunk:
+                break
+            yield chunk
+            position += len(chunk)
+
+    def put_stream(self, key: str, chunks: Iterable[bytes]) -> BlobInfo:
+        """Write a blob from a stream of chunks"""
+        with self.multipart(key) as upload:
+            for chunk in chunks:
+                if chunk:
+                    upload.write(chunk)
+            return upload.complete()
+
+    def put(self, key: str, data: bytes) -> BlobInfo:
+        """Write a blob, replacing any blob of the same name"""
+        return self.put_stream(key, [data])
+
+    def put_file(self, key: str, path: Union[str, Path]) -> BlobInfo:
+        """Store a local file as a blob; large files are uploaded in parts"""
+        with open(path, "rb") as f:
+            return self.put_stream(key, iter(lambda: f.read(CHUNK_SIZE), b""))
+
+    @contextmanager
+    def local_path(self, key: str) -> Iterator[Path]:
+        """
+        A local file with a blob's content, for libraries that need a path.
+
+        Raises:
+            FileNotFoundError: If there is no such blob
+        """
+        os.makedirs(settings.SCRATCH_DIR, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=settings.SCRATCH_DIR, suffix=f"-{_key(key)}")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in self.iter_chunks(key):
+                    f.write(chunk)
+            yield Path(temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+class _LocalUpload(MultipartUpload):
+    def __init__(self, store: "LocalBlobStore", key: str):
+        super().__init__(key)
+        self.store = store
+        self.path = store.files.prepare(key)
+        fd, self.temp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        self.file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        self.file.write(data)
+
+    def _complete(self) -> BlobInfo:
+        # Readers see the old blob or the whole new one; fsync per PERSIST_FSYNC
+        sync_file(self.file)
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+        sync_directory(self.path.parent)
+        return self.store.stat(self.key)
+
+    def abort(self) -> None:
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.unlink(self.temp_path)
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files in a (sharded) local directory"""
+
+    def __init__(self, area: str, files: FileStore):
+        """
+        Initialize the store.
+
+        Args:
+            area: Storage area name
+            files: File store holding the blobs
+        """
+        super().__init__(area)
+        self.files = files
+
+    def _info(self, key: str, stat: os.stat_result) -> BlobInfo:
+        return BlobInfo(key, stat.st_size, f"{stat.st_mtime_ns}-{stat.st_size}", stat.st_mtime)
+
+    def stat(self, key: str) -> Optional[BlobInfo]:
+        path = self.files.locate(key)
+        if path is None:
+            return None
+        try:
+            return self._info(_key(key), os.stat(path))
+        except FileNotFoundError:
+            return None
+
+    def read_range(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        path = self.files.locate(key)
+        if path is None:
+            raise FileNotFoundError(f"No blob {key} in {self.area}")
+        with open(path, "rb") as f:
+            if start:
+                f.seek(start)
+            return f.read() if end is None else f.read(max(end - start, 0))
+
+    def multipart(self, key: str) -> MultipartUpload:
+        return _LocalUpload(self, _key(key))
+
+    def put_file(self, key: str, path: Union[str, Path]) -> BlobInfo:
+        # Files written straight to the store's own path need no copy
+        stored = self.files.locate(key)
+        if stored is not None and Path(path).resolve() == stored.resolve():
+            return self.stat(key)
+        return super().put_file(key, path)
+
+    def delete(self, key: str) -> bool:
+        return self.files.delete(key)
+
+    def list(self) -> Iterator[BlobInfo]:
+        for path in self.files.iter_files():
+            if path.name.endswith(".tmp"):
+                continue
+            try:
+                yield self._info(path.name, os.stat(path))
+            except FileNotFoundError:
+                continue
+
+    def list_unsharded(self) -> Iterator[BlobInfo]:
+        """Blobs directly in the root, i.e. written before sharding"""
+        try:
+            entries = list(os.scandir(self.files.root))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                try:
+                    yield self._info(entry.name, entry.stat())
+                except FileNotFoundError:
+                    continue
+
+    def location(self, key: str) -> str:
+        return str(self.files.locate(key) or self.files.path(key))
+
+    @contextmanager
+    def local_path(self, key: str) -> Iterator[Path]:
+        path = self.files.locate(key)
+        if path is None:
+            raise FileNotFoundError(f"No blob {key} in {self.area}")
+        yield path
+
+class _MemoryUpload(MultipartUpload):
+    def __init__(self, store: "MemoryBlobStore", key: str):
+        super().__init__(key)
+        self.store = store
+        self.parts: List[bytes] = []
+
+    def write(self, data: bytes) -> None:
+        self.parts.append(bytes(data))
+
+    def _complete(self) -> BlobInfo:
+        return self.store._set(self.key, b"".join(self.parts))
+
+    def abort(self) -> None:
+        self.parts = []
+
+class MemoryBlobStore(BlobStore):
+    """In-process stand-in for a shared object store"""
+
+    def __init__(self, area: str):
+        super().__init__(area)
+        self._blobs: Dict[str, bytes] = {}
+        self._infos: Dict[str, BlobInfo] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _set(self, key: str, data: bytes) -> BlobInfo:
+        with self._lock:
+            self._writes += 1
+            info = BlobInfo(key, len(data), str(self._writes), time.time())
+            self._blobs[key] = data
+            self._infos[key] = info
+        return info
+
+    def stat(self, key: str) -> Optional[BlobInfo]:
+        return self._infos.get(_key(key))
+
+    def read_range(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        data = self._blobs.get(_key(key))
+        if data is None:
+            raise FileNotFoundError(f"No blob {key} in {self.area}")
+        return data[start:end]
+
+    def multipart(self, key: str) -> MultipartUpload:
+        return _MemoryUpload(self, _key(key))
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            self._infos.pop(_key(key), None)
+            return self._blobs.pop(_key(key), None) is not None
+
+    def list(self) -> Iterator[BlobInfo]:
+        with self._lock:
+            infos = list(self._infos.values())
+        return iter(infos)
+
+    def location(self, key: str) -> str:
+        return f"memory://{self.area}/{_key(key)}"
+
+class _S3Upload(MultipartUpload):
+    def __init__(self, store: "S3BlobStore", key: str):
+        super().__init__(key)
+        self.store = store
+        self.buffer = bytearray()
+        self.upload_id: Optional[str] = None
+        self.parts: List[Dict[str, object]] = []
+
+    def _send_part(self) -> None:
+        s3, bucket, object_key = self.store.client, self.store.bucket, self.store._object_key(self.key)
+        if self.upload_id is None:
+            self.upload_id = s3.create_multipart_upload(Bucket=bucket, Key=object_key)["UploadId"]
+        number = len(self.parts) + 1
+        response = s3.upload_part(
+            Bucket=bucket, Key=object_key, UploadId=self.upload_id, PartNumber=number, Body=bytes(self.buffer)
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": number})
+        self.buffer = bytearray()
+
+    def write(self, data: bytes) -> None:
+        self.buffer.extend(data)
+        if len(self.buffer) >= self.store.part_size:
+            self._send_part()
+
+    def _complete(self) -> BlobInfo:
+        s3, bucket, object_key = self.store.client, self.store.bucket, self.store._object_key(self.key)
+        if self.upload_id is None:
+            # Small blobs go up in a single request
+            s3.put_object(Bucket=bucket, Key=object_key, Body=bytes(self.buffer))
+        else:
+            if self.buffer:
+                self._send_part()
+            s3.complete_multipart_upload(
+                Bucket=bucket, Key=object_key, UploadId=self.upload_id, MultipartUpload={"Parts": self.parts}
+            )
+        return self.store.stat(self.key)
+
+    def abort(self) -> None:
+        if self.upload_id is not None:
+            try:
+                self.store.client.abort_multipart_upload(
+                    Bucket=self.store.bucket, Key=self.store._object_key(self.key), UploadId=self.upload_id
+                )
+            except Exception as e:
+                logger.warning(f"Error aborting upload of {self.key}: {e}")
+        self.buffer = bytearray()
+
+class S3BlobStore(BlobStore):
+    """Blobs in an S3-compatible bucket, shared by every API node"""
+
+    def __init__(self, area: str, bucket: str, prefix: str = "", client=None,
+                 part_size: Optional[int] = None):
+        """
+        Initialize the store.
+
+        Args:
+            area: Storage area name
+            bucket: Bucket name
+            prefix: Key prefix; the area's blobs are stored under "{prefix}{area}/"
+            client: boto3 S3 client (created from the S3_* settings if not given)
+            part_size: Multipart upload part size (defaults to settings.BLOB_PART_SIZE)
+        """
+        super().__init__(area)
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("BLOB_BACKEND=s3 needs the boto3 package")
+            client = boto3.client(
+                "s3", endpoint_url=settings.S3_ENDPOINT_URL or None, region_name=settings.S3_REGION or None
+            )
+        self.client = client
+        self.bucket = bucket
+        self.prefix = f"{prefix}{area}/"
+        self.part_size = max(part_size or settings.BLOB_PART_SIZE, S3_MIN_PART_SIZE)
+
+    def _object_key(self, key: str) -> str:
+        return self.prefix + _key(key)
+
+    @staticmethod
+    def _is_missing(error: Exception) -> bool:
+        return (ClientError is not None and isinstance(error, ClientError)
+                and error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"))
+
+    def stat(self, key: str) -> Optional[BlobInfo]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except Exception as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return BlobInfo(_key(key), head["ContentLength"], head["ETag"].strip('"'), head["LastModified"].timestamp())
+
+    def _get_object(self, key: str, start: int, end: Optional[int]):
+        request = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if start or end is not None:
+            request["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        try:
+            return self.client.get_object(**request)
+        except Exception as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(f"No blob {key} in {self.area}")
+            if ClientError is not None and isinstance(e, ClientError) and \
+                    e.response.get("Error", {}).get("Code") == "InvalidRange":
+                return None
+            raise
+
+    def read_range(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        if end is not None and end <= start:
+            return b""
+        response = self._get_object(key, start, end)
+        return response["Body"].read() if response is not None else b""
+
+    def iter_chunks(self, key: str, start: int = 0, end: Optional[int] = None,
+                    chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        if end is not None and end <= start:
+            return
+        # One request, streamed
+        response = self._get_object(key, start, end)
+        if response is not None:
+            yield from response["Body"].iter_chunks(chunk_size)
+
+    def multipart(self, key: str) -> MultipartUpload:
+        return _S3Upload(self, _key(key))
+
+    def delete(self, key: str) -> bool:
+        existed = self.exists(key)
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        return existed
+
+    def list(self) -> Iterator[BlobInfo]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get("Contents", []):
+                yield BlobInfo(
+                    item["Key"][len(self.prefix):], item["Size"],
+                    item["ETag"].strip('"'), item["LastModified"].timestamp()
+                )
+
+    def location(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self._object_key(key)}"
+
+# Local file stores of each area
+LOCAL_AREAS: Dict[str, FileStore] = {
+    "uploads": upload_store,
+    "text": text_store,
+    "processed": processed_store,
+    "views": FileStore(settings.VIEWS_DIR),
+    "trends": FileStore(settings.TRENDS_DIR),
+    # Reports saved through the API have always been kept unsharded
+    "reports": FileStore(settings.REPORTS_DIR, depth=0),
+}
+
+_stores: Dict[str, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+def create_blob_store(area: str, backend: Optional[str] = None) -> BlobStore:
+    """
+    Create the store of an area for a backend.
+
+    Args:
+        area: One of LOCAL_AREAS
+        backend: "local", "s3" or "memory" (defaults to settings.BLOB_BACKEND)
+
+    Returns:
+        The store
+    """
+    backend = (backend or settings.BLOB_BACKEND).lower()
+    if backend == "s3":
+        if not settings.S3_BUCKET:
+            raise RuntimeError("BLOB_BACKEND=s3 needs S3_BUCKET")
+        return S3BlobStore(area, settings.S3_BUCKET, settings.S3_PREFIX)
+    if backend == "memory":
+        return MemoryBlobStore(area)
+    if backend != "local":
+        raise ValueError(f"Unknown blob backend: {backend}")
+    return LocalBlobStore(area, LOCAL_AREAS[area])
+
+def get_blob_store(area: str) -> BlobStore:
+    """The shared store of an area, created on first use"""
+    with _stores_lock:
+        store = _stores.get(area)
+        if store is None:
+            store = _stores[area] = create_blob_store(area)
+        return store
@@ -2,7 +2,11 @@ import logging
 import re
 import json
 from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
 from app.services.mcp_service import MCPService
+from app.services.reference_ranges import evaluate_bounds
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -61,6 +65,9 @@ class DataVerifier:
             "a1c": (4, 14),                # %
             "psa": (0, 10),                # ng/mL
         }
+
+        # Known parameters matching each parameter name seen so far
+        self._range_matches: Dict[str, List[Tuple[float, float]]] = {}
     
     async def verify_and_refine(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -207,6 +214,9 @@ class DataVerifier:
             elif len(test_sections) == 0:
                 validation_warnings.append("test_sections list is empty")
             else:
+                # (name, value, min, max) of every value with a known plausible range
+                plausibility_checks: List[Tuple[str, float, float, float]] = []
+
                 # Check each test section
                 for i, section in enumerate(test_sections):
                     if not isinstance(section, dict):
@@ -248,14 +258,19 @@ class DataVerifier:
                             # Try to extract numeric value
                             numeric_value = self._extract_numeric_value(param_value)
                             if numeric_value is not None:
-                                # Check against known ranges if available
-                                for known_param, (min_val, max_val) in self.parameter_ranges.items():
-                                    if known_param in param_name or param_name in known_param:
-                                        if not min_val <= numeric_value <= max_val:
-                                            validation_warnings.append(
-                                                f"Unusual value {numeric_value} for {param['name']}. "
-                                                f"Expected range: {min_val}-{max_val}"
-                                            )
+                                # Queue a check against each known range for this name
+                                for min_val, max_val in self._plausible_ranges(param_name):
+                                    plausibility_checks.append((param["name"], numeric_value, min_val, max_val))
+
+                # Check all values against their plausible ranges at once
+                if plausibility_checks:
+                    names, values, lows, highs = zip(*plausibility_checks)
+                    evaluation = evaluate_bounds(np.array(values), np.array(lows), np.array(highs))
+                    for idx in np.flatnonzero(evaluation.abnormal):
+                        validation_warnings.append(
+                            f"Unusual value {values[idx]} for {names[idx]}. "
+                            f"Expected range: {lows[idx]}-{highs[idx]}"
+                        )
         
         # 5. Validate abnormal_parameters structure if present
         if "abnormal_parameters" in extracted_data:
@@ -343,6 +358,25 @@ class DataVerifier:
             # If refinement fails, return the original data
             return extracted_data
     
+    def _plausible_ranges(self, param_name: str) -> List[Tuple[float, float]]:
+        """
+        Plausible ranges of the known parameters matching a parameter name.
+
+        Args:
+            param_name: Lowercase parameter name with underscores for spaces
+
+        Returns:
+            (min, max) of every known parameter contained in the name or containing it
+        """
+        ranges = self._range_matches.get(param_name)
+        if ranges is None:
+            ranges = [
+                bounds for known_param, bounds in self.parameter_ranges.items()
+                if known_param in param_name or param_name in known_param
+            ]
+            self._range_matches[param_name] = ranges
+        return ranges
+
     def _extract_numeric_value(self, value_string: Any) -> Optional[float]:
         """
         Extract a numeric value from a string or other value.
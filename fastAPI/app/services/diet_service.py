@@ -2,35 +2,17 @@
 Diet service for meal planning recommendations
 """
 
-import json
 import logging
 import os
 import datetime
 from typing import Dict, Any, Optional
-from pathlib import Path
 
-from app.config import settings
+from app.services.report_cache import get_report_data
 from app.models.schemas import MealPlanResponse, MealSlot
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-def get_report_data(run_id: str) -> Dict[str, Any]:
-    """
-    Load the analysis data for a given run_id
-    """
-    try:
-        analysis_file = Path(settings.PROCESSED_DIR) / f"{run_id}_analysis.json"
-        if not analysis_file.exists():
-            logger.warning(f"Analysis file not found for run_id: {run_id}")
-            return {}
-        
-        with open(analysis_file, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Error loading analysis data for run_id {run_id}: {e}")
-        return {}
-
 def get_mock_meal_plan(run_id: str, preferences: Optional[str] = None) -> MealPlanResponse:
     """
     Generate a mock meal plan based on run_id and preferences
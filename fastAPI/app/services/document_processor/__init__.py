@@ -2,10 +2,14 @@
 Document processing service for handling file operations and text extraction
 """
 
+from .file_info import FileInfo, classify_file
+from .pdf_layout import TableRow, extract_layout
 from .processor import (
     is_pdf_file,
     is_image_file,
     save_uploaded_file,
+    save_and_classify_upload,
     cleanup_temp_file,
+    extract_text,
     extract_text_from_file
 ) 
\ No newline at end of file
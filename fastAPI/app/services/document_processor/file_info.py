@@ -0,0 +1,183 @@
+"""
+Single-pass file type classification for uploaded documents
+"""
+
+import os
+import re
+import logging
+import mimetypes
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import magic
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Bytes libmagic needs to identify PDFs and common image formats
+SNIFF_BYTES = 8192
+
+# Chunk size used when streaming uploads to disk
+CHUNK_SIZE = 1024 * 1024
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif', '.webp'}
+
+# Page objects of uncompressed PDFs; "/Type /Pages" (the page tree) is excluded
+PDF_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+# Page count recorded in the linearization dictionary at the start of web-optimized PDFs
+PDF_LINEARIZED_PAGES_PATTERN = re.compile(rb"/Linearized.{0,200}?/N\s+(\d+)", re.DOTALL)
+
+@dataclass
+class FileInfo:
+    """
+    What an uploaded file is, determined once when it is saved.
+
+    Attributes:
+        kind: "pdf", "image" or "unsupported"
+        mime_type: MIME type sniffed from the content
+        size: Size in bytes
+        page_count_hint: Page count if it could be read cheaply, else None
+        filename: Original file name
+    """
+    kind: str
+    mime_type: str
+    size: int
+    page_count_hint: Optional[int] = None
+    filename: str = ""
+
+    @property
+    def is_pdf(self) -> bool:
+        return self.kind == "pdf"
+
+    @property
+    def is_image(self) -> bool:
+        return self.kind == "image"
+
+    @property
+    def is_supported(self) -> bool:
+        return self.kind in ("pdf", "image")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FileInfo":
+        return cls(**data)
+
+def classify(head: bytes, filename: str = "", size: int = 0,
+             page_count_hint: Optional[int] = None) -> FileInfo:
+    """
+    Classify a file from its first bytes and name.
+
+    The sniffed content type wins; the extension is only used when the
+    content is inconclusive, matching what ``is_pdf_file`` and
+    ``is_image_file`` accept.
+
+    Args:
+        head: First bytes of the file (at least SNIFF_BYTES when available)
+        filename: Original file name
+        size: File size in bytes
+        page_count_hint: Page count gathered while reading the file
+
+    Returns:
+        The file info
+    """
+    try:
+        mime_type = magic.from_buffer(head, mime=True) or ""
+    except Exception as e:
+        logger.error(f"Error getting MIME type: {e}")
+        mime_type = ""
+
+    ext = os.path.splitext(filename)[1].lower()
+    guessed_type, _ = mimetypes.guess_type(filename)
+
+    if mime_type == "application/pdf":
+        kind = "pdf"
+    elif mime_type.startswith("image/"):
+        kind = "image"
+    elif ext == ".pdf" or guessed_type == "application/pdf":
+        kind = "pdf"
+    elif ext in IMAGE_EXTENSIONS or (guessed_type or "").startswith("image/"):
+        kind = "image"
+    else:
+        kind = "unsupported"
+
+    if kind == "pdf" and mime_type != "application/pdf":
+        mime_type = "application/pdf"
+    elif kind == "image" and not mime_type.startswith("image/"):
+        mime_type = guessed_type or "image/unknown"
+
+    if kind == "image":
+        page_count_hint = 1
+    elif kind != "pdf":
+        page_count_hint = None
+
+    return FileInfo(
+        kind=kind,
+        mime_type=mime_type,
+        size=size,
+        page_count_hint=page_count_hint,
+        filename=filename
+    )
+
+class FileSniffer:
+    """
+    Classifies a file from the chunks it is written in.
+
+    Feed every chunk as it streams to disk; the first bytes are kept for
+    MIME sniffing and PDF page objects are counted along the way, so the
+    file never has to be read again.
+    """
+
+    def __init__(self, filename: str = ""):
+        self.filename = filename
+        self.size = 0
+        self._head = b""
+        self._tail = b""
+        self._pages = 0
+
+    def feed(self, chunk: bytes) -> None:
+        """Consume the next chunk of the file"""
+        if len(self._head) < SNIFF_BYTES:
+            self._head += chunk[:SNIFF_BYTES - len(self._head)]
+        self.size += len(chunk)
+
+        # Carry a few bytes over so a marker split across chunks is still found;
+        # matches inside the carried bytes were counted with the previous chunk
+        data = self._tail + chunk
+        self._pages += len(PDF_PAGE_PATTERN.findall(data)) - len(PDF_PAGE_PATTERN.findall(self._tail))
+        self._tail = data[-32:]
+
+    def finish(self) -> FileInfo:
+        """Classify the file once all chunks were fed"""
+        hint = None
+        linearized = PDF_LINEARIZED_PAGES_PATTERN.search(self._head)
+        if linearized:
+            hint = int(linearized.group(1))
+        elif self._pages:
+            # PDFs with compressed object streams hide their pages; no hint then
+            hint = self._pages
+        return classify(self._head, self.filename, self.size, hint)
+
+def classify_file(file_path: Path, filename: Optional[str] = None) -> FileInfo:
+    """
+    Classify a file that is already on disk, reading it once.
+
+    Args:
+        file_path: Path to the file
+        filename: Original file name (defaults to the path's name)
+
+    Returns:
+        The file info
+    """
+    file_path = Path(file_path)
+    sniffer = FileSniffer(filename or file_path.name)
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            sniffer.feed(chunk)
+    return sniffer.finish()
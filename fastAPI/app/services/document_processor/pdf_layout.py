@@ -0,0 +1,253 @@
+"""
+Table-aware text extraction from PDFs that have a text layer.
+
+Lab PDFs place every word at an exact position, which plain text
+extraction throws away, interleaving the columns of result tables. Here
+the words are grouped back into lines by their vertical position and
+into cells by the horizontal gaps between them. Cells are assigned to
+the parameter, value, unit and reference range columns, using the
+table header's positions when the page has one.
+"""
+
+import re
+import logging
+import statistics
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Gap between words, in median character widths, that separates two cells
+CELL_GAP = 1.5
+
+# Header words identifying each table column
+HEADER_KEYWORDS = {
+    "parameter": ("test", "parameter", "investigation", "analyte", "description", "examination"),
+    "value": ("result", "value", "observed"),
+    "unit": ("unit", "units"),
+    "reference_range": ("reference", "range", "normal", "interval", "biological"),
+}
+
+VALUE_PATTERN = re.compile(
+    r"^[<>≤≥]?\s*[-+]?\d+(?:[.,]\d+)*(?:\s*[HL*]{1,2})?$"
+    r"|^(?:positive|negative|reactive|non-reactive|nil|absent|present|trace|normal|abnormal)$",
+    re.IGNORECASE
+)
+RANGE_PATTERN = re.compile(
+    r"^(?:[<>≤≥]=?\s*\d+(?:[.,]\d+)?|(?:up\s*to)\s*\d+(?:[.,]\d+)?"
+    r"|[-+]?\d+(?:[.,]\d+)?\s*(?:-|–|to)\s*\d+(?:[.,]\d+)?)$",
+    re.IGNORECASE
+)
+UNIT_PATTERN = re.compile(
+    r"^(?:%|[a-zA-Zµμ]*/[a-zA-Z0-9µμ^./]+|x?10\^?\d+/[a-zA-Zµμ]+"
+    r"|[munpfkµμ]?(?:g|L|l|mol|IU|U|Eq|eq)|fL|pg|ratio|sec|seconds|mm/hr|cells)$"
+)
+# A value followed by its unit in the same cell, e.g. "13.5 g/dL"
+VALUE_UNIT_PATTERN = re.compile(r"^(\S+)\s+(\S+)$")
+
+@dataclass
+class Cell:
+    """Words of a line that belong together"""
+    x0: float
+    x1: float
+    text: str
+
+@dataclass
+class TableRow:
+    """One result row of a lab table"""
+    parameter: str
+    value: str
+    unit: str = ""
+    reference_range: str = ""
+    page: int = 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def render(self) -> str:
+        """Compact pipe-separated form used in the layout text"""
+        return " | ".join([self.parameter, self.value, self.unit, self.reference_range]).rstrip(" |")
+
+@dataclass
+class PageLayout:
+    """Lines of cells and the table rows recognized on one page"""
+    page: int
+    lines: List[List[Cell]] = field(default_factory=list)
+    rows: List[Tuple[int, TableRow]] = field(default_factory=list)
+
+    def text(self) -> str:
+        """The page as text, with table rows in a fixed column order"""
+        rows = dict(self.rows)
+        return "\n".join(
+            rows[idx].render() if idx in rows else " | ".join(cell.text for cell in line)
+            for idx, line in enumerate(self.lines)
+        )
+
+def group_lines(words: List[tuple]) -> List[List[tuple]]:
+    """
+    Group words into lines by their vertical center.
+
+    Args:
+        words: Word tuples from ``page.get_text("words")``
+
+    Returns:
+        Lines from top to bottom, each with its words from left to right
+    """
+    lines: List[List[tuple]] = []
+    center = height = 0.0
+    for word in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        word_center = (word[1] + word[3]) / 2
+        word_height = word[3] - word[1]
+        if lines and abs(word_center - center) <= 0.5 * min(height, word_height):
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+            center, height = word_center, word_height
+    return [sorted(line, key=lambda w: w[0]) for line in lines]
+
+def split_cells(line: List[tuple], char_width: float) -> List[Cell]:
+    """Split a line into cells where the gap between words is wide"""
+    cells: List[Cell] = []
+    for x0, _, x1, _, text, *_ in line:
+        if cells and x0 - cells[-1].x1 <= CELL_GAP * char_width:
+            cells[-1].x1 = x1
+            cells[-1].text += " " + text
+        else:
+            cells.append(Cell(x0, x1, text))
+    return cells
+
+def header_columns(cells: List[Cell]) -> Optional[List[Tuple[str, float]]]:
+    """
+    Recognize a table header line.
+
+    Returns:
+        (column, x0) for each recognized header cell in order, or None if
+        the line does not name at least the value column and one other
+    """
+    columns = []
+    for cell in cells:
+        words = set(re.findall(r"[a-z]+", cell.text.lower()))
+        for column, keywords in HEADER_KEYWORDS.items():
+            if words.intersection(keywords) and column not in (c for c, _ in columns):
+                columns.append((column, cell.x0))
+                break
+    names = [column for column, _ in columns]
+    if "value" in names and len(names) >= 2:
+        return columns
+    return None
+
+def row_from_header(cells: List[Cell], columns: List[Tuple[str, float]], page: int) -> Optional[TableRow]:
+    """Assign cells to the header's columns by their horizontal position"""
+    values: Dict[str, List[str]] = {}
+    for cell in cells:
+        center = (cell.x0 + cell.x1) / 2
+        # The column whose header starts closest to the left of the cell's center,
+        # or the first one for cells left of every header
+        column = columns[0][0]
+        for name, x0 in columns:
+            if x0 <= center:
+                column = name
+        values.setdefault(column, []).append(cell.text)
+
+    row = {name: " ".join(texts) for name, texts in values.items()}
+    if not row.get("value") or not row.get("parameter", "")[:1].isalpha():
+        return None
+    if not row.get("unit"):
+        # Without a unit column the unit usually follows the value
+        split = VALUE_UNIT_PATTERN.match(row["value"])
+        if split and UNIT_PATTERN.match(split.group(2)):
+            row["value"], row["unit"] = split.groups()
+    # Free text that happens to reach the value column is not a result;
+    # qualitative results are kept when the row also has a unit or range
+    if not VALUE_PATTERN.match(row["value"]) and not (row.get("unit") or row.get("reference_range")):
+        return None
+    return TableRow(
+        parameter=row["parameter"],
+        value=row["value"],
+        unit=row.get("unit", ""),
+        reference_range=row.get("reference_range", ""),
+        page=page
+    )
+
+def row_from_cells(cells: List[Cell], page: int) -> Optional[TableRow]:
+    """Recognize a result row from the content of its cells alone"""
+    if len(cells) < 2 or not cells[0].text[:1].isalpha():
+        return None
+
+    row = TableRow(parameter=cells[0].text, value="", page=page)
+    for cell in cells[1:]:
+        text = cell.text
+        split = VALUE_UNIT_PATTERN.match(text)
+        if not row.value and VALUE_PATTERN.match(text):
+            row.value = text
+        elif not row.value and split and VALUE_PATTERN.match(split.group(1)) and UNIT_PATTERN.match(split.group(2)):
+            row.value, row.unit = split.groups()
+        elif not row.reference_range and RANGE_PATTERN.match(text):
+            row.reference_range = text
+        elif row.value and not row.unit and UNIT_PATTERN.match(text):
+            row.unit = text
+        else:
+            return None
+    return row if row.value else None
+
+def analyze_page(words: List[tuple], page: int) -> PageLayout:
+    """
+    Rebuild the lines, cells and table rows of one page.
+
+    Args:
+        words: Word tuples from ``page.get_text("words")``
+        page: Page number (1-based)
+
+    Returns:
+        The page layout
+    """
+    layout = PageLayout(page=page)
+    if not words:
+        return layout
+
+    char_width = statistics.median((w[2] - w[0]) / max(1, len(w[4])) for w in words)
+    columns = None
+    for line in group_lines(words):
+        cells = split_cells(line, char_width)
+        idx = len(layout.lines)
+        layout.lines.append(cells)
+
+        header = header_columns(cells)
+        if header:
+            columns = header
+            continue
+
+        row = row_from_header(cells, columns, page) if columns else None
+        row = row or row_from_cells(cells, page)
+        if row:
+            layout.rows.append((idx, row))
+    return layout
+
+def extract_layout(file_path: Path) -> Tuple[str, List[TableRow], int]:
+    """
+    Extract a PDF's text with its tables rebuilt from word positions.
+
+    Args:
+        file_path: Path to the PDF file
+
+    Returns:
+        Tuple of (layout text, table rows, page count); the text has one
+        line per visual line, cells separated by " | " and table rows in
+        parameter | value | unit | range order
+    """
+    pages = []
+    rows: List[TableRow] = []
+    with fitz.open(file_path) as doc:
+        for page_num in range(len(doc)):
+            words = doc.load_page(page_num).get_text("words")
+            layout = analyze_page(words, page_num + 1)
+            pages.append(layout.text())
+            rows.extend(row for _, row in layout.rows)
+        page_count = len(doc)
+
+    logger.info(f"Rebuilt {len(rows)} table rows from {page_count} pages of {file_path}")
+    return "\n\n".join(pages), rows, page_count
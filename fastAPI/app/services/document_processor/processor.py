@@ -3,25 +3,31 @@ Core document processing functionality for handling file uploads, text extractio
 """
 
 import os
+import asyncio
 import logging
 from typing import Tuple, Dict, Any, Optional
 from pathlib import Path
 import mimetypes
 import magic
 import time
-import tempfile
-import cv2
 import numpy as np
 
 from fastapi import UploadFile
-from PIL import Image
-import pytesseract
 import PyPDF2
 from pdf2image import convert_from_path
 
+from app.config import settings
+from app.services.document_processor.file_info import FileInfo, FileSniffer, classify_file, CHUNK_SIZE
+from app.services.document_processor.pdf_layout import extract_layout
+from app.services.image_preprocessing import load_grayscale, preprocess_for_ocr
+from app.services.ocr_cache import ocr_cache, cache_stats
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Tesseract languages used for medical documents
+OCR_LANG = "eng+osd"
+
 def get_mime_type(file_path: str) -> str:
     """
     Get the MIME type of a file using python-magic
@@ -99,34 +105,56 @@ def is_image_file(filename: str, file_path: Optional[str] = None) -> bool:
         
     return False
 
-async def save_uploaded_file(file: UploadFile, destination: Path) -> Path:
-    """Save an uploaded file to the specified destination."""
+async def save_and_classify_upload(file: UploadFile, destination: Path) -> Tuple[Path, FileInfo]:
+    """
+    Stream an uploaded file to disk and classify it on the way.
+    
+    The first bytes are MIME-sniffed once while the upload is written, so
+    later stages reuse the returned FileInfo instead of reading the file again.
+    
+    Args:
+        file: The uploaded file
+        destination: Where to save it; a missing extension is filled in from the MIME type
+        
+    Returns:
+        Tuple of (saved path, file info)
+    """
     try:
         destination.parent.mkdir(parents=True, exist_ok=True)
         
-        content = await file.read()
+        sniffer = FileSniffer(file.filename or destination.name)
         with open(destination, 'wb') as f:
-            f.write(content)
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sniffer.feed(chunk)
+                f.write(chunk)
+        file_info = sniffer.finish()
         
         # Check if the file has a proper extension, if not add it based on MIME type
         if not destination.suffix:
-            mime_type = get_mime_type(str(destination))
-            if mime_type == 'application/pdf':
+            if file_info.is_pdf:
                 new_destination = destination.with_suffix('.pdf')
                 destination.rename(new_destination)
                 destination = new_destination
-            elif mime_type.startswith('image/'):
-                ext = mimetypes.guess_extension(mime_type)
+            elif file_info.is_image:
+                ext = mimetypes.guess_extension(file_info.mime_type)
                 if ext:
                     new_destination = destination.with_suffix(ext)
                     destination.rename(new_destination)
                     destination = new_destination
                     
-        return destination
+        return destination, file_info
     except Exception as e:
         logger.error(f"Error saving uploaded file: {e}")
         raise
 
+async def save_uploaded_file(file: UploadFile, destination: Path) -> Path:
+    """Save an uploaded file to the specified destination."""
+    saved_path, _ = await save_and_classify_upload(file, destination)
+    return saved_path
+
 def cleanup_temp_file(file_path: Path):
     """Clean up a temporary file."""
     try:
@@ -135,32 +163,49 @@ def cleanup_temp_file(file_path: Path):
     except Exception as e:
         logger.error(f"Error cleaning up temporary file {file_path}: {e}")
 
-async def extract_text_from_file(file_path: Path, force_ocr: bool = False) -> tuple[str, dict]:
+def extract_text(file_path: Path, force_ocr: bool = False,
+                 file_info: Optional[FileInfo] = None) -> tuple[str, dict]:
     """
     Extract text from a file based on its type (PDF or image).
     
+    This is the blocking implementation; it is safe to run in a worker
+    thread or process.
+    
     Args:
         file_path: Path to the file
         force_ocr: Whether to force OCR for PDFs
+        file_info: Classification from when the file was saved; sniffed here if missing
         
     Returns:
         Tuple of (extracted text, metadata)
     """
+    file_path = Path(file_path)
     start_time = time.time()
     metadata = {
         "extraction_time": start_time,
         "ocr_used": False,
-        "page_count": 1
+        "page_count": 1,
+        "timings": {}
     }
     
     try:
-        if is_pdf_file(None, str(file_path)):
+        if file_info is None:
+            sniff_start = time.perf_counter()
+            file_info = classify_file(file_path)
+            metadata["timings"]["mime_sniff"] = time.perf_counter() - sniff_start
+        metadata["file_info"] = file_info.to_dict()
+        
+        if file_info.is_pdf:
             logger.info(f"Extracting text from PDF: {file_path}")
             text, pdf_metadata = extract_text_from_pdf(file_path, force_ocr)
+            metadata["timings"].update(pdf_metadata.pop("timings", {}))
             metadata.update(pdf_metadata)
-        elif is_image_file(None, str(file_path)):
+        elif file_info.is_image:
             logger.info(f"Extracting text from image: {file_path}")
-            text = extract_text_from_image(file_path)
+            text, page_metadata = ocr_image(file_path)
+            metadata["timings"].update(page_metadata.pop("timings"))
+            metadata["preprocessing"] = [page_metadata]
+            metadata["ocr_cache"] = cache_stats(int(page_metadata["cache_hit"]), int(not page_metadata["cache_hit"]))
             metadata["ocr_used"] = True
         else:
             raise ValueError(f"Unsupported file type: {file_path}")
@@ -176,6 +221,25 @@ async def extract_text_from_file(file_path: Path, force_ocr: bool = False) -> tu
         logger.error(f"Error extracting text from file {file_path}: {str(e)}")
         return "", {"error": str(e), "extraction_duration": time.time() - start_time}
 
+async def extract_text_from_file(file_path: Path, force_ocr: bool = False,
+                                 file_info: Optional[FileInfo] = None) -> tuple[str, dict]:
+    """
+    Extract text from a file based on its type (PDF or image).
+    
+    Runs the blocking extraction in the default executor so the event
+    loop is not blocked by OCR.
+    
+    Args:
+        file_path: Path to the file
+        force_ocr: Whether to force OCR for PDFs
+        file_info: Classification from when the file was saved
+        
+    Returns:
+        Tuple of (extracted text, metadata)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, extract_text, file_path, force_ocr, file_info)
+
 
 def extract_text_from_pdf(file_path: Path, force_ocr: bool = False) -> tuple[str, dict]:
     """
@@ -191,12 +255,27 @@ def extract_text_from_pdf(file_path: Path, force_ocr: bool = False) -> tuple[str
     metadata = {
         "ocr_used": False,
         "page_count": 0,
-        "file_type": "PDF"
+        "file_type": "PDF",
+        "timings": {}
     }
+    timings = metadata["timings"]
     
     try:
         # First try to extract text directly
         if not force_ocr:
+            if settings.PDF_LAYOUT_EXTRACTION:
+                layout_start = time.perf_counter()
+                try:
+                    # Word positions give the result tables as aligned rows
+                    layout_text, rows, _ = extract_layout(file_path)
+                    if rows:
+                        metadata["layout_text"] = layout_text
+                        metadata["table_rows"] = [row.to_dict() for row in rows]
+                except Exception as e:
+                    logger.warning(f"Error extracting PDF layout: {str(e)}")
+                timings["layout"] = time.perf_counter() - layout_start
+
+            direct_start = time.perf_counter()
             try:
                 with open(file_path, 'rb') as file:
                     reader = PyPDF2.PdfReader(file)
@@ -208,6 +287,8 @@ def extract_text_from_pdf(file_path: Path, force_ocr: bool = False) -> tuple[str
                         if page_text:
                             text += page_text + "\n\n"
                     
+                    timings["direct_text"] = time.perf_counter() - direct_start
+                    
                     # If we extracted a reasonable amount of text, return it
                     if len(text.strip()) > 100:
                         logger.info(f"Extracted {len(text)} characters from PDF directly")
@@ -221,42 +302,32 @@ def extract_text_from_pdf(file_path: Path, force_ocr: bool = False) -> tuple[str
         
         # Convert PDF pages to images and perform OCR
         text_from_images = ""
+        rasterize_start = time.perf_counter()
         images = convert_from_path(
             file_path, 
-            dpi=300,  # Higher DPI for better OCR quality
-            fmt="png"
+            dpi=settings.OCR_PDF_DPI,
+            fmt="png",
+            grayscale=True
         )
+        timings["rasterize"] = time.perf_counter() - rasterize_start
         
         metadata["page_count"] = len(images)
-        
-        # Configure Tesseract for optimal results with medical documents
-        custom_config = r'--oem 3 --psm 6 -l eng+osd --dpi 300'
+        metadata["preprocessing"] = []
+        ocr_start = time.perf_counter()
+        timings["preprocess"] = 0.0
         
         for i, image in enumerate(images):
-            # Preprocess image for better OCR results
-            img_array = np.array(image)
-            # Convert to grayscale
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            # Apply threshold to get black and white image
-            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-            
-            # Save preprocessed image to a temporary file
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp:
-                cv2.imwrite(temp.name, thresh)
-                temp_path = temp.name
-            
-            try:
-                # Perform OCR on the processed image
-                page_text = pytesseract.image_to_string(
-                    Image.open(temp_path),
-                    config=custom_config
-                )
-                text_from_images += page_text + "\n\n"
-                
-            finally:
-                # Clean up the temporary file
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
+            # Preprocessing adapts scale, crop, deskew and segmentation to each page
+            page_text, page_metadata = ocr_page(np.array(image.convert("L")), settings.OCR_PDF_DPI)
+            timings["preprocess"] += page_metadata.pop("timings")["preprocess"]
+            metadata["preprocessing"].append(page_metadata)
+            text_from_images += page_text + "\n\n"
+        
+        hits = sum(1 for page in metadata["preprocessing"] if page["cache_hit"])
+        metadata["ocr_cache"] = cache_stats(hits, len(images) - hits)
+        
+        # OCR time excludes the per-page preprocessing recorded above
+        timings["ocr"] = time.perf_counter() - ocr_start - timings["preprocess"]
         
         logger.info(f"Extracted {len(text_from_images)} characters from PDF using OCR")
         return text_from_images, metadata
@@ -266,6 +337,48 @@ def extract_text_from_pdf(file_path: Path, force_ocr: bool = False) -> tuple[str
         return "", {"error": str(e), "ocr_used": metadata["ocr_used"], "page_count": metadata["page_count"]}
 
 
+def ocr_page(gray: np.ndarray, dpi: Optional[float] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Preprocess a grayscale page and run OCR on it.
+    
+    Args:
+        gray: Grayscale page image
+        dpi: Resolution of the image, if known
+        
+    Returns:
+        Tuple of (page text, preprocessing metadata)
+    """
+    preprocess_start = time.perf_counter()
+    binary, page_metadata = preprocess_for_ocr(gray, dpi, {"lang": OCR_LANG})
+    preprocess_time = time.perf_counter() - preprocess_start
+    
+    # The cache is consulted before invoking Tesseract
+    ocr_start = time.perf_counter()
+    text, page_metadata["cache_hit"] = ocr_cache.image_to_string(binary, page_metadata["config"])
+    page_metadata["timings"] = {
+        "preprocess": preprocess_time,
+        "ocr": time.perf_counter() - ocr_start
+    }
+    return text, page_metadata
+
+def ocr_image(file_path: Path) -> Tuple[str, Dict[str, Any]]:
+    """
+    Extract text from an image file using OCR, returning preprocessing metadata.
+    
+    Args:
+        file_path: Path to the image file
+        
+    Returns:
+        Tuple of (extracted text, page metadata)
+    """
+    gray, dpi = load_grayscale(str(file_path))
+    text, page_metadata = ocr_page(gray, dpi)
+    logger.info(
+        f"Extracted {len(text)} characters from image "
+        f"(psm {page_metadata['psm']}, scale {page_metadata['scale']}, skew {page_metadata['skew_angle']})"
+    )
+    return text, page_metadata
+
 def extract_text_from_image(file_path: Path) -> str:
     """
     Extract text from an image file using OCR.
@@ -277,32 +390,9 @@ def extract_text_from_image(file_path: Path) -> str:
         Extracted text
     """
     try:
-        # Read the image
-        image = cv2.imread(str(file_path))
-        if image is None:
-            # Try using PIL if OpenCV fails
-            with Image.open(file_path) as img:
-                # Convert PIL Image to numpy array
-                image = np.array(img)
-                if img.mode == 'RGBA':
-                    # Convert RGBA to RGB
-                    image = cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
-        
-        # Preprocess image for better OCR
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        # Apply threshold to get black and white image
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-        
-        # Configure Tesseract for optimal results
-        custom_config = r'--oem 3 --psm 6 -l eng+osd --dpi 300'
-        
-        # Perform OCR on the processed image
-        text = pytesseract.image_to_string(thresh, config=custom_config)
-        
-        logger.info(f"Extracted {len(text)} characters from image")
+        text, _ = ocr_image(file_path)
         return text
         
     except Exception as e:
         logger.error(f"Failed to extract text from image {file_path}: {str(e)}")
-        return "" 
\ No newline at end of file
+        return ""
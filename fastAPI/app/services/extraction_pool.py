@@ -0,0 +1,62 @@
+"""
+Shared process pool for CPU-bound text extraction
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.config import settings
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_lock = threading.Lock()
+
+# Set in the pool's worker processes
+_in_worker = False
+
+def _mark_worker() -> None:
+    global _in_worker
+    _in_worker = True
+
+def in_extraction_worker() -> bool:
+    """
+    Whether the caller runs inside an extraction pool worker.
+
+    Work that would fan out to the pool runs inline there instead, since a
+    worker starting its own pool would multiply the process count.
+    """
+    return _in_worker
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """
+    Get the shared extraction pool, creating it on first use.
+
+    OCR and PDF parsing are CPU bound, so requests share one pool sized to
+    the machine instead of each starting its own workers.
+
+    Returns:
+        The shared process pool
+    """
+    global _pool, _pool_pid
+    with _lock:
+        # A forked worker inherits the parent's pool object but not its threads
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=settings.EXTRACTION_WORKERS, initializer=_mark_worker)
+            _pool_pid = os.getpid()
+            logger.info(f"Started extraction pool with {settings.EXTRACTION_WORKERS} processes")
+        return _pool
+
+def shutdown_extraction_pool() -> None:
+    """Stop the shared extraction pool if it was started"""
+    global _pool
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+            logger.info("Extraction pool stopped")
@@ -0,0 +1,205 @@
+"""
+Sharded file storage for uploads, extracted text and processed analyses.
+
+Files are stored under a shard path derived from a hash of their name,
+e.g. ``processed/3f/a1/<run_id>_analysis.json``, so no directory grows
+past a few hundred entries however many files there are, and a file is
+found from its name with a single lookup.
+
+Files written before sharding (or with ``STORAGE_SHARD_DEPTH=0``) sit
+directly in the root. They are still found: lookups try the shard path
+first and then the root, and ``shard_storage.py`` moves them into their
+shards while the API is running.
+"""
+
+import os
+import hashlib
+import logging
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.config import settings
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Hex characters per shard directory level; 2 gives 256 directories per level
+SHARD_WIDTH = 2
+
+class FileStore:
+    """
+    Files addressed by name under a root directory.
+
+    Callers use the store rather than joining names onto the root, so the
+    on-disk layout can change without touching them.
+    """
+
+    def __init__(self, root: str, depth: Optional[int] = None):
+        """
+        Initialize the store.
+
+        Args:
+            root: Root directory
+            depth: Shard directory levels (defaults to settings.STORAGE_SHARD_DEPTH;
+                0 stores files directly in the root)
+        """
+        self.root = Path(root)
+        self.depth = settings.STORAGE_SHARD_DEPTH if depth is None else depth
+
+    def shard(self, name: str) -> Path:
+        """Shard directory of a name, relative to the root"""
+        digest = hashlib.sha1(name.encode("utf-8")).hexdigest()
+        return Path(*(digest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH] for level in range(self.depth)))
+
+    def path(self, name: str) -> Path:
+        """
+        Where a file is stored.
+
+        Args:
+            name: File name; only its last component is used, so names
+                taken from URLs stay inside the root
+
+        Returns:
+            The file's path in its shard
+        """
+        name = Path(name).name
+        return self.root / self.shard(name) / name
+
+    def legacy_path(self, name: str) -> Path:
+        """Where a file written before sharding is"""
+        return self.root / Path(name).name
+
+    def prepare(self, name: str) -> Path:
+        """Path to write a file to, creating its shard directory"""
+        path = self.path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def locate(self, name: str) -> Optional[Path]:
+        """
+        Find a stored file by name.
+
+        Args:
+            name: File name
+
+        Returns:
+            Its path, or None if there is no such file
+        """
+        path = self.path(name)
+        if path.is_file():
+            return path
+        legacy = self.legacy_path(name)
+        if legacy != path and legacy.is_file():
+            return legacy
+        # The file may have been moved into its shard between the two checks
+        return path if path.is_file() else None
+
+    def exists(self, name: str) -> bool:
+        """Whether a file is stored under this name"""
+        return self.locate(name) is not None
+
+    def delete(self, name: str) -> bool:
+        """
+        Delete a stored file.
+
+        Returns:
+            Whether a file was deleted
+        """
+        path = self.locate(name)
+        if path is None:
+            return False
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def is_sharded(self, path: Path) -> bool:
+        """Whether a file is at its shard path"""
+        return path == self.path(path.name)
+
+    def iter_files(self) -> Iterator[Path]:
+        """
+        Walk every stored file, in the root and in the shards.
+
+        This visits the whole store; lookups by name should use ``locate``.
+        """
+        yield from self._walk(self.root, self.depth)
+
+    def _walk(self, directory: Path, levels: int) -> Iterator[Path]:
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_file():
+                yield Path(entry.path)
+            elif levels > 0 and len(entry.name) == SHARD_WIDTH and entry.is_dir():
+                yield from self._walk(Path(entry.path), levels - 1)
+
+    def migrate(self, path: Path) -> Optional[Path]:
+        """
+        Move a file into its shard.
+
+        The move is a rename within the store, so readers see the file at
+        one of the two paths throughout.
+
+        Args:
+            path: A file in the root
+
+        Returns:
+            Its new path, or None if it was already in place or is gone
+        """
+        target = self.path(path.name)
+        if path == target:
+            return None
+        if target.exists():
+            # Written since sharding was enabled, so newer than the old copy
+            path.unlink(missing_ok=True)
+            return None
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(path, target)
+        except FileNotFoundError:
+            return None
+        logger.debug(f"Moved {path} to {target}")
+        return target
+
+def sync_file(f) -> None:
+    """
+    Flush a file being written, fsyncing it unless settings.PERSIST_FSYNC
+    is "none".
+
+    Args:
+        f: Open binary or text file
+    """
+    f.flush()
+    if settings.PERSIST_FSYNC.lower() != "none":
+        os.fsync(f.fileno())
+
+def sync_directory(directory) -> None:
+    """
+    Make renames into a directory durable when settings.PERSIST_FSYNC is
+    "always". Platforms that cannot fsync directories skip it.
+
+    Args:
+        directory: Directory a file was just renamed into
+    """
+    if settings.PERSIST_FSYNC.lower() != "always":
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError as e:
+        logger.debug(f"Cannot open {directory} to fsync it: {e}")
+        return
+    try:
+        os.fsync(fd)
+    except OSError as e:
+        logger.debug(f"Cannot fsync {directory}: {e}")
+    finally:
+        os.close(fd)
+
+# Shared stores
+upload_store = FileStore(settings.UPLOAD_DIR)
+text_store = FileStore(settings.TEXT_DIR)
+processed_store = FileStore(settings.PROCESSED_DIR)
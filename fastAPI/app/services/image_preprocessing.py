@@ -0,0 +1,334 @@
+"""
+Image preprocessing applied before OCR.
+
+Inputs range from 300 DPI scans to 12 megapixel phone photos, so instead
+of fixed settings the preprocessing measures the page: it estimates the
+text height, rescales so characters are the size Tesseract reads best,
+crops to the content, deskews, and picks binarization and page
+segmentation mode from what it finds.
+"""
+
+import logging
+from typing import Dict, Any, Tuple, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Resolution Tesseract is tuned for
+TARGET_DPI = 300
+
+# Longest side of a letter/A4 page scanned at TARGET_DPI, used when an image has no DPI
+MAX_PAGE_PIXELS = 3508
+
+# Median character height (pixels) Tesseract recognizes most reliably
+TARGET_TEXT_HEIGHT = 30
+
+# Limits on the rescale factor derived from the text height
+MIN_SCALE = 0.25
+MAX_SCALE = 2.0
+
+# Rescaling by less than this is not worth the interpolation cost
+SCALE_TOLERANCE = 0.15
+
+# Skew angles beyond this are more likely layout than a tilted page
+MAX_SKEW_DEGREES = 15.0
+
+# Margin kept around the detected content when cropping, in pixels
+CROP_MARGIN = 20
+
+# Tesseract page segmentation modes chosen from the layout
+PSM_AUTO = 3          # Multi-column page
+PSM_BLOCK = 6         # Single uniform block, e.g. a result table
+PSM_SPARSE = 11       # Scattered text, e.g. a photo with a few labels
+
+def load_grayscale(image_path: str) -> Tuple[np.ndarray, Optional[float]]:
+    """
+    Load an image as 8-bit grayscale.
+
+    Args:
+        image_path: Path to the image file
+
+    Returns:
+        Tuple of (grayscale array, horizontal DPI if the file records one)
+    """
+    with Image.open(image_path) as img:
+        dpi = img.info.get("dpi")
+        gray = np.array(img.convert("L"))
+    return gray, float(dpi[0]) if dpi and dpi[0] else None
+
+def downscale(gray: np.ndarray, dpi: Optional[float] = None, target_dpi: int = TARGET_DPI) -> Tuple[np.ndarray, float]:
+    """
+    Shrink an image to the target OCR resolution.
+
+    Images are never upscaled here. Without DPI information the longest side
+    is capped at the size of a page scanned at the target DPI, which is
+    what phone photos usually need.
+
+    Returns:
+        Tuple of (resized image, scale factor applied)
+    """
+    height, width = gray.shape[:2]
+    if dpi and dpi > target_dpi:
+        scale = target_dpi / dpi
+    else:
+        scale = MAX_PAGE_PIXELS / max(height, width)
+
+    if scale >= 1.0:
+        return gray, 1.0
+
+    return resize(gray, scale), scale
+
+def resize(image: np.ndarray, scale: float) -> np.ndarray:
+    """Resize an image by a factor, using area interpolation when shrinking"""
+    height, width = image.shape[:2]
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+    return cv2.resize(
+        image,
+        (max(1, int(width * scale)), max(1, int(height * scale))),
+        interpolation=interpolation
+    )
+
+def estimate_skew(binary: np.ndarray) -> float:
+    """
+    Estimate the skew angle of text in a binarized image.
+
+    Args:
+        binary: Image with dark text on a white background
+
+    Returns:
+        Angle in degrees to rotate by to straighten the text
+    """
+    coords = np.column_stack(np.where(binary < 128))
+    if len(coords) < 100:
+        return 0.0
+
+    angle = cv2.minAreaRect(coords[:, ::-1].astype(np.float32))[-1]
+    # minAreaRect reports angles in [0, 90) on newer OpenCV, [-90, 0) on older
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+
+    if abs(angle) > MAX_SKEW_DEGREES:
+        return 0.0
+    return float(angle)
+
+def rotate(image: np.ndarray, angle: float) -> np.ndarray:
+    """Rotate an image around its center, filling the corners with white"""
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(
+        image, matrix, (width, height),
+        flags=cv2.INTER_CUBIC,
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=255
+    )
+
+def has_uneven_lighting(gray: np.ndarray) -> bool:
+    """
+    Check whether the page background brightness varies, as in phone photos.
+
+    A global threshold cuts shadowed areas out of such pages, so they are
+    binarized with a local threshold instead.
+    """
+    small = resize(gray, min(1.0, 256 / max(gray.shape[:2])))
+    # Closing removes the text, leaving an estimate of the background
+    background = cv2.morphologyEx(small, cv2.MORPH_CLOSE, np.ones((15, 15), np.uint8))
+    return float(np.percentile(background, 95) - np.percentile(background, 5)) > 60
+
+def binarize(gray: np.ndarray, adaptive: bool = False) -> np.ndarray:
+    """
+    Convert a grayscale image to black text on white.
+
+    Args:
+        gray: Grayscale image
+        adaptive: Use a local threshold (uneven lighting) instead of Otsu's global one
+
+    Returns:
+        Binarized image
+    """
+    if adaptive:
+        return cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15
+        )
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return binary
+
+def text_components(binary: np.ndarray) -> np.ndarray:
+    """
+    Find connected components that look like characters.
+
+    Args:
+        binary: Image with dark text on a white background
+
+    Returns:
+        Array of [x, y, width, height] rows, one per character-like component
+    """
+    count, _, stats, _ = cv2.connectedComponentsWithStats(255 - binary, connectivity=8)
+    if count <= 1:
+        return np.empty((0, 4), dtype=np.int32)
+
+    # Skip the background label
+    stats = stats[1:]
+    x, y, w, h, area = stats.T
+    is_char = (
+        (h >= 4) & (h <= binary.shape[0] // 8)
+        & (w <= h * 5) & (area >= 8)
+        # Lines and boxes are thin relative to their extent
+        & (area >= 0.1 * w * h)
+    )
+    return stats[is_char][:, :4]
+
+def content_box(components: np.ndarray, shape: Tuple[int, int],
+                margin: int = CROP_MARGIN) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Bounding box of the text on a page.
+
+    Returns:
+        (x0, y0, x1, y1) including a margin, or None if there is no text
+    """
+    if len(components) < 10:
+        return None
+
+    # Rules, borders and specks are already filtered out of the components
+    x, y, w, h = components.T
+    x0, y0 = int(x.min()), int(y.min())
+    x1, y1 = int((x + w).max()), int((y + h).max())
+
+    height, width = shape
+    return (
+        max(0, x0 - margin),
+        max(0, y0 - margin),
+        min(width, x1 + margin),
+        min(height, y1 + margin)
+    )
+
+def choose_psm(components: np.ndarray, shape: Tuple[int, int]) -> int:
+    """
+    Pick a Tesseract page segmentation mode from the text layout.
+
+    Args:
+        components: Character-like components of the (cropped) page
+        shape: (height, width) of the page
+
+    Returns:
+        PSM_SPARSE for little scattered text, PSM_AUTO when a blank gutter
+        splits the page into columns, otherwise PSM_BLOCK
+    """
+    height, width = shape
+    if len(components) < 40:
+        return PSM_SPARSE
+
+    x, y, w, h = components.T
+    text_area = float((w * h).sum())
+    if text_area / (height * width) < 0.01:
+        return PSM_SPARSE
+
+    # Horizontal coverage of characters; a wide, empty vertical band in the
+    # middle of the page is a column gutter
+    edges = np.zeros(width + 1, dtype=np.int32)
+    np.add.at(edges, np.clip(x, 0, width), 1)
+    np.add.at(edges, np.clip(x + w, 0, width), -1)
+    coverage = np.cumsum(edges)[:-1]
+
+    middle = coverage[width // 5: width - width // 5]
+    gap_width = max(8, int(np.median(h)) * 3)
+    empty = middle < max(1, len(components) // 500)
+    run = 0
+    for is_empty in empty:
+        run = run + 1 if is_empty else 0
+        if run >= gap_width:
+            return PSM_AUTO
+    return PSM_BLOCK
+
+def tesseract_config(psm: int, dpi: int = TARGET_DPI, lang: Optional[str] = None) -> str:
+    """Build the Tesseract configuration string for a preprocessed page"""
+    config = f"--oem 3 --psm {psm}"
+    if lang:
+        config += f" -l {lang}"
+    return config + f" --dpi {dpi}"
+
+def preprocess_for_ocr(gray: np.ndarray, dpi: Optional[float] = None,
+                       options: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Adaptively prepare a grayscale page for OCR.
+
+    Steps: downscale oversized input, estimate the text height and rescale
+    to TARGET_TEXT_HEIGHT, crop to the content, deskew, binarize (locally
+    if the lighting is uneven) and choose the page segmentation mode.
+
+    Args:
+        gray: Grayscale page image
+        dpi: Resolution of the image, if known
+        options: Switches for individual steps (``rescale``, ``crop``,
+            ``deskew``, ``adaptive_threshold``, ``psm``) and the Tesseract
+            ``lang``; the step switches are used by the benchmarks
+
+    Returns:
+        Tuple of (binarized image, metadata including the Tesseract ``config``)
+    """
+    options = options or {}
+    metadata: Dict[str, Any] = {"original_size": [gray.shape[1], gray.shape[0]], "dpi": dpi}
+
+    gray, scale = downscale(gray, dpi)
+    adaptive = options.get("adaptive_threshold")
+    if adaptive is None:
+        adaptive = has_uneven_lighting(gray)
+    binary = binarize(gray, adaptive)
+    components = text_components(binary)
+
+    # Rescale so the median character is the height Tesseract reads best
+    text_height = float(np.median(components[:, 3])) if len(components) else 0.0
+    metadata["text_height"] = round(text_height, 1)
+    if options.get("rescale", True) and text_height:
+        factor = min(MAX_SCALE, max(MIN_SCALE, TARGET_TEXT_HEIGHT / text_height))
+        if abs(factor - 1.0) > SCALE_TOLERANCE:
+            gray = resize(gray, factor)
+            components = (components * factor).astype(np.int32)
+            scale *= factor
+
+    # Crop to the text, dropping scanner borders and photo backgrounds
+    if options.get("crop", True):
+        box = content_box(components, gray.shape[:2])
+        if box:
+            x0, y0, x1, y1 = box
+            gray = gray[y0:y1, x0:x1]
+            components = components - np.array([x0, y0, 0, 0], dtype=np.int32)
+            metadata["crop"] = [x0, y0, x1, y1]
+
+    binary = binarize(gray, adaptive)
+
+    angle = estimate_skew(binary) if options.get("deskew", True) else 0.0
+    if abs(angle) >= 0.1:
+        binary = binarize(rotate(gray, angle), adaptive)
+        components = text_components(binary)
+
+    psm = options.get("psm") or choose_psm(components, binary.shape[:2])
+
+    metadata.update({
+        "size": [binary.shape[1], binary.shape[0]],
+        "scale": round(scale, 4),
+        "skew_angle": round(angle, 2),
+        "binarization": "adaptive" if adaptive else "otsu",
+        "psm": psm,
+        "config": tesseract_config(psm, lang=options.get("lang"))
+    })
+    return binary, metadata
+
+def preprocess_image(image_path: str, options: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Load an image file and prepare it for OCR.
+
+    Args:
+        image_path: Path to the image file
+        options: Step switches, see ``preprocess_for_ocr``
+
+    Returns:
+        Tuple of (binarized image, metadata including the Tesseract ``config``)
+    """
+    gray, dpi = load_grayscale(image_path)
+    return preprocess_for_ocr(gray, dpi, options)
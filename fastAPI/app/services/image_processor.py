@@ -1,79 +1,155 @@
 import os
-import pytesseract
-from PIL import Image
+import time
 import logging
-from typing import Dict, Any, Optional
-from app.utils.text_cleaner import enhance_ocr_text
+from concurrent.futures import Executor
+from typing import Dict, Any, Optional, List, Tuple
+from app.utils.text_cleaner import enhance_ocr_text, normalize_whitespace
+from app.services.image_preprocessing import preprocess_image
+from app.services.extraction_pool import get_extraction_pool
+from app.services.ocr_cache import ocr_cache, cache_stats
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def process_image(image_path: str, output_text_path: Optional[str] = None) -> str:
+def process_image(image_path: str, output_text_path: Optional[str] = None, clean_text: bool = True) -> str:
     """
     Process an image file to extract text content using OCR.
-    
+
     Args:
         image_path: Path to the image file
         output_text_path: Optional path to save the extracted text
-        
+        clean_text: Whether to clean and normalize the extracted text
+
     Returns:
         The extracted text content
     """
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"Image file not found: {image_path}")
-    
+
     try:
-        # Open the image
-        img = Image.open(image_path)
-        
-        # Perform OCR
+        # Preprocess and OCR through the page cache, like the pages of a PDF
         logger.info(f"Performing OCR on image: {image_path}")
-        raw_text = pytesseract.image_to_string(img)
-        
-        # Clean and enhance the OCR text
-        text = enhance_ocr_text(raw_text)
-        
+        text, metadata = ocr_page_image(image_path, clean_text)
+        logger.info(
+            f"OCR of {image_path} took {metadata['timings']['total']:.2f}s"
+            f"{' (cached)' if metadata.get('cache_hit') else ''}"
+        )
+
         # Save the text to a file if specified
         if output_text_path:
             with open(output_text_path, "w", encoding="utf-8") as f:
                 f.write(text)
             logger.info(f"Extracted text saved to: {output_text_path}")
-        
+
         return text
-        
+
     except Exception as e:
         logger.error(f"Error processing image: {str(e)}")
         raise Exception(f"Error processing image: {str(e)}")
-    
-def process_multiple_images(image_paths: list, output_text_path: Optional[str] = None) -> str:
+
+def ocr_page_image(image_path: str, clean_text: bool = True) -> Tuple[str, Dict[str, Any]]:
     """
-    Process multiple image files and combine the extracted text.
-    
+    Preprocess and OCR one page image.
+
+    Runs in an extraction pool worker, so the preprocessing of each page
+    happens in parallel with the others.
+
     Args:
-        image_paths: List of paths to image files
-        output_text_path: Optional path to save the combined extracted text
-        
+        image_path: Path to the page image
+        clean_text: Whether to clean and normalize the page text
+
     Returns:
-        The combined extracted text content
+        Tuple of (page text, page metadata with timings)
+    """
+    start = time.perf_counter()
+    image, metadata = preprocess_image(image_path)
+    preprocess_time = time.perf_counter() - start
+
+    ocr_start = time.perf_counter()
+    raw_text, metadata["cache_hit"] = ocr_cache.image_to_string(image, metadata["config"])
+    ocr_time = time.perf_counter() - ocr_start
+
+    text = enhance_ocr_text(raw_text) if clean_text else raw_text
+    metadata["timings"] = {
+        "preprocess": round(preprocess_time, 4),
+        "ocr": round(ocr_time, 4),
+        "total": round(time.perf_counter() - start, 4)
+    }
+    return text, metadata
+
+def extract_text_from_images(image_paths: List[str], clean_text: bool = True,
+                             executor: Optional[Executor] = None) -> Tuple[str, Dict[str, Any]]:
     """
+    OCR the page images of one document in parallel.
+
+    Pages are processed in the shared extraction pool (or ``executor``) and
+    combined in the order given.
+
+    Args:
+        image_paths: Paths to the page images, in page order
+        clean_text: Whether to clean and normalize each page's text
+        executor: Executor to run pages in (defaults to the shared extraction pool)
+
+    Returns:
+        Tuple of (combined text, metadata with per-page timings)
+    """
+    if executor is None:
+        executor = get_extraction_pool()
+
+    start = time.perf_counter()
+    futures = [executor.submit(ocr_page_image, image_path, clean_text) for image_path in image_paths]
+
     combined_text = ""
-    
-    for idx, image_path in enumerate(image_paths):
+    pages = []
+    for idx, (image_path, future) in enumerate(zip(image_paths, futures)):
         try:
-            text = process_image(image_path)
+            text, page_metadata = future.result()
             combined_text += f"\n--- Page {idx+1} ---\n{text}\n"
+            pages.append({"page": idx + 1, "path": image_path, **page_metadata})
         except Exception as e:
             logger.error(f"Error processing image {image_path}: {str(e)}")
             combined_text += f"\n--- Page {idx+1} (Error) ---\nError: {str(e)}\n"
-    
-    # Final cleanup of the combined text to ensure consistent formatting
-    combined_text = enhance_ocr_text(combined_text)
-    
+            pages.append({"page": idx + 1, "path": image_path, "error": str(e)})
+
+    metadata = {
+        "page_count": len(image_paths),
+        "ocr_used": True,
+        "pages": pages,
+        "extraction_duration": round(time.perf_counter() - start, 4),
+        "ocr_time_total": round(sum(p.get("timings", {}).get("total", 0) for p in pages), 4)
+    }
+    hits = sum(1 for page in pages if page.get("cache_hit"))
+    metadata["ocr_cache"] = cache_stats(hits, sum(1 for page in pages if "cache_hit" in page) - hits)
+    return combined_text, metadata
+
+def process_multiple_images(image_paths: list, output_text_path: Optional[str] = None,
+                            clean_text: bool = True, executor: Optional[Executor] = None) -> str:
+    """
+    Process multiple image files and combine the extracted text.
+
+    Args:
+        image_paths: List of paths to image files
+        output_text_path: Optional path to save the combined extracted text
+        clean_text: Whether to clean and normalize the extracted text
+        executor: Executor to run pages in (defaults to the shared extraction pool)
+
+    Returns:
+        The combined extracted text content
+    """
+    combined_text, metadata = extract_text_from_images(image_paths, clean_text, executor)
+    logger.info(
+        f"OCR of {metadata['page_count']} pages took {metadata['extraction_duration']:.2f}s "
+        f"({metadata['ocr_time_total']:.2f}s of page work)"
+    )
+
+    # Pages are already cleaned individually; only tidy the whitespace around the page markers
+    combined_text = normalize_whitespace(combined_text)
+
     # Save the combined text to a file if specified
     if output_text_path and combined_text:
         with open(output_text_path, "w", encoding="utf-8") as f:
             f.write(combined_text)
         logger.info(f"Combined extracted text saved to: {output_text_path}")
-    
-    return combined_text 
\ No newline at end of file
+
+    return combined_text
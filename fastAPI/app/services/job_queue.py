@@ -0,0 +1,178 @@
+"""
+Background job queue for report analysis
+"""
+
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.analysis_pipeline import analyze_saved_file, complete_stored_run
+from app.services.document_processor import FileInfo
+from app.services.run_store import run_store, update_run
+from app.utils.metrics import StageTimer, registry
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class JobQueue:
+    """
+    Asyncio worker pool that processes analysis jobs off the request path.
+
+    Jobs are described by the ``job`` parameters stored with each run, so a
+    job that was queued or in progress when the server stopped is picked up
+    again on the next start.
+    """
+
+    def __init__(self, workers: Optional[int] = None, executor_workers: Optional[int] = None,
+                 max_size: Optional[int] = None):
+        """
+        Initialize the job queue.
+
+        Args:
+            workers: Number of concurrent jobs (defaults to settings.JOB_WORKERS)
+            executor_workers: Threads for blocking stages (defaults to settings.JOB_EXECUTOR_WORKERS)
+            max_size: Maximum number of queued jobs (defaults to settings.JOB_QUEUE_SIZE)
+        """
+        self.workers = workers or settings.JOB_WORKERS
+        self.executor_workers = executor_workers or settings.JOB_EXECUTOR_WORKERS
+        self.max_size = max_size or settings.JOB_QUEUE_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self) -> None:
+        """Start the workers and resume runs left unfinished by a previous process."""
+        if self.running:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.executor_workers,
+            thread_name_prefix="analysis-job"
+        )
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"analysis-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+        self._resume_incomplete()
+
+    async def stop(self) -> None:
+        """Stop the workers. Unfinished runs stay in the store and resume on next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        logger.info("Job queue stopped")
+
+    def submit(self, run_id: str) -> None:
+        """
+        Enqueue a run for processing.
+
+        Args:
+            run_id: Identifier of a run created with job parameters
+
+        Raises:
+            HTTPException: If the queue is not running or is full
+        """
+        if not self.running:
+            raise HTTPException(status_code=503, detail="Job queue is not running")
+
+        try:
+            self._queue.put_nowait(run_id)
+        except asyncio.QueueFull:
+            update_run(run_id, status="failed", error="Job queue is full")
+            raise HTTPException(
+                status_code=503,
+                detail="Too many reports are being processed. Please try again later."
+            )
+
+    def _resume_incomplete(self) -> None:
+        for run_data in run_store.list_incomplete():
+            run_id = run_data["run_id"]
+            job = run_data.get("job") or {}
+            file_path = job.get("file_path")
+
+            # A run that stored its analysis keeps it; responses for the run
+            # are cached as immutable
+            if complete_stored_run(run_id):
+                logger.info(f"Interrupted run {run_id} had stored its analysis; marked completed")
+                continue
+
+            if not file_path or not Path(file_path).exists():
+                update_run(run_id, status="failed", error="Run was interrupted and its upload is no longer available")
+                continue
+
+            logger.info(f"Resuming interrupted run {run_id} (was {run_data.get('status')})")
+            update_run(run_id, status="queued")
+            try:
+                self._queue.put_nowait(run_id)
+            except asyncio.QueueFull:
+                update_run(run_id, status="failed", error="Job queue is full")
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            run_id = await self._queue.get()
+            try:
+                await self._process(run_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[{run_id}] Worker {index} failed to process job: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, run_id: str) -> None:
+        run_data = run_store.get(run_id)
+        if run_data is None:
+            logger.warning(f"Queued run {run_id} no longer exists")
+            return
+
+        job: Dict[str, Any] = run_data.get("job") or {}
+        try:
+            await analyze_saved_file(
+                run_id=run_id,
+                document_id=job["document_id"],
+                file_path=Path(job["file_path"]),
+                original_filename=run_data.get("filename", "document"),
+                provider=run_data["provider"],
+                model=run_data["model"],
+                context=job.get("context"),
+                executor=self._executor,
+                start_time=run_data.get("start_time", time.time()),
+                timer=StageTimer(job.get("stage_durations")),
+                file_info=FileInfo.from_dict(job["file_info"]) if job.get("file_info") else None
+            )
+        except HTTPException as e:
+            # The pipeline records its own failures; make sure the run is terminal
+            update_run(run_id, status="failed", error=str(e.detail))
+        except Exception as e:
+            logger.error(f"[{run_id}] Error processing report: {str(e)}", exc_info=True)
+            update_run(run_id, status="failed", error=str(e))
+
+# Shared queue instance, started with the application
+job_queue = JobQueue()
+
+registry.gauge(
+    "analysis_jobs_queued",
+    "Analysis jobs waiting for a worker",
+    function=lambda: job_queue.pending
+)
@@ -0,0 +1,588 @@
+"""
+Longitudinal store of lab values for per-patient trends.
+
+Every completed analysis appends its numeric results to its patient's
+series: one row per (canonical parameter, unit, report date, value, run).
+A patient's series is kept as a single columnar ``.npz`` blob in the
+"trends" area, sorted by parameter, unit and date, so a trend query reads
+one small blob and computes rolling means, percent changes and
+least-squares slopes for every parameter at once with numpy, without
+opening any report.
+
+Patients are identified by the analysis' ``metadata.user_id``, else the
+patient ID on the report, else the patient's name (see ``patient_key``).
+Re-recording a run replaces its rows, so appends are idempotent.
+"""
+
+import io
+import re
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.blob_store import BlobStore, get_blob_store
+from app.services.reference_ranges import parse_value, report_parameters
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+SERIES_SUFFIX = ".npz"
+SECONDS_PER_DAY = 86400.0
+# Relative change over a series below which it is reported as stable
+STABLE_CHANGE = 0.02
+
+# Report date formats seen in analyses, tried after ISO 8601
+DATE_FORMATS = ["%d/%m/%Y", "%d-%m-%Y", "%m/%d/%Y", "%d.%m.%Y", "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y"]
+
+# Common names of the same test, after folding (see ``canonical_parameter``)
+PARAMETER_ALIASES = {
+    "hb": "hemoglobin",
+    "hgb": "hemoglobin",
+    "haemoglobin": "hemoglobin",
+    "hct": "hematocrit",
+    "haematocrit": "hematocrit",
+    "pcv": "hematocrit",
+    "packed cell volume": "hematocrit",
+    "wbc": "white blood cells",
+    "wbc count": "white blood cells",
+    "total wbc count": "white blood cells",
+    "total leukocyte count": "white blood cells",
+    "tlc": "white blood cells",
+    "white blood cell count": "white blood cells",
+    "rbc": "red blood cells",
+    "rbc count": "red blood cells",
+    "red blood cell count": "red blood cells",
+    "plt": "platelets",
+    "platelet count": "platelets",
+    "fbs": "fasting glucose",
+    "fasting blood sugar": "fasting glucose",
+    "glucose fasting": "fasting glucose",
+    "fasting plasma glucose": "fasting glucose",
+    "blood glucose fasting": "fasting glucose",
+    "ppbs": "postprandial glucose",
+    "glucose pp": "postprandial glucose",
+    "post prandial blood sugar": "postprandial glucose",
+    "glycated hemoglobin": "hba1c",
+    "glycosylated hemoglobin": "hba1c",
+    "hemoglobin a1c": "hba1c",
+    "a1c": "hba1c",
+    "total cholesterol": "cholesterol",
+    "cholesterol total": "cholesterol",
+    "serum cholesterol": "cholesterol",
+    "ldl cholesterol": "ldl",
+    "ldl c": "ldl",
+    "hdl cholesterol": "hdl",
+    "hdl c": "hdl",
+    "serum triglycerides": "triglycerides",
+    "sgpt": "alt",
+    "alanine aminotransferase": "alt",
+    "sgot": "ast",
+    "aspartate aminotransferase": "ast",
+    "serum creatinine": "creatinine",
+    "blood urea nitrogen": "bun",
+    "thyroid stimulating hormone": "tsh",
+    "vitamin d 25 hydroxy": "vitamin d",
+    "25 oh vitamin d": "vitamin d",
+    "25 hydroxy vitamin d": "vitamin d",
+    "vitamin b12 cobalamin": "vitamin b12",
+    "serum ferritin": "ferritin",
+    "c reactive protein": "crp",
+}
+
+def fold(text: str) -> str:
+    """Lowercase text and strip its diacritics"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+def _words(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+def canonical_parameter(name: str) -> str:
+    """
+    Canonical name of a test parameter, so the same test is one series
+    across labs and report layouts.
+
+    Names are folded to lowercase words and looked up in PARAMETER_ALIASES,
+    first whole and then without parenthesized parts ("Hemoglobin (Hb)").
+
+    Args:
+        name: Parameter name as on the report
+
+    Returns:
+        The canonical name, or "" if the name has no words
+    """
+    full = _words(fold(name))
+    base = _words(re.sub(r"\(.*?\)", " ", fold(name)))
+    for key in (full, base):
+        if key in PARAMETER_ALIASES:
+            return PARAMETER_ALIASES[key]
+    return base or full
+
+def patient_key(analysis: Dict[str, Any]) -> Optional[str]:
+    """
+    Key of the patient an analysis belongs to.
+
+    Args:
+        analysis: Processed analysis
+
+    Returns:
+        ``metadata.user_id``, else the patient ID on the report, else the
+        patient's name folded to lowercase words; None if there is none
+    """
+    user_id = (analysis.get("metadata") or {}).get("user_id")
+    if user_id:
+        return str(user_id)
+    patient = analysis.get("patient_info") or analysis.get("patient") or analysis.get("patient_information") or {}
+    if not isinstance(patient, dict):
+        return None
+    for field in ("id", "patient_id"):
+        if patient.get(field):
+            return str(patient[field])
+    name = _words(fold(str(patient.get("name") or "")))
+    return name if name and name != "unknown" else None
+
+def parse_report_date(text: Any) -> Optional[datetime]:
+    """
+    Parse a report date.
+
+    Args:
+        text: Date as in the analysis, e.g. "2024-03-01", "01/03/2024" or an
+            ISO timestamp
+
+    Returns:
+        The date, or None if it cannot be parsed
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None
+    text = text.strip()
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        return parsed.replace(tzinfo=None)
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+    return None
+
+def to_seconds(moment: datetime) -> int:
+    """Seconds since the epoch of a naive datetime, as stored in series"""
+    return int(np.datetime64(moment.replace(tzinfo=None), "s").astype(np.int64))
+
+def report_points(analysis: Dict[str, Any]) -> Tuple[Optional[str], List[Tuple[str, str, int, float, str]]]:
+    """
+    Numeric results of an analysis as series rows.
+
+    Args:
+        analysis: Processed analysis
+
+    Returns:
+        Tuple of (patient key, rows of (parameter, unit, timestamp, value,
+        run_id)); no rows if the patient, date or run is unknown
+    """
+    patient = patient_key(analysis)
+    metadata = analysis.get("metadata") or {}
+    report_info = analysis.get("report_info") or analysis.get("report_information") or {}
+    test_info = analysis.get("test_info") or {}
+    file_info = analysis.get("file_info") or {}
+    run_id = metadata.get("run_id") or file_info.get("file_id") or report_info.get("report_id")
+    date = (
+        parse_report_date(report_info.get("report_date"))
+        or parse_report_date(test_info.get("date"))
+        or parse_report_date(metadata.get("processing_timestamp"))
+    )
+    if patient is None or date is None or not run_id:
+        return patient, []
+
+    timestamp = to_seconds(date)
+    rows = []
+    for param in report_parameters(analysis):
+        value = parse_value(param["value"])
+        parameter = canonical_parameter(str(param["name"]))
+        if parameter and np.isfinite(value):
+            rows.append((parameter, str(param["unit"]).strip(), timestamp, value, str(run_id)))
+    return patient, rows
+
+class LabSeries:
+    """
+    Columnar lab values of one patient.
+
+    Strings are dictionary-encoded: ``parameters``, ``units`` and ``runs``
+    hold int32 codes into ``parameter_names``, ``unit_names`` and
+    ``run_ids``. Rows are sorted by parameter, unit and timestamp.
+    """
+
+    COLUMNS = ("parameters", "units", "timestamps", "values", "runs")
+    DICTIONARIES = ("parameter_names", "unit_names", "run_ids")
+
+    def __init__(self, patient: str, **arrays: np.ndarray):
+        self.patient = patient
+        self.parameters = arrays["parameters"]
+        self.units = arrays["units"]
+        self.timestamps = arrays["timestamps"]
+        self.values = arrays["values"]
+        self.runs = arrays["runs"]
+        self.parameter_names = arrays["parameter_names"]
+        self.unit_names = arrays["unit_names"]
+        self.run_ids = arrays["run_ids"]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @classmethod
+    def from_rows(cls, patient: str, rows: List[Tuple[str, str, int, float, str]]) -> "LabSeries":
+        """Build a series from (parameter, unit, timestamp, value, run_id) rows"""
+        parameters, units, timestamps, values, runs = zip(*rows) if rows else ((), (), (), (), ())
+        return cls.from_columns(
+            patient,
+            np.array(parameters, dtype=str),
+            np.array(units, dtype=str),
+            np.array(timestamps, dtype=np.int64),
+            np.array(values, dtype=np.float64),
+            np.array(runs, dtype=str)
+        )
+
+    @classmethod
+    def from_columns(cls, patient: str, parameters: np.ndarray, units: np.ndarray, timestamps: np.ndarray,
+                     values: np.ndarray, runs: np.ndarray) -> "LabSeries":
+        """Build a series from decoded columns"""
+        parameter_names, parameter_codes = np.unique(parameters, return_inverse=True)
+        unit_names, unit_codes = np.unique(units, return_inverse=True)
+        run_ids, run_codes = np.unique(runs, return_inverse=True)
+        order = np.lexsort((timestamps, unit_codes, parameter_codes))
+        return cls(
+            patient,
+            parameters=parameter_codes.astype(np.int32)[order],
+            units=unit_codes.astype(np.int32)[order],
+            timestamps=timestamps[order],
+            values=values[order],
+            runs=run_codes.astype(np.int32)[order],
+            parameter_names=parameter_names,
+            unit_names=unit_names,
+            run_ids=run_ids
+        )
+
+    def rows(self) -> List[Tuple[str, str, int, float, str]]:
+        """The series as (parameter, unit, timestamp, value, run_id) rows"""
+        return list(zip(
+            self.parameter_names[self.parameters].tolist(),
+            self.unit_names[self.units].tolist(),
+            self.timestamps.tolist(),
+            self.values.tolist(),
+            self.run_ids[self.runs].tolist()
+        ))
+
+    def merge(self, rows: List[Tuple[str, str, int, float, str]]) -> "LabSeries":
+        """A series with rows added, replacing earlier rows of the same runs"""
+        added = LabSeries.from_rows(self.patient, rows)
+        kept = ~np.isin(self.runs, np.flatnonzero(np.isin(self.run_ids, added.run_ids)))
+        return LabSeries.from_columns(
+            self.patient,
+            np.concatenate((self.parameter_names[self.parameters[kept]], added.parameter_names[added.parameters])),
+            np.concatenate((self.unit_names[self.units[kept]], added.unit_names[added.units])),
+            np.concatenate((self.timestamps[kept], added.timestamps)),
+            np.concatenate((self.values[kept], added.values)),
+            np.concatenate((self.run_ids[self.runs[kept]], added.run_ids[added.runs]))
+        )
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            patient=np.array(self.patient),
+            **{name: getattr(self, name) for name in self.COLUMNS + self.DICTIONARIES}
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LabSeries":
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            return cls(str(arrays["patient"]), **{name: arrays[name] for name in cls.COLUMNS + cls.DICTIONARIES})
+
+    def trends(self, parameters: Optional[Iterable[str]] = None, start: Optional[datetime] = None,
+               end: Optional[datetime] = None, window: int = 3) -> List[Dict[str, Any]]:
+        """
+        Trend of each parameter (and unit) over a period.
+
+        Statistics are computed for all parameters at once: per-series sums
+        with ``np.bincount`` give least-squares slopes and r², and a cumulative
+        sum gives rolling means.
+
+        Args:
+            parameters: Parameter names (canonicalized) to include; None for all
+            start: Earliest report date to include
+            end: Latest report date to include
+            window: Number of measurements in each rolling mean
+
+        Returns:
+            One trend per series, with data points, rolling means, percent
+            changes, slope per day and direction
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if parameters is not None:
+            wanted = {canonical_parameter(name) for name in parameters}
+            mask &= np.isin(self.parameters, np.flatnonzero(np.isin(self.parameter_names, list(wanted))))
+        if start is not None:
+            mask &= self.timestamps >= to_seconds(start)
+        if end is not None:
+            mask &= self.timestamps <= to_seconds(end)
+
+        codes, units = self.parameters[mask], self.units[mask]
+        timestamps, values, runs = self.timestamps[mask], self.values[mask], self.runs[mask]
+        if not len(values):
+            return []
+
+        # Series boundaries; rows are already sorted by parameter, unit and time
+        key = codes.astype(np.int64) * len(self.unit_names) + units
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(key)) + 1))
+        ends = np.concatenate((starts[1:], [len(key)]))
+        counts = ends - starts
+        series = np.repeat(np.arange(len(starts)), counts)
+
+        # Least-squares slope per series, in value units per day
+        days = (timestamps - timestamps[starts][series]) / SECONDS_PER_DAY
+        sum_x = np.bincount(series, days)
+        sum_y = np.bincount(series, values)
+        sum_xx = np.bincount(series, days * days)
+        sum_xy = np.bincount(series, days * values)
+        sum_yy = np.bincount(series, values * values)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            var_x = counts * sum_xx - sum_x ** 2
+            var_y = counts * sum_yy - sum_y ** 2
+            cov = counts * sum_xy - sum_x * sum_y
+            slopes = np.where(var_x > 0, cov / var_x, np.nan)
+            r_squared = np.where((var_x > 0) & (var_y > 0), cov ** 2 / (var_x * var_y), np.nan)
+
+            # Change of each point from the previous one, and over the series
+            previous = np.concatenate(([np.nan], values[:-1]))
+            previous[starts] = np.nan
+            point_change = (values - previous) / np.abs(previous) * 100
+            first, last = values[starts], values[ends - 1]
+            total_change = np.where(first != 0, (last - first) / np.abs(first) * 100, np.nan)
+            span = days[ends - 1]
+            relative = slopes * span / np.abs(sum_y / counts)
+
+        # Rolling mean over the last `window` points of the same series
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        index = np.arange(len(values))
+        lower = np.maximum(index - window + 1, starts[series])
+        rolling = (cumulative[index + 1] - cumulative[lower]) / (index + 1 - lower)
+
+        # Columns as lists, so building the response does not touch numpy scalars
+        dates = timestamps.astype("datetime64[s]").astype(str).tolist()
+        run_ids = self.run_ids[runs].tolist()
+        value_list = values.tolist()
+        rolling_list = np.round(rolling, 4).tolist()
+        change_list = _nullable(point_change)
+        trends = []
+        for i, (s, e) in enumerate(zip(starts.tolist(), ends.tolist())):
+            if counts[i] < 2:
+                direction = "insufficient_data"
+            elif not np.isfinite(relative[i]) or abs(relative[i]) < STABLE_CHANGE:
+                direction = "stable"
+            else:
+                direction = "increasing" if relative[i] > 0 else "decreasing"
+            trends.append({
+                "metric": str(self.parameter_names[codes[s]]),
+                "unit": str(self.unit_names[units[s]]),
+                "data_points": [
+                    {
+                        "timestamp": dates[j],
+                        "value": value_list[j],
+                        "rolling_mean": rolling_list[j],
+                        "change_percent": change_list[j],
+                        "run_id": run_ids[j]
+                    }
+                    for j in range(s, e)
+                ],
+                "trend": direction,
+                "change_rate": _finite(total_change[i]),
+                "slope_per_day": _finite(slopes[i], 6),
+                "r_squared": _finite(r_squared[i]),
+                "measurements": int(counts[i])
+            })
+        return trends
+
+    def latest(self, start: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Latest value of each parameter (and unit), with its change from the
+        measurement before.
+
+        Args:
+            start: Only consider measurements from this date on
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.timestamps >= to_seconds(start)
+        codes, units, timestamps, values = self.parameters[mask], self.units[mask], self.timestamps[mask], self.values[mask]
+        if not len(values):
+            return []
+
+        key = codes.astype(np.int64) * len(self.unit_names) + units
+        ends = np.concatenate((np.flatnonzero(np.diff(key)), [len(key) - 1]))
+        has_previous = np.concatenate(([False], key[1:] == key[:-1]))[ends]
+        previous = values[np.maximum(ends - 1, 0)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = np.where(has_previous & (previous != 0), (values[ends] - previous) / np.abs(previous) * 100, np.nan)
+        dates = timestamps[ends].astype("datetime64[s]").astype(str).tolist()
+        return [
+            {
+                "metric": str(self.parameter_names[codes[i]]),
+                "unit": str(self.unit_names[units[i]]),
+                "value": float(values[i]),
+                "timestamp": dates[n],
+                "change_percent": _finite(change[n])
+            }
+            for n, i in enumerate(ends.tolist())
+        ]
+
+def _finite(value: float, digits: int = 2) -> Optional[float]:
+    return round(float(value), digits) if np.isfinite(value) else None
+
+def _nullable(values: np.ndarray, digits: int = 2) -> List[Optional[float]]:
+    return np.where(np.isfinite(values), np.round(values, digits), None).tolist()
+
+class LabSeriesStore:
+    """
+    Per-patient lab series in the "trends" blob area, with an LRU cache of
+    parsed series checked against the blob version.
+    """
+
+    def __init__(self, store: Optional[BlobStore] = None, max_entries: Optional[int] = None):
+        """
+        Initialize the store.
+
+        Args:
+            store: Blob store for the series (defaults to the "trends" area)
+            max_entries: Parsed series kept in memory (defaults to settings.LAB_SERIES_CACHE_ENTRIES)
+        """
+        self._store = store
+        self.max_entries = settings.LAB_SERIES_CACHE_ENTRIES if max_entries is None else max_entries
+        self._cache: "OrderedDict[str, Tuple[str, LabSeries]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @property
+    def store(self) -> BlobStore:
+        if self._store is None:
+            self._store = get_blob_store("trends")
+        return self._store
+
+    @staticmethod
+    def _name(patient: str) -> str:
+        # Patient keys are free text; hash them into safe blob names
+        return hashlib.sha1(patient.encode("utf-8")).hexdigest() + SERIES_SUFFIX
+
+    def _remember(self, patient: str, version: str, series: LabSeries) -> None:
+        with self._lock:
+            self._cache[patient] = (version, series)
+            self._cache.move_to_end(patient)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def load(self, patient: str) -> Optional[LabSeries]:
+        """
+        The series of a patient.
+
+        Returns:
+            The series, or None if no results were recorded for the patient
+        """
+        name = self._name(patient)
+        info = self.store.stat(name)
+        if info is None:
+            return None
+        with self._lock:
+            cached = self._cache.get(patient)
+            if cached is not None and cached[0] == info.version:
+                self._cache.move_to_end(patient)
+                return cached[1]
+        try:
+            series = LabSeries.from_bytes(self.store.get(name))
+        except FileNotFoundError:
+            return None
+        self._remember(patient, info.version, series)
+        return series
+
+    def find(self, user: str) -> Optional[LabSeries]:
+        """
+        The series of a user ID or patient ID, or of a patient name as written
+        on their reports (names are keyed folded to lowercase words).
+        """
+        series = self.load(user)
+        name = _words(fold(user))
+        if series is None and name and name != user:
+            series = self.load(name)
+        return series
+
+    def append(self, patient: str, rows: List[Tuple[str, str, int, float, str]]) -> None:
+        """
+        Add rows to a patient's series, replacing earlier rows of the same runs.
+
+        Args:
+            patient: Patient key
+            rows: (parameter, unit, timestamp, value, run_id) rows
+        """
+        if not rows:
+            return
+        with self._write_lock:
+            current = self.load(patient)
+            series = current.merge(rows) if current is not None else LabSeries.from_rows(patient, rows)
+            info = self.store.put(self._name(patient), series.to_bytes())
+            self._remember(patient, info.version, series)
+
+    def append_reports(self, analyses: Iterable[Any]) -> int:
+        """
+        Add the results of analyses to their patients' series, writing each
+        patient's series once.
+
+        Args:
+            analyses: Processed analyses; documents that are not JSON objects
+                or have no patient, date or run are skipped
+
+        Returns:
+            Number of rows added
+        """
+        by_patient: Dict[str, List[Tuple[str, str, int, float, str]]] = {}
+        for analysis in analyses:
+            if not isinstance(analysis, dict):
+                continue
+            patient, rows = report_points(analysis)
+            if rows:
+                by_patient.setdefault(patient, []).extend(rows)
+
+        for patient, rows in by_patient.items():
+            self.append(patient, rows)
+        return sum(len(rows) for rows in by_patient.values())
+
+    def delete(self, patient: str) -> bool:
+        """Remove a patient's series"""
+        with self._write_lock, self._lock:
+            self._cache.pop(patient, None)
+            return self.store.delete(self._name(patient))
+
+    def clear(self) -> int:
+        """
+        Remove every patient's series.
+
+        Returns:
+            Number of series removed
+        """
+        removed = 0
+        with self._write_lock, self._lock:
+            self._cache.clear()
+            for info in list(self.store.list()):
+                if info.key.endswith(SERIES_SUFFIX) and self.store.delete(info.key):
+                    removed += 1
+        return removed
+
+# Shared store instance
+lab_series = LabSeriesStore()
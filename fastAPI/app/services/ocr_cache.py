@@ -0,0 +1,185 @@
+"""
+Disk cache of OCR results keyed by page image
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Tuple, List
+
+import numpy as np
+import pytesseract
+
+from app.config import settings
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Check the cache size after this many writes rather than on every one
+EVICTION_INTERVAL = 50
+
+class OCRCache:
+    """
+    Page-level OCR cache stored as one text file per page.
+
+    Entries are keyed by a SHA-256 of the preprocessed page raster plus the
+    Tesseract configuration and version, so a re-uploaded scan or
+    re-exported PDF reuses the text of every page that renders the same,
+    even though the file bytes differ. The least recently used entries
+    are evicted when the cache grows past its size limit.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory for cached pages (defaults to settings.OCR_CACHE_DIR)
+            max_bytes: Size limit in bytes (defaults to settings.OCR_CACHE_MAX_MB)
+            enabled: Whether to use the cache (defaults to settings.OCR_CACHE_ENABLED)
+        """
+        self.cache_dir = Path(cache_dir or settings.OCR_CACHE_DIR)
+        self.max_bytes = max_bytes or settings.OCR_CACHE_MAX_MB * 1024 * 1024
+        self.enabled = settings.OCR_CACHE_ENABLED if enabled is None else enabled
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._tesseract_version: Optional[str] = None
+
+    def _version(self) -> str:
+        if self._tesseract_version is None:
+            try:
+                self._tesseract_version = str(pytesseract.get_tesseract_version())
+            except Exception:
+                self._tesseract_version = "unknown"
+        return self._tesseract_version
+
+    def key(self, image: np.ndarray, config: str) -> str:
+        """
+        Build the cache key for a preprocessed page.
+
+        Args:
+            image: Preprocessed page raster
+            config: Tesseract configuration string
+
+        Returns:
+            Hex digest identifying the page and OCR settings
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{image.shape}|{image.dtype}|{config}|{self._version()}".encode())
+        digest.update(np.ascontiguousarray(image).data)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.txt"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text for a key, marking it as recently used"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Error reading OCR cache entry {key}: {e}")
+            return None
+
+        try:
+            # The modification time doubles as the last-used time for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        """Store the text for a key, evicting old entries if the cache is full"""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Error writing OCR cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % EVICTION_INTERVAL == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache is under 90% of its limit.
+
+        Returns:
+            Number of entries deleted
+        """
+        entries: List[Tuple[float, int, Path]] = []
+        total = 0
+        for path in self.cache_dir.glob("*/*.txt"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+
+        logger.info(f"Evicted {removed} OCR cache entries")
+        return removed
+
+    def image_to_string(self, image: np.ndarray, config: str) -> Tuple[str, bool]:
+        """
+        OCR a preprocessed page, using the cached text when available.
+
+        Args:
+            image: Preprocessed page raster
+            config: Tesseract configuration string
+
+        Returns:
+            Tuple of (page text, whether it came from the cache)
+        """
+        if not self.enabled:
+            return pytesseract.image_to_string(image, config=config), False
+
+        key = self.key(image, config)
+        text = self.get(key)
+        if text is not None:
+            return text, True
+
+        text = pytesseract.image_to_string(image, config=config)
+        self.put(key, text)
+        return text, False
+
+def cache_stats(hits: int, misses: int) -> dict:
+    """Summarize cache use for extraction metadata"""
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 3) if total else 0.0
+    }
+
+# Shared cache instance (one per process)
+ocr_cache = OCRCache()
@@ -1,45 +1,139 @@
 import fitz  # PyMuPDF
 import os
-from typing import Optional
-from app.utils.text_cleaner import enhance_ocr_text
+import math
+import logging
+from concurrent.futures import Executor
+from typing import Optional, Iterator, List, Tuple
+from app.config import settings
+from app.utils.text_cleaner import normalize_ocr_stream
+from app.services.extraction_pool import get_extraction_pool, in_extraction_worker
 
-def process_pdf(pdf_path: str, output_text_path: Optional[str] = None, clean_text: bool = True) -> str:
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Smallest page range handed to a worker; opening the document in each
+# worker costs about as much as extracting a few pages
+MIN_RANGE_PAGES = 8
+
+# Ranges per worker, so the first pages are ready early and a slow range
+# does not leave the other workers idle
+RANGES_PER_WORKER = 4
+
+def page_count(pdf_path: str) -> int:
+    """Number of pages in a PDF"""
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+def extract_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    """
+    Extract the text of pages [start, stop) of a PDF.
+
+    Runs in an extraction pool worker, which opens its own document since
+    PyMuPDF documents cannot be shared between processes.
+
+    Args:
+        pdf_path: Path to the PDF file
+        start: First page (0-based)
+        stop: Page after the last one
+
+    Returns:
+        The text of each page, in order
+    """
+    with fitz.open(pdf_path) as doc:
+        return [doc.load_page(page_num).get_text() for page_num in range(start, stop)]
+
+def page_ranges(count: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    Split pages into contiguous ranges for the workers.
+
+    Args:
+        count: Number of pages
+        workers: Number of worker processes
+
+    Returns:
+        List of (start, stop) page ranges covering all pages in order
+    """
+    size = max(MIN_RANGE_PAGES, math.ceil(count / (workers * RANGES_PER_WORKER)))
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+def iter_pages(pdf_path: str, parallel: Optional[bool] = None,
+               executor: Optional[Executor] = None) -> Iterator[str]:
+    """
+    Yield the text of each page of a PDF in order.
+
+    In parallel mode page ranges are extracted concurrently in the shared
+    extraction pool (or ``executor``) and each page is yielded as soon as
+    its range is done, so callers can start on the first pages while the
+    rest are still being extracted.
+
+    Args:
+        pdf_path: Path to the PDF file
+        parallel: Split the pages across worker processes; by default only
+            PDFs with at least settings.PDF_PARALLEL_MIN_PAGES pages are
+        executor: Executor to run page ranges in (defaults to the shared extraction pool)
+
+    Yields:
+        Page texts
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+
+    count = page_count(pdf_path)
+    if parallel is None:
+        parallel = count >= settings.PDF_PARALLEL_MIN_PAGES
+    # A pool worker extracts inline rather than fanning out again
+    if parallel and executor is None and in_extraction_worker():
+        parallel = False
+
+    if not parallel or count <= MIN_RANGE_PAGES:
+        with fitz.open(pdf_path) as doc:
+            for page_num in range(count):
+                yield doc.load_page(page_num).get_text()
+        return
+
+    if executor is None:
+        executor = get_extraction_pool()
+    ranges = page_ranges(count, settings.EXTRACTION_WORKERS)
+    logger.info(f"Extracting {count} pages of {pdf_path} in {len(ranges)} ranges")
+
+    futures = [executor.submit(extract_page_range, pdf_path, start, stop) for start, stop in ranges]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        # The caller stopped early or a range failed
+        for future in futures:
+            future.cancel()
+
+def process_pdf(pdf_path: str, output_text_path: Optional[str] = None, clean_text: bool = True,
+                parallel: Optional[bool] = None) -> str:
     """
     Process a PDF file to extract text content.
-    
+
     Args:
         pdf_path: Path to the PDF file
         output_text_path: Path to save the extracted text (optional)
         clean_text: Whether to clean and normalize the extracted text
-        
+        parallel: Extract page ranges in worker processes (default: for large PDFs)
+
     Returns:
         The extracted text content
     """
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"PDF file not found: {pdf_path}")
-    
+
     try:
-        # Open the PDF
-        doc = fitz.open(pdf_path)
-        raw_text = ""
-        
-        # Extract text from each page
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            raw_text += page.get_text()
-        
-        # Clean and enhance the extracted text if requested
-        text = enhance_ocr_text(raw_text) if clean_text else raw_text
-        
+        pages = iter_pages(pdf_path, parallel)
+
+        # Cleaning runs page by page while later pages are still being extracted
+        text = "".join(normalize_ocr_stream(pages) if clean_text else pages)
+
         # Save the text to a file if output path is provided
         if output_text_path:
             with open(output_text_path, "w", encoding="utf-8") as f:
                 f.write(text)
-        
+
         return text
-        
+
     except Exception as e:
         raise Exception(f"Error processing PDF: {str(e)}")
-    finally:
-        if 'doc' in locals():
-            doc.close() 
\ No newline at end of file
@@ -0,0 +1,266 @@
+"""
+Reference range engine for detecting abnormal test results.
+
+Reference ranges arrive as free text ("13-17", "4,000 - 11,000 /uL",
+"< 200 mg/dL", "0.4 to 4.0"). Each distinct string is parsed once into
+numeric bounds, and the values of a whole report, or of many reports, are
+then compared with their bounds as numpy arrays.
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, List, Iterable, Tuple, Optional
+
+import numpy as np
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Direction codes
+LOW = -1
+NORMAL = 0
+HIGH = 1
+UNKNOWN = 2
+
+DIRECTIONS = np.array(["low", "normal", "high", "unknown"])
+
+NUMBER = r"[-+]?\d*\.?\d+"
+BOUNDED_RANGE_PATTERN = re.compile(
+    rf"(?P<low>{NUMBER})\s*(?:-|–|—|to)\s*(?P<high>{NUMBER})", re.IGNORECASE
+)
+OPEN_RANGE_PATTERN = re.compile(
+    rf"(?P<op><=|>=|≤|≥|<|>|up\s*to|less\s+than|below|greater\s+than|more\s+than|above)\s*(?P<bound>{NUMBER})",
+    re.IGNORECASE
+)
+NUMBER_PATTERN = re.compile(NUMBER)
+# Thousands separators, e.g. "4,000 - 11,000"
+THOUSANDS_PATTERN = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+
+UPPER_BOUND_OPERATORS = ("<", "≤", "up", "less", "below")
+
+@lru_cache(maxsize=4096)
+def parse_range(text: str) -> Tuple[float, float]:
+    """
+    Parse a reference range into numeric bounds.
+
+    Open ranges get an infinite bound ("< 200" is (-inf, 200)); units and
+    labels around the numbers are ignored. Bounds are inclusive.
+
+    Args:
+        text: Reference range as written in the report
+
+    Returns:
+        (low, high), or (nan, nan) if the text has no numeric range
+    """
+    text = THOUSANDS_PATTERN.sub("", text)
+    # An explicit operator comes first so that "<-5" is not read as a range
+    bounded = BOUNDED_RANGE_PATTERN.search(text)
+    open_range = OPEN_RANGE_PATTERN.search(text)
+    if bounded and not (open_range and open_range.start() < bounded.start()):
+        low, high = float(bounded.group("low")), float(bounded.group("high"))
+        return (low, high) if low <= high else (high, low)
+    if open_range:
+        bound = float(open_range.group("bound"))
+        if open_range.group("op").lower().startswith(UPPER_BOUND_OPERATORS):
+            return -np.inf, bound
+        return bound, np.inf
+    return np.nan, np.nan
+
+@lru_cache(maxsize=4096)
+def _parse_value_text(text: str) -> float:
+    match = NUMBER_PATTERN.search(THOUSANDS_PATTERN.sub("", text))
+    return float(match.group()) if match else np.nan
+
+def parse_value(value: Any) -> float:
+    """
+    Numeric value of a test result.
+
+    Args:
+        value: Result as stored in the analysis, e.g. 13.5, "13.5", "7,200 /uL"
+
+    Returns:
+        The first number in the value, or nan if there is none
+    """
+    if isinstance(value, bool):
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return _parse_value_text(value)
+    return np.nan
+
+@dataclass
+class RangeEvaluation:
+    """
+    Results compared with their reference ranges, one array entry per result.
+
+    Attributes:
+        values: Numeric values (nan where not numeric)
+        lows: Lower bounds (-inf for open ranges, nan where unparsed)
+        highs: Upper bounds (inf for open ranges, nan where unparsed)
+        codes: LOW, NORMAL, HIGH or UNKNOWN
+        deviation: Distance outside the range, relative to the range width
+            (or to the bound for open ranges); 0 inside the range, nan if unknown
+    """
+    values: np.ndarray
+    lows: np.ndarray
+    highs: np.ndarray
+    codes: np.ndarray
+    deviation: np.ndarray
+
+    @property
+    def abnormal(self) -> np.ndarray:
+        """Boolean flag per result"""
+        return (self.codes == LOW) | (self.codes == HIGH)
+
+    @property
+    def directions(self) -> np.ndarray:
+        """"low", "normal", "high" or "unknown" per result"""
+        return DIRECTIONS[self.codes + 1]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+def evaluate_bounds(values: np.ndarray, lows: np.ndarray, highs: np.ndarray) -> RangeEvaluation:
+    """
+    Compare values with numeric bounds.
+
+    Args:
+        values: Numeric values
+        lows: Inclusive lower bounds
+        highs: Inclusive upper bounds
+
+    Returns:
+        The evaluation
+    """
+    values = np.asarray(values, dtype=float)
+    lows = np.asarray(lows, dtype=float)
+    highs = np.asarray(highs, dtype=float)
+
+    known = ~(np.isnan(values) | np.isnan(lows) | np.isnan(highs))
+    with np.errstate(invalid="ignore"):
+        low = known & (values < lows)
+        high = known & (values > highs)
+
+        codes = np.full(values.shape, UNKNOWN, dtype=np.int8)
+        codes[known] = NORMAL
+        codes[low] = LOW
+        codes[high] = HIGH
+
+        # Scale by the range width, or by the bound itself when the range is open
+        width = highs - lows
+        bound = np.where(low, lows, highs)
+        scale = np.where(np.isfinite(width) & (width > 0), width, np.abs(bound))
+        scale = np.where((scale > 0) & np.isfinite(scale), scale, 1.0)
+        distance = np.where(low, lows - values, np.where(high, values - highs, 0.0))
+        deviation = np.where(known, distance / scale, np.nan)
+
+    return RangeEvaluation(values, lows, highs, codes, deviation)
+
+def evaluate(values: Iterable[Any], ranges: Iterable[Any]) -> RangeEvaluation:
+    """
+    Compare test results with their reference range strings.
+
+    Args:
+        values: Result values as stored in the analysis
+        ranges: Reference range strings, one per value
+
+    Returns:
+        The evaluation
+    """
+    parsed_values = np.array([parse_value(value) for value in values], dtype=float)
+    bounds = np.array(
+        [parse_range(r) if isinstance(r, str) else (np.nan, np.nan) for r in ranges], dtype=float
+    ).reshape(-1, 2)
+    return evaluate_bounds(parsed_values, bounds[:, 0], bounds[:, 1])
+
+def report_parameters(analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Flatten the test results of an analysis.
+
+    Handles sections with ``parameters`` (name/value) as well as ``tests``
+    (test_name/result).
+
+    Args:
+        analysis: Processed analysis
+
+    Returns:
+        Results with name, value, unit, reference_range, section and the
+        original parameter dict under ``source``
+    """
+    parameters = []
+    for section in analysis.get("test_sections") or []:
+        if not isinstance(section, dict):
+            continue
+        section_name = section.get("section_name", "")
+        for param in (section.get("parameters") or []) + (section.get("tests") or []):
+            if not isinstance(param, dict):
+                continue
+            parameters.append({
+                "name": param.get("name", param.get("test_name", "Unknown")),
+                "value": param.get("value", param.get("result")),
+                "unit": param.get("unit", "") or "",
+                "reference_range": param.get("reference_range", "") or "",
+                "section": section_name,
+                "source": param
+            })
+    return parameters
+
+def evaluate_reports(analyses: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], np.ndarray, RangeEvaluation]:
+    """
+    Evaluate every test result of many reports at once.
+
+    Args:
+        analyses: Processed analyses
+
+    Returns:
+        Tuple of (flattened results, index of each result's report, evaluation)
+    """
+    parameters: List[Dict[str, Any]] = []
+    report_index: List[int] = []
+    for idx, analysis in enumerate(analyses):
+        flattened = report_parameters(analysis)
+        parameters.extend(flattened)
+        report_index.extend([idx] * len(flattened))
+
+    evaluation = evaluate(
+        (param["value"] for param in parameters),
+        (param["reference_range"] for param in parameters)
+    )
+    return parameters, np.array(report_index, dtype=np.int64), evaluation
+
+def abnormal_parameters(analysis: Dict[str, Any],
+                        parameters: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Results of a report that are outside their reference range.
+
+    Args:
+        analysis: Processed analysis
+        parameters: Results to check (defaults to all results of the analysis)
+
+    Returns:
+        Abnormal results with name, value, unit, reference_range, direction
+        and deviation, most deviating first
+    """
+    if parameters is None:
+        parameters = report_parameters(analysis)
+    evaluation = evaluate(
+        (param["value"] for param in parameters),
+        (param["reference_range"] for param in parameters)
+    )
+    directions = evaluation.directions
+    abnormal = np.flatnonzero(evaluation.abnormal)
+    order = abnormal[np.argsort(-evaluation.deviation[abnormal], kind="stable")]
+    return [
+        {
+            "name": parameters[i]["name"],
+            "value": parameters[i]["value"],
+            "unit": parameters[i]["unit"],
+            "reference_range": parameters[i]["reference_range"],
+            "direction": str(directions[i]),
+            "deviation": round(float(evaluation.deviation[i]), 4)
+        }
+        for i in order
+    ]
@@ -0,0 +1,425 @@
+"""
+In-process cache of parsed report analyses.
+
+A single report page asks for the report, its insights, recommendations,
+abnormal parameters, diet, shopping and specialist data, and each of those
+used to locate and parse the same analysis JSON again. Parsed reports are
+kept here by run id, checked against the stored blob's version on every
+hit, and loaded once when several requests for the same report arrive
+together.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, Any, Iterator, Optional, Tuple, List
+
+from app.config import settings
+from app.services.report_fields import load_sections, project, top_level_keys
+from app.services.blob_store import BlobInfo, BlobStore, LocalBlobStore, get_blob_store
+from app.services.report_pack import (
+    PACK_SUFFIX, analysis_suffix, decode_document, read_pack_sections, is_analysis_file, is_pack_path
+)
+from app.utils.metrics import registry
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+report_cache_requests = registry.counter(
+    "report_cache_requests_total",
+    "Report lookups by result (hit, miss, coalesced onto an in-flight load, or partial read)",
+    ("result",)
+)
+
+report_cache_evictions = registry.counter(
+    "report_cache_evictions_total",
+    "Reports dropped from the cache to stay within its size limit"
+)
+
+# Storage areas searched for analyses, in order of preference
+REPORT_AREAS = ["processed", "reports", "uploads"]
+
+def report_stores() -> List[BlobStore]:
+    """Stores searched for analyses, in order of preference"""
+    return [get_blob_store(area) for area in REPORT_AREAS]
+
+def _read_report(store: BlobStore, key: str) -> Tuple[Dict[str, Any], BlobInfo]:
+    # Stat before reading: if the blob is replaced in between, the entry
+    # carries the old version and is reloaded on the next lookup
+    info = store.stat(key)
+    if info is None:
+        raise FileNotFoundError(f"No blob {key} in {store.area}")
+    data = decode_document(store.get(key))
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object in {store.location(key)}")
+
+    # Add file location info
+    if "metadata" not in data:
+        data["metadata"] = {}
+    data["metadata"]["file_path"] = store.location(key)
+    data["metadata"]["directory"] = store.area
+    return data, info
+
+def _file_run_id(data: Dict[str, Any]) -> Optional[str]:
+    if isinstance(data.get("metadata"), dict) and "run_id" in data["metadata"]:
+        return data["metadata"]["run_id"]
+    if isinstance(data.get("file_info"), dict) and "file_id" in data["file_info"]:
+        return data["file_info"]["file_id"]
+    return None
+
+def _matches_run_id(data: Dict[str, Any], run_id: str) -> bool:
+    return (("metadata" in data and data["metadata"].get("run_id") == run_id) or
+            ("file_info" in data and data["file_info"].get("file_id") == run_id) or
+            ("report_info" in data and data["report_info"].get("report_id") == run_id))
+
+def unnamed_report_files() -> Iterator[Tuple[BlobStore, BlobInfo]]:
+    """
+    Stored documents that may be analyses not named after their run id.
+
+    Those are reports saved through the API, and files that were in the
+    local directories before they were sharded. Analyses written by the
+    pipeline are always named after their run id.
+    """
+    for store in report_stores():
+        if store.area == "reports":
+            infos = store.list()
+        elif isinstance(store, LocalBlobStore):
+            infos = store.list_unsharded()
+        else:
+            continue
+        for info in infos:
+            if is_analysis_file(info.key):
+                yield store, info
+
+def report_files() -> Iterator[Tuple[BlobStore, BlobInfo]]:
+    """Every stored document that may be an analysis, for the report listing"""
+    processed = get_blob_store("processed")
+    for info in processed.list():
+        if is_analysis_file(info.key):
+            yield processed, info
+    for store, info in unnamed_report_files():
+        if store is not processed:
+            yield store, info
+
+def _named_files(run_id: str) -> Iterator[Tuple[BlobStore, str]]:
+    """
+    Stored analyses named after a run id, as (store, key).
+
+    The pipeline's own file names are looked up directly; other names
+    holding the run id are searched for among ``unnamed_report_files``.
+    """
+    processed = get_blob_store("processed")
+    seen = set()
+    for suffix in dict.fromkeys([analysis_suffix(), ".json", PACK_SUFFIX]):
+        key = f"{run_id}_analysis{suffix}"
+        if processed.exists(key):
+            seen.add((processed.area, key))
+            yield processed, key
+
+    for store, info in unnamed_report_files():
+        if run_id in info.key and (store.area, info.key) not in seen:
+            yield store, info.key
+
+def find_report(run_id: str) -> Optional[Tuple[Dict[str, Any], BlobStore, str, BlobInfo]]:
+    """
+    Locate and parse the analysis of a report.
+
+    Files with the run id in their name are tried first; failing that,
+    the analyses in ``unnamed_report_files`` are opened and matched on the
+    ids in their content.
+
+    Args:
+        run_id: Run id (or report id) of the report
+
+    Returns:
+        Tuple of (analysis, its store, its key, its blob info), or None if
+        not found
+
+    Raises:
+        ValueError: If a file named after the run id is not a valid JSON object
+    """
+    for store, key in _named_files(run_id):
+        try:
+            data, info = _read_report(store, key)
+        except FileNotFoundError:
+            continue
+
+        # Skip files whose run_id, in metadata or file_info, is a different one
+        file_run_id = _file_run_id(data)
+        if file_run_id and file_run_id != run_id:
+            continue
+
+        logger.info(f"Found report file for run_id {run_id}: {store.location(key)}")
+        return data, store, key, info
+
+    # Fall back to searching inside the files
+    for store, info in unnamed_report_files():
+        try:
+            data, info = _read_report(store, info.key)
+        except Exception as e:
+            logger.warning(f"Error reading file {store.location(info.key)}: {str(e)}")
+            continue
+        if _matches_run_id(data, run_id):
+            logger.info(f"Found report with matching ID in content: {store.location(info.key)}")
+            return data, store, info.key, info
+
+    return None
+
+def read_report_fields(run_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Read some fields of a report, decoding only the sections holding them.
+
+    Only files named after the run id are considered; reports that have to
+    be found by content, or whose JSON is not laid out as written by the
+    pipeline, are left to the full load. Report packs are read by byte
+    range, header and requested sections only.
+
+    Args:
+        run_id: Run id of the report
+        fields: Field paths from ``parse_fields``
+
+    Returns:
+        The projected report, or None if it has to be loaded whole
+
+    Raises:
+        ValueError: If a requested section is not valid JSON
+    """
+    keys = top_level_keys(fields)
+    for store, key in _named_files(run_id):
+        try:
+            if is_pack_path(key):
+                packed = read_pack_sections(partial(store.read_range, key), keys)
+                if packed is None:
+                    return None
+                # The header's summary holds the ids checked against the run id
+                summary, sections = packed
+                file_run_id = _file_run_id(summary)
+            else:
+                text = store.get(key).decode("utf-8")
+                # metadata and file_info hold the ids checked against the run id
+                sections = load_sections(text, keys | {"metadata", "file_info"})
+                if sections is None:
+                    return None
+                file_run_id = _file_run_id(sections)
+        except FileNotFoundError:
+            continue
+
+        if file_run_id and file_run_id != run_id:
+            continue
+
+        # Same file location info as a full load
+        sections.setdefault("metadata", {})
+        if isinstance(sections["metadata"], dict):
+            sections["metadata"]["file_path"] = store.location(key)
+            sections["metadata"]["directory"] = store.area
+        return project(sections, fields)
+    return None
+
+class _Entry:
+    """A parsed report and the blob version it was parsed from"""
+
+    __slots__ = ("data", "store", "key", "version")
+
+    def __init__(self, data: Dict[str, Any], store: BlobStore, key: str, info: BlobInfo):
+        self.data = data
+        self.store = store
+        self.key = key
+        self.version = info.version
+
+    def is_fresh(self) -> bool:
+        try:
+            info = self.store.stat(self.key)
+        except Exception:
+            return False
+        return info is not None and info.version == self.version
+
+class _Load:
+    """A load in progress that concurrent lookups of the same report wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+class ReportCache:
+    """
+    Size-bounded LRU cache of parsed analyses keyed by run id.
+
+    Cached reports are shared between callers and must not be modified.
+    Missing reports are not cached, so a report saved later is found on
+    the next lookup.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Reports kept in memory (defaults to settings.REPORT_CACHE_MAX_ENTRIES)
+        """
+        self.max_entries = settings.REPORT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._loading: Dict[str, _Load] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.partial = 0
+        self.evictions = 0
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the parsed analysis of a report.
+
+        Args:
+            run_id: Run id (or report id) of the report
+
+        Returns:
+            The analysis, or None if no report has this id
+
+        Raises:
+            ValueError: If a file named after the run id is not a valid JSON object
+        """
+        with self._lock:
+            entry = self._entries.get(run_id)
+        if entry is not None and entry.is_fresh():
+            with self._lock:
+                if run_id in self._entries:
+                    self._entries.move_to_end(run_id)
+                self.hits += 1
+            report_cache_requests.inc(result="hit")
+            return entry.data
+
+        with self._lock:
+            load = self._loading.get(run_id)
+            leader = load is None
+            if leader:
+                load = self._loading[run_id] = _Load()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            report_cache_requests.inc(result="coalesced")
+            load.done.wait()
+            if load.error is not None:
+                raise load.error
+            return load.result
+
+        report_cache_requests.inc(result="miss")
+        try:
+            found = find_report(run_id)
+            if found is not None:
+                load.result = found[0]
+                self._store(run_id, _Entry(*found))
+            else:
+                self.invalidate(run_id)
+            return load.result
+        except BaseException as e:
+            load.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._loading[run_id]
+            load.done.set()
+
+    def get_fields(self, run_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Get some fields of a report.
+
+        A cached report is projected in memory. Otherwise only the sections
+        holding the fields are read, without caching the report, and the
+        full load is the fallback.
+
+        Args:
+            run_id: Run id (or report id) of the report
+            fields: Field paths from ``parse_fields``
+
+        Returns:
+            The projected report, or None if no report has this id
+
+        Raises:
+            ValueError: If the report file is not valid JSON
+        """
+        with self._lock:
+            entry = self._entries.get(run_id)
+        if entry is None or not entry.is_fresh():
+            projected = read_report_fields(run_id, fields)
+            if projected is not None:
+                with self._lock:
+                    self.partial += 1
+                report_cache_requests.inc(result="partial")
+                return projected
+
+        data = self.get(run_id)
+        return project(data, fields) if data is not None else None
+
+    def source(self, run_id: str) -> Optional[Tuple[BlobStore, str]]:
+        """Store and key of a cached report's analysis, or None if it is not cached"""
+        with self._lock:
+            entry = self._entries.get(run_id)
+        return (entry.store, entry.key) if entry is not None else None
+
+    def _store(self, run_id: str, entry: _Entry) -> None:
+        evicted = 0
+        with self._lock:
+            self._entries[run_id] = entry
+            self._entries.move_to_end(run_id)
+            while len(self._entries) > max(self.max_entries, 0):
+                self._entries.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+        if evicted:
+            report_cache_evictions.inc(evicted)
+
+    def invalidate(self, run_id: str) -> None:
+        """Drop a report, e.g. after its analysis was rewritten"""
+        with self._lock:
+            self._entries.pop(run_id, None)
+
+    def clear(self) -> None:
+        """Drop every cached report"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counts since start-up"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "partial": self.partial,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0
+            }
+
+# Shared cache instance
+report_cache = ReportCache()
+
+registry.gauge(
+    "report_cache_entries",
+    "Parsed reports held in memory",
+    function=lambda: len(report_cache._entries)
+)
+
+def get_report_data(run_id: str) -> Dict[str, Any]:
+    """
+    Load the analysis data for a given run_id
+
+    Returns:
+        The analysis, or an empty dict if it is missing or unreadable
+    """
+    try:
+        data = report_cache.get(run_id)
+    except Exception as e:
+        logger.error(f"Error loading analysis data for run_id {run_id}: {e}")
+        return {}
+    if data is None:
+        logger.warning(f"Analysis file not found for run_id: {run_id}")
+        return {}
+    return data
@@ -0,0 +1,212 @@
+"""
+Append-only catalog of processed reports
+"""
+
+import os
+import json
+import uuid
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+from app.config import settings
+from app.services.blob_store import BlobStore
+from app.services.file_store import sync_file
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class ReportCatalog:
+    """
+    JSON Lines catalog with one summary row per processed report.
+
+    Rows are appended as analyses are saved by the API or the bulk ingest
+    CLI, so the report list can be built without opening every analysis.
+    When a report is re-processed the latest row for its run_id wins.
+    Reports without a current row (saved some other way, or rewritten
+    since) are read by the listing instead.
+    """
+
+    def __init__(self, index_dir: Optional[str] = None):
+        """
+        Initialize the catalog.
+
+        Args:
+            index_dir: Directory holding the catalog (defaults to settings.INDEX_DIR)
+        """
+        self.path = Path(index_dir or settings.INDEX_DIR) / "catalog.jsonl"
+        self._lock = threading.Lock()
+
+    def record(self, row: Dict[str, Any]) -> None:
+        """
+        Append a summary row to the catalog.
+
+        Args:
+            row: Summary row, see ``summary_row``
+        """
+        self.record_many([row])
+
+    def record_many(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Append summary rows to the catalog with a single write and fsync.
+
+        Args:
+            rows: Summary rows, see ``summary_row``
+        """
+        if not rows:
+            return
+        lines = "".join(json.dumps(row, default=str) + "\n" for row in rows)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                sync_file(f)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """
+        Read the catalog, keeping the latest row per run_id.
+
+        Returns:
+            Summary rows in the order their reports were first cataloged
+        """
+        if not self.path.exists():
+            return []
+
+        latest: Dict[str, Dict[str, Any]] = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a partial last line behind
+                    logger.warning(f"Skipping unreadable catalog line {line_number}")
+                    continue
+                latest[row.get("run_id") or row.get("path")] = row
+        return list(latest.values())
+
+# Fields of a catalog row the report listing serves as they are
+LISTING_FIELDS = (
+    "patient_name", "report_date", "provider", "model", "report_id", "run_id",
+    "user_id", "context_id", "tokens", "medical_report_id"
+)
+
+def listing_fields(data: Dict[str, Any], filename: str) -> Dict[str, Any]:
+    """
+    The report listing's fields of an analysis.
+
+    Handles the patient, date and id key variants found in analyses.
+
+    Args:
+        data: Analysis, or its summary fields (see ``read_summary``)
+        filename: Key the analysis is stored under, used for ids it lacks
+
+    Returns:
+        Dict with the LISTING_FIELDS
+    """
+    metadata = data.get("metadata", {})
+    file_info = data.get("file_info", {})
+    report_info = data.get("report_info", {})
+
+    # Extract basic info - handle different formats
+    if "patient_info" in data:
+        name = data.get("patient_info", {}).get("name", "Unknown")
+    elif "patient" in data:
+        name = data.get("patient", {}).get("name", "Unknown")
+    else:
+        name = "Unknown"
+
+    # Try to find date information
+    if "processing_timestamp" in metadata:
+        date = metadata["processing_timestamp"].split("T")[0]
+    elif "test_info" in data and "date" in data["test_info"]:
+        date = data["test_info"]["date"]
+    elif "report_date" in report_info:
+        date = report_info["report_date"]
+    else:
+        date = "Unknown"
+
+    # Extract report_id from report_info, but prefer using file_id as the consistent ID
+    if "file_id" in file_info:
+        report_id = file_info["file_id"]
+    elif "report_id" in report_info:
+        report_id = report_info["report_id"]
+    else:
+        # Use filename without extension as fallback
+        report_id = os.path.splitext(filename)[0]
+
+    # Check both model and model_used fields
+    model = metadata.get("model_used") or metadata.get("model") or "Unknown"
+
+    # Extract run_id, first from metadata, then from file_info
+    if "run_id" in metadata:
+        run_id = metadata["run_id"]
+    elif "file_id" in file_info:
+        # Use file_id as run_id if available
+        run_id = file_info["file_id"]
+    else:
+        # Extract UUID from filename if present or use part of the filename
+        file_parts = filename.split("_")
+        run_id = file_parts[0] if len(file_parts[0]) > 8 else str(uuid.uuid4())
+
+    # Ensure context_id is never null: fall back to the file_id, or generate one
+    context_id = metadata.get("context_id") or file_info.get("file_id") or str(uuid.uuid4())
+
+    # Extract token usage, with the usage field at root level as alternative source
+    tokens_in = metadata.get("tokens_in", 0)
+    tokens_out = metadata.get("tokens_out", 0)
+    if isinstance(data.get("usage"), dict):
+        if tokens_in == 0:
+            tokens_in = data["usage"].get("prompt_tokens", 0)
+        if tokens_out == 0:
+            tokens_out = data["usage"].get("completion_tokens", 0)
+
+    return {
+        "patient_name": name,
+        "report_date": date,
+        "provider": metadata.get("provider", "Unknown"),
+        "model": model,
+        "report_id": report_id,
+        "run_id": run_id,
+        "user_id": metadata.get("user_id", None),
+        "context_id": context_id,
+        "tokens": {"in": tokens_in, "out": tokens_out},
+        "medical_report_id": report_info.get("report_id", "")
+    }
+
+def summary_row(analysis: Dict[str, Any], store: BlobStore, key: str) -> Dict[str, Any]:
+    """
+    Build the catalog row for a saved analysis.
+
+    The row holds the report listing's fields (see ``listing_fields``) and
+    the version of the stored blob, so the listing can tell when a row no
+    longer describes the file.
+
+    Args:
+        analysis: Analysis JSON as saved
+        store: Store the analysis was saved to
+        key: Its key in the store
+
+    Returns:
+        Summary row for the catalog
+    """
+    metadata = analysis.get("metadata", {})
+    file_info = analysis.get("file_info", {})
+    info = store.stat(key)
+
+    return {
+        **listing_fields(analysis, key),
+        "area": store.area,
+        "key": key,
+        "path": store.location(key),
+        "version": info.version if info is not None else None,
+        "filename": file_info.get("filename"),
+        "processed_at": metadata.get("processing_timestamp"),
+        "abnormal_count": len(analysis.get("abnormal_parameters") or [])
+    }
+
+# Shared catalog instance
+report_catalog = ReportCatalog()
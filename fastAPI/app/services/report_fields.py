@@ -0,0 +1,152 @@
+"""
+Sparse fieldsets for report responses.
+
+Clients can ask for a few fields of a report (``fields=patient_info,
+abnormal_parameters``) instead of the whole analysis. When the report is
+not in memory yet, only the top-level sections holding the requested
+fields are parsed: analyses are stored with every top-level key at the
+start of a line indented by exactly two spaces (``json_io.dump_document``,
+or ``indent=2`` for older and pretty-printed analyses), so the offsets of
+the sections can be found with plain substring search and each section
+decoded on its own.
+"""
+
+import logging
+from json.decoder import scanstring
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+from app.utils.json_io import loads
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Start of a top-level key in a stored document
+SECTION_MARKER = '\n  "'
+
+def parse_fields(fields: str) -> List[str]:
+    """
+    Parse a ``fields`` query parameter.
+
+    Args:
+        fields: Comma-separated field paths; nested fields use dots, e.g.
+            "report_info.report_date,abnormal_parameters"
+
+    Returns:
+        Distinct field paths in the order given
+
+    Raises:
+        ValueError: If a path has an empty segment
+    """
+    paths = []
+    for path in fields.split(","):
+        path = path.strip()
+        if not path:
+            continue
+        if any(not part for part in path.split(".")):
+            raise ValueError(f"Invalid field: {path}")
+        if path not in paths:
+            paths.append(path)
+    return paths
+
+def top_level_keys(fields: Iterable[str]) -> set:
+    """Top-level sections holding the given field paths"""
+    return {path.split(".", 1)[0] for path in fields}
+
+def project(data: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """
+    Keep only the given fields of a document.
+
+    Paths that do not exist are left out. The returned document shares its
+    leaf values with ``data``.
+
+    Args:
+        data: Parsed document
+        fields: Field paths from ``parse_fields``
+
+    Returns:
+        New document with the requested fields
+    """
+    result: Dict[str, Any] = {}
+    selected: List[Tuple[str, ...]] = []
+    # Shorter paths first, so a section requested whole absorbs its sub-paths
+    for parts in sorted((tuple(path.split(".")) for path in fields), key=len):
+        if any(parts[:len(prefix)] == prefix for prefix in selected):
+            continue
+
+        value = data
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = result
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+            selected.append(parts)
+    return result
+
+def section_spans(text: str) -> Optional[Dict[str, Tuple[int, int]]]:
+    """
+    Locate the top-level sections of a stored document.
+
+    JSON strings cannot contain raw newlines and nested values are either
+    compact or indented further, so a newline followed by two spaces and
+    a quote only ever starts a top-level key.
+
+    Args:
+        text: Document text
+
+    Returns:
+        Key -> (start, end) offsets of its value in ``text``, or None if the
+        document is not laid out this way
+    """
+    if not text.startswith('{' + SECTION_MARKER):
+        return None
+
+    keys: List[Tuple[str, int, int]] = []
+    index = text.find(SECTION_MARKER)
+    while index != -1:
+        try:
+            key, end = scanstring(text, index + len(SECTION_MARKER))
+        except ValueError:
+            return None
+        if not text.startswith(": ", end):
+            return None
+        keys.append((key, index, end + 2))
+        index = text.find(SECTION_MARKER, end)
+
+    closing = text.rstrip().rfind("\n}")
+    if closing == -1 or closing + 2 != len(text.rstrip()):
+        return None
+
+    spans: Dict[str, Tuple[int, int]] = {}
+    for position, (key, line_start, value_start) in enumerate(keys):
+        if position + 1 < len(keys):
+            value_end = keys[position + 1][1] - 1
+            if text[value_end] != ",":
+                return None
+        else:
+            value_end = closing
+        spans[key] = (value_start, value_end)
+    return spans
+
+def load_sections(text: str, keys: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """
+    Decode some top-level sections of a document.
+
+    Args:
+        text: Document text as written by ``dump_document`` or with indent=2
+        keys: Top-level keys to decode; keys the document lacks are skipped
+
+    Returns:
+        The decoded sections, or None if the document's sections cannot be
+        located and it has to be parsed whole
+
+    Raises:
+        json.JSONDecodeError: If a requested section is not valid JSON
+    """
+    spans = section_spans(text)
+    if spans is None:
+        return None
+    return {key: loads(text[spans[key][0]:spans[key][1]]) for key in keys if key in spans}
@@ -0,0 +1,298 @@
+"""
+Compressed binary storage format for analyses ("report packs").
+
+A pack starts with a small header holding the summary fields the report
+listing shows and an offset table of the document's top-level sections;
+each section is compressed on its own. The listing reads only headers and
+a single-section read decompresses only that section.
+
+Layout::
+
+    b"RPK1"                   magic
+    uint32, little-endian     header length
+    header                    JSON: version, codec, summary, sections
+    section data              per top-level key, compressed compact JSON;
+                              offsets in the header are relative to here
+
+Sections are compressed with zstd when the ``zstandard`` package is
+installed and with zlib otherwise; the codec is recorded per file. Readers
+detect packs by their magic, so JSON analyses keep working unchanged.
+Header and section reads are byte-range reads, so they stay cheap on
+object storage.
+"""
+
+import zlib
+import struct
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterable, Optional, Tuple
+
+from app.config import settings
+from app.services.report_fields import project
+from app.utils.json_io import dumps, loads, dump_document
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RPK1"
+PACK_VERSION = 1
+PACK_SUFFIX = ".rpk"
+HEADER_LENGTH = struct.Struct("<I")
+PREAMBLE_SIZE = len(MAGIC) + HEADER_LENGTH.size
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Reads bytes [start, end) of a stored document; end None reads to the end
+RangeReader = Callable[[int, Optional[int]], bytes]
+
+# Fields of an analysis kept in the header for the report listing
+SUMMARY_FIELDS = [
+    "patient_info.name",
+    "patient.name",
+    "test_info.date",
+    "report_info.report_date",
+    "report_info.report_id",
+    "file_info.file_id",
+    "metadata.processing_timestamp",
+    "metadata.provider",
+    "metadata.model",
+    "metadata.model_used",
+    "metadata.run_id",
+    "metadata.context_id",
+    "metadata.user_id",
+    "metadata.tokens_in",
+    "metadata.tokens_out",
+    "usage.prompt_tokens",
+    "usage.completion_tokens",
+]
+
+def available_codec(codec: Optional[str] = None) -> str:
+    """
+    Codec to write packs with.
+
+    Args:
+        codec: Requested codec (defaults to settings.ANALYSIS_PACK_CODEC)
+
+    Returns:
+        "zstd", or "zlib" if zstd is not requested or not installed
+    """
+    codec = (codec or settings.ANALYSIS_PACK_CODEC).lower()
+    if codec == "zstd" and zstandard is not None:
+        return "zstd"
+    return "zlib"
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("Report pack is zstd-compressed but the zstandard package is not installed")
+        try:
+            return zstandard.ZstdDecompressor().decompress(data)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Corrupt report pack section: {e}")
+    if codec == "zlib":
+        try:
+            return zlib.decompress(data)
+        except zlib.error as e:
+            raise ValueError(f"Corrupt report pack section: {e}")
+    raise ValueError(f"Unknown report pack codec: {codec}")
+
+def is_pack_path(path: Any) -> bool:
+    """Whether a path names a report pack"""
+    return str(path).endswith(PACK_SUFFIX)
+
+def is_analysis_file(filename: str) -> bool:
+    """Whether a file name is a stored document in either format"""
+    return filename.endswith(".json") or filename.endswith(PACK_SUFFIX)
+
+def analysis_suffix() -> str:
+    """File suffix for new analyses, per settings.ANALYSIS_STORAGE_FORMAT"""
+    return PACK_SUFFIX if settings.ANALYSIS_STORAGE_FORMAT.lower() == "pack" else ".json"
+
+def encode_pack(document: Dict[str, Any], codec: Optional[str] = None) -> bytes:
+    """
+    Encode an analysis as a report pack.
+
+    Args:
+        document: The analysis
+        codec: Compression codec (see ``available_codec``)
+
+    Returns:
+        The pack bytes
+    """
+    if not isinstance(document, dict):
+        raise ValueError("Only JSON objects can be stored as report packs")
+
+    codec = available_codec(codec)
+    sections: Dict[str, Tuple[int, int]] = {}
+    blobs = []
+    offset = 0
+    for key, value in document.items():
+        blob = _compress(codec, dumps(value))
+        sections[str(key)] = (offset, len(blob))
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = dumps({
+        "version": PACK_VERSION,
+        "codec": codec,
+        "summary": project(document, SUMMARY_FIELDS),
+        "sections": sections
+    })
+    return MAGIC + HEADER_LENGTH.pack(len(header)) + header + b"".join(blobs)
+
+def _parse_header(data: bytes) -> Dict[str, Any]:
+    try:
+        header = loads(data)
+    except ValueError as e:
+        raise ValueError(f"Corrupt report pack header: {e}")
+    if not isinstance(header, dict):
+        raise ValueError("Corrupt report pack header: not a JSON object")
+    if header.get("version") != PACK_VERSION:
+        raise ValueError(f"Unsupported report pack version: {header.get('version')}")
+    if not isinstance(header.get("sections"), dict) or "codec" not in header:
+        raise ValueError("Corrupt report pack header: missing codec or sections")
+    return header
+
+def _header_length(preamble: bytes) -> int:
+    try:
+        return HEADER_LENGTH.unpack(preamble[len(MAGIC):PREAMBLE_SIZE])[0]
+    except struct.error as e:
+        raise ValueError(f"Truncated report pack: {e}")
+
+def decode_pack(data: bytes) -> Dict[str, Any]:
+    """
+    Decode a whole report pack.
+
+    Args:
+        data: The pack bytes
+
+    Returns:
+        The analysis, with its sections in their original order
+
+    Raises:
+        ValueError: If the pack is truncated or corrupt
+    """
+    base = PREAMBLE_SIZE + _header_length(data)
+    header = _parse_header(data[PREAMBLE_SIZE:base])
+    return {
+        key: loads(_decompress(header["codec"], data[base + offset:base + offset + length]))
+        for key, (offset, length) in header["sections"].items()
+    }
+
+def decode_document(data: bytes) -> Any:
+    """
+    Decode a stored analysis in either format.
+
+    Raises:
+        ValueError: If the data is neither valid JSON nor a valid pack
+    """
+    if data.startswith(MAGIC):
+        return decode_pack(data)
+    return loads(data)
+
+def read_document(path: Any) -> Any:
+    """
+    Read a stored analysis file in either format.
+
+    Args:
+        path: Analysis file (JSON or report pack)
+
+    Returns:
+        The decoded document
+
+    Raises:
+        ValueError: If the file is neither valid JSON nor a valid pack
+    """
+    with open(path, "rb") as f:
+        return decode_document(f.read())
+
+def _read_pack_header(read_range: RangeReader) -> Optional[Tuple[Dict[str, Any], int]]:
+    preamble = read_range(0, PREAMBLE_SIZE)
+    if not preamble.startswith(MAGIC):
+        return None
+    base = PREAMBLE_SIZE + _header_length(preamble)
+    return _parse_header(read_range(PREAMBLE_SIZE, base)), base
+
+def read_header(read_range: RangeReader) -> Optional[Dict[str, Any]]:
+    """
+    Read the header of a report pack.
+
+    Args:
+        read_range: Reads bytes [start, end) of the stored document, e.g. a
+            bound ``BlobStore.read_range``
+
+    Returns:
+        The header, or None if the document is not a pack
+    """
+    packed = _read_pack_header(read_range)
+    return packed[0] if packed else None
+
+def read_summary(read_range: RangeReader) -> Any:
+    """
+    Read the fields of an analysis the report listing needs.
+
+    Packs are summarized from their header alone; JSON analyses are
+    parsed whole.
+
+    Args:
+        read_range: Reads bytes [start, end) of the stored document
+
+    Returns:
+        The summary fields as a document (see SUMMARY_FIELDS), or the whole
+        document for JSON files
+    """
+    header = read_header(read_range)
+    if header is None:
+        return loads(read_range(0, None))
+    return header["summary"]
+
+def read_pack_sections(read_range: RangeReader, keys: Iterable[str]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Decode some top-level sections of a report pack, reading only them.
+
+    Args:
+        read_range: Reads bytes [start, end) of the stored document
+        keys: Top-level keys to decode; keys the document lacks are skipped
+
+    Returns:
+        Tuple of (summary, sections), or None if the document is not a pack
+    """
+    packed = _read_pack_header(read_range)
+    if packed is None:
+        return None
+    header, base = packed
+
+    sections = {}
+    for key in keys:
+        if key not in header["sections"]:
+            continue
+        offset, length = header["sections"][key]
+        sections[key] = loads(_decompress(header["codec"], read_range(base + offset, base + offset + length)))
+    return header["summary"], sections
+
+def encode_document(path: Any, document: Any) -> bytes:
+    """
+    Encode a document in the format its path names.
+
+    Report pack paths get a pack (documents other than JSON objects fall
+    back to JSON, which readers detect); others get ``dump_document`` JSON.
+    """
+    if is_pack_path(path) and isinstance(document, dict):
+        return encode_pack(document)
+    return dump_document(document)
+
+def converted_name(name: str, to_format: str) -> str:
+    """Name of an analysis once stored in the given format ("json" or "pack")"""
+    stem = name[:-len(PACK_SUFFIX)] if is_pack_path(name) else Path(name).stem
+    return stem + (PACK_SUFFIX if to_format == "pack" else ".json")
@@ -0,0 +1,316 @@
+"""
+Precomputed views of processed analyses.
+
+The insights, recommendations and abnormal parameter endpoints each
+reshape the same analysis. The shapes are computed once when an analysis
+is saved and kept in a small sidecar file per report, so those endpoints
+read a few kilobytes instead of searching for and parsing the full
+analysis on every request.
+"""
+
+import json
+import hashlib
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+from app.services.blob_store import BlobStore, get_blob_store
+from app.services.reference_ranges import evaluate, report_parameters
+from app.utils.http_cache import make_etag
+from app.utils.json_io import dumps, loads
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Bump when the shape of a view changes; older sidecars are rebuilt on read
+VIEWS_VERSION = 3
+
+def categorize_recommendation(text: str) -> str:
+    """Recommendation type inferred from its wording"""
+    lower = text.lower()
+    if "consult" in lower or "doctor" in lower or "follow up" in lower:
+        return "medical"
+    if "diet" in lower or "food" in lower or "nutrition" in lower:
+        return "dietary"
+    if "lifestyle" in lower or "exercise" in lower or "sun" in lower:
+        return "lifestyle"
+    if "test" in lower or "monitor" in lower:
+        return "testing"
+    return "medical"
+
+def insights_view(report: Dict[str, Any], run_id: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """
+    Health insights of a report as a list of insight items.
+
+    Args:
+        report: Processed analysis
+        run_id: Report identifier, used in error details
+
+    Returns:
+        Tuple of (insights, error); error holds the HTTP status_code and
+        detail the endpoint responds with when there are no usable insights
+    """
+    if "health_insights" not in report:
+        return None, {"status_code": 404, "detail": f"Health insights not found for report: {run_id}"}
+
+    insights = report.get("health_insights", [])
+    if isinstance(insights, list):
+        return insights, None
+
+    if not isinstance(insights, dict):
+        return None, {
+            "status_code": 422,
+            "detail": f"Invalid format: health_insights should be an array or object, got {type(insights)}"
+        }
+
+    # Object format with a clinical interpretation and recommendations
+    if "clinical_interpretation" in insights and "recommendations" in insights:
+        abnormal_params = []
+        if isinstance(report.get("abnormal_parameters"), list):
+            abnormal_params = [
+                param.get("name", "") for param in report["abnormal_parameters"]
+                if isinstance(param, dict) and "name" in param
+            ]
+        return [{
+            "condition": "Comprehensive Health Assessment",
+            "confidence": 0.9,
+            "parameters": abnormal_params if abnormal_params else ["Multiple Parameters"],
+            "description": insights["clinical_interpretation"],
+            "recommendations": [
+                {"type": categorize_recommendation(rec), "text": rec}
+                for rec in insights["recommendations"]
+            ]
+        }], None
+
+    # Other object formats get a generic insight
+    return [{
+        "condition": "Health Analysis",
+        "confidence": 0.8,
+        "parameters": ["Multiple Parameters"],
+        "description": "Analysis of multiple health parameters from your blood test.",
+        "recommendations": [
+            {
+                "type": "medical",
+                "text": "Please consult with your healthcare provider to discuss these results in detail."
+            }
+        ]
+    }], None
+
+def recommendations_view(insights: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """All recommendations of the insights, ordered by type"""
+    recommendations = []
+    for insight in insights:
+        if isinstance(insight, dict):
+            recommendations.extend(insight.get("recommendations") or [])
+    return sorted(recommendations, key=lambda rec: rec.get("type", "") if isinstance(rec, dict) else "")
+
+def abnormal_view(report: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Abnormal parameters of a report with their direction.
+
+    Uses the report's ``abnormal_parameters`` when present, otherwise the
+    results flagged ``is_abnormal`` in its test sections. Directions the
+    report does not state come from the parsed reference ranges.
+
+    Args:
+        report: Processed analysis
+
+    Returns:
+        Parameters with name, value, unit, reference_range and direction
+    """
+    if isinstance(report.get("abnormal_parameters"), list):
+        abnormal_params = report["abnormal_parameters"]
+        computed_directions = evaluate(
+            (param.get("value", param.get("result")) if isinstance(param, dict) else None for param in abnormal_params),
+            (param.get("reference_range") if isinstance(param, dict) else None for param in abnormal_params)
+        ).directions
+
+        parameters = []
+        for param, computed in zip(abnormal_params, computed_directions):
+            if not isinstance(param, dict):
+                continue
+            if all(key in param for key in ("name", "value", "unit", "reference_range", "direction")):
+                parameters.append(param)
+            elif all(key in param for key in ("test_name", "result", "unit", "reference_range")):
+                # Alternate structure with test_name and result instead of name and value
+                status = str(param.get("status", "")).lower()
+                parameters.append({
+                    "name": param["test_name"],
+                    "value": param["result"],
+                    "unit": param["unit"],
+                    "reference_range": param["reference_range"],
+                    "direction": "low" if "below" in status else
+                                 "high" if "above" in status else
+                                 computed if computed in ("low", "high") else
+                                 "unknown"
+                })
+            else:
+                logger.warning(f"Abnormal parameter has unexpected structure: {param}")
+        return parameters
+
+    if not isinstance(report.get("test_sections"), list):
+        return []
+
+    flagged = [param for param in report_parameters(report) if param["source"].get("is_abnormal", False)]
+    directions = evaluate(
+        (param["value"] for param in flagged),
+        (param["reference_range"] for param in flagged)
+    ).directions
+    return [
+        {
+            "name": param["name"],
+            "value": "N/A" if param["value"] is None else param["value"],
+            "unit": param["unit"],
+            "reference_range": param["reference_range"],
+            "direction": param["source"].get("direction")
+                         or (computed if computed in ("low", "high") else "unknown")
+        }
+        for param, computed in zip(flagged, directions)
+    ]
+
+def build_views(report: Dict[str, Any], run_id: str, source: Optional[Tuple[BlobStore, str]] = None,
+                content_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Compute every view of a report.
+
+    Args:
+        report: Processed analysis
+        run_id: Report identifier
+        source: Store and key of the analysis the views are derived from
+        content_hash: SHA-256 of the analysis as written (hashed from the
+            stored blob if not given)
+
+    Returns:
+        The views document stored in the sidecar
+    """
+    insights, insights_error = insights_view(report, run_id)
+    location = source[0].location(source[1]) if source else ""
+    views = {
+        "version": VIEWS_VERSION,
+        "run_id": run_id,
+        "source": None,
+        "insights": insights,
+        "insights_error": insights_error,
+        "recommendations": recommendations_view(insights) if insights is not None else None,
+        "abnormal_parameters": abnormal_view(report)
+    }
+    if source:
+        store, key = source
+        try:
+            info = store.stat(key)
+            if info is not None:
+                views["source"] = {
+                    "area": store.area,
+                    "key": key,
+                    "path": location,
+                    "version": info.version,
+                    "sha256": content_hash or hashlib.sha256(store.get(key)).hexdigest()
+                }
+        except OSError:
+            pass
+    return views
+
+class ReportViews:
+    """
+    Sidecar store with one views document per report.
+
+    Each document records the version of the stored analysis it was built
+    from; a document whose analysis has changed since is treated as
+    missing, so callers rebuild it.
+    """
+
+    def __init__(self, store: Optional[BlobStore] = None):
+        """
+        Initialize the store.
+
+        Args:
+            store: Blob store for the sidecars (defaults to the "views" area)
+        """
+        self._store = store
+
+    @property
+    def store(self) -> BlobStore:
+        return self._store or get_blob_store("views")
+
+    @staticmethod
+    def _name(run_id: str) -> str:
+        # Run ids come from URLs; the store keeps only the last path component
+        return f"{run_id}.json"
+
+    def write(self, run_id: str, views: Dict[str, Any]) -> None:
+        """Store the views of a report atomically"""
+        self.store.put(self._name(run_id), dumps(views))
+
+    def read(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the views of a report.
+
+        Returns:
+            The views, or None if there are none or they are out of date
+        """
+        try:
+            views = loads(self.store.get(self._name(run_id)))
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable views for {run_id}: {e}")
+            return None
+
+        if views.get("version") != VIEWS_VERSION:
+            return None
+        source = views.get("source")
+        if source:
+            try:
+                info = get_blob_store(source["area"]).stat(source["key"])
+            except (OSError, KeyError):
+                return None
+            if info is None or info.version != source["version"]:
+                return None
+        return views
+
+    def save(self, report: Dict[str, Any], store: BlobStore, key: str,
+             content_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Build and store the views of a just written analysis.
+
+        Failures are logged rather than raised; the endpoints rebuild
+        missing views from the analysis itself.
+
+        Args:
+            report: The analysis
+            store: Store it was written to
+            key: Its key in the store
+            content_hash: SHA-256 of the written blob
+
+        Returns:
+            The views, or None if the analysis has no run_id or storing failed
+        """
+        run_id = (report.get("metadata") or {}).get("run_id") or (report.get("file_info") or {}).get("file_id")
+        if not run_id:
+            return None
+        try:
+            views = build_views(report, run_id, (store, key), content_hash)
+            self.write(run_id, views)
+            return views
+        except Exception as e:
+            logger.warning(f"Error writing views for {run_id}: {e}")
+            return None
+
+def views_etag(views: Dict[str, Any], variant: str) -> Optional[str]:
+    """
+    ETag of a representation derived from a report's analysis.
+
+    Args:
+        views: The report's views
+        variant: Representation, e.g. "report" or "insights"
+
+    Returns:
+        The ETag, or None if the analysis file is unknown
+    """
+    digest = (views.get("source") or {}).get("sha256")
+    if not digest:
+        return None
+    # Views change shape with VIEWS_VERSION even when the analysis does not
+    return make_etag(digest, f"{variant}:v{VIEWS_VERSION}")
+
+# Shared views store
+report_views = ReportViews()
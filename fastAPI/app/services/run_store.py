@@ -0,0 +1,219 @@
+"""
+Persistent run state for report analysis jobs
+"""
+
+import json
+import os
+import time
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+from app.config import settings
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Ordered pipeline stages, used to derive progress
+RUN_STAGES = [
+    "started",
+    "saving_file",
+    "queued",
+    "extracting_text",
+    "processing_text",
+    "parsing_response",
+    "saving_results",
+    "completed"
+]
+
+TERMINAL_STATUSES = {"completed", "failed"}
+
+class RunStore:
+    """
+    File-backed store for analysis run state.
+
+    Each run is kept as a small JSON document in ``RUNS_DIR`` so that
+    status survives restarts and can be polled while a job is processed.
+    """
+
+    def __init__(self, runs_dir: Optional[str] = None):
+        """
+        Initialize the run store.
+
+        Args:
+            runs_dir: Directory for run documents (defaults to settings.RUNS_DIR)
+        """
+        self.runs_dir = Path(runs_dir or settings.RUNS_DIR)
+        self._lock = threading.Lock()
+
+    def _path(self, run_id: str) -> Path:
+        return self.runs_dir / f"{run_id}.json"
+
+    def _write(self, run_data: Dict[str, Any]) -> None:
+        """Atomically write a run document."""
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.runs_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(run_data, f, default=str)
+            os.replace(temp_path, self._path(run_data["run_id"]))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a run document.
+
+        Args:
+            run_id: Unique identifier of the run
+
+        Returns:
+            The run data, or None if the run is unknown
+        """
+        path = self._path(run_id)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error reading run {run_id}: {e}")
+            return None
+
+    def create(self, run_id: str, provider: str, model: str, filename: str,
+               status: str, job: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Create and persist a new run.
+
+        Args:
+            run_id: Unique identifier of the run
+            provider: LLM provider used for the analysis
+            model: LLM model used for the analysis
+            filename: Original name of the uploaded file
+            status: Initial status
+            job: Optional job parameters needed to resume the run
+
+        Returns:
+            The created run data
+        """
+        now = time.time()
+        run_data = {
+            "run_id": run_id,
+            "provider": provider,
+            "model": model,
+            "filename": filename,
+            "status": status,
+            "stage": status,
+            "progress": stage_progress(status),
+            "start_time": now,
+            "updated_time": now,
+            "stage_started": now,
+            "timings": {},
+            "metadata": {},
+            "error": None,
+            "job": job or {}
+        }
+        with self._lock:
+            self._write(run_data)
+        return run_data
+
+    def update(self, run_id: str, status: Optional[str] = None, error: Optional[str] = None,
+               metadata: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Update a run, recording how long the previous stage took.
+
+        Args:
+            run_id: Unique identifier of the run
+            status: New status/stage, if changing
+            error: Error message, if the run failed
+            metadata: Metadata to merge into the run
+
+        Returns:
+            The updated run data, or None if the run is unknown
+        """
+        with self._lock:
+            run_data = self.get(run_id)
+            if run_data is None:
+                return None
+
+            now = time.time()
+            if status and status != run_data.get("status"):
+                previous = run_data.get("stage")
+                if previous:
+                    run_data["timings"][previous] = round(now - run_data.get("stage_started", now), 4)
+                run_data["status"] = status
+                run_data["stage_started"] = now
+                if status != "failed":
+                    run_data["stage"] = status
+                    run_data["progress"] = stage_progress(status)
+                if status in TERMINAL_STATUSES:
+                    run_data["timings"]["total"] = round(now - run_data["start_time"], 4)
+
+            if error:
+                run_data["error"] = error
+
+            if metadata:
+                run_data["metadata"].update(metadata)
+
+            run_data["updated_time"] = now
+            self._write(run_data)
+            return run_data
+
+    def set_job(self, run_id: str, job: Dict[str, Any]) -> None:
+        """
+        Record the parameters needed to process (or resume) a run.
+
+        Args:
+            run_id: Unique identifier of the run
+            job: Job parameters such as the saved upload path
+        """
+        with self._lock:
+            run_data = self.get(run_id)
+            if run_data is None:
+                raise KeyError(run_id)
+            run_data["job"] = job
+            self._write(run_data)
+
+    def list_incomplete(self) -> List[Dict[str, Any]]:
+        """
+        List runs that were not finished, e.g. because the server restarted.
+
+        Returns:
+            Run documents whose status is not terminal
+        """
+        if not self.runs_dir.exists():
+            return []
+
+        runs = []
+        for path in self.runs_dir.glob("*.json"):
+            run_data = self.get(path.stem)
+            if run_data and run_data.get("status") not in TERMINAL_STATUSES:
+                runs.append(run_data)
+
+        runs.sort(key=lambda r: r.get("start_time", 0))
+        return runs
+
+def stage_progress(status: str) -> float:
+    """Return the fraction of the pipeline completed when entering a stage."""
+    if status not in RUN_STAGES:
+        return 0.0
+    return round(RUN_STAGES.index(status) / (len(RUN_STAGES) - 1), 2)
+
+# Shared store instance
+run_store = RunStore()
+
+def create_run(run_id: str, provider: str, model: str, filename: str, status: str,
+               job: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Create and store a new run status"""
+    run_data = run_store.create(run_id, provider, model, filename, status, job)
+    logger.info(f"Created run: {run_id} ({status})")
+    return run_data
+
+def update_run(run_id: str, status: str = None, error: str = None, metadata: Dict[str, Any] = None) -> None:
+    """Update an existing run status"""
+    run_store.update(run_id, status=status, error=error, metadata=metadata)
+    logger.info(f"Updated run: {run_id} ({status or 'metadata update'})")
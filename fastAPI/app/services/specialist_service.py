@@ -2,36 +2,18 @@
 Specialist service for healthcare provider recommendations
 """
 
-import json
 import logging
 import os
 import datetime
 import random
 from typing import Dict, Any, List, Optional
-from pathlib import Path
 
-from app.config import settings
+from app.services.report_cache import get_report_data
 from app.models.schemas import SpecialistsResponse, Specialist
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-def get_report_data(run_id: str) -> Dict[str, Any]:
-    """
-    Load the analysis data for a given run_id
-    """
-    try:
-        analysis_file = Path(settings.PROCESSED_DIR) / f"{run_id}_analysis.json"
-        if not analysis_file.exists():
-            logger.warning(f"Analysis file not found for run_id: {run_id}")
-            return {}
-        
-        with open(analysis_file, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Error loading analysis data for run_id {run_id}: {e}")
-        return {}
-
 def get_specialist_by_specialty(specialty: str, location: str) -> List[Specialist]:
     """
     Get specialists filtered by specialty and location
@@ -0,0 +1,204 @@
+"""
+Staged pipeline with bounded queues between stages
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Optional, List, Iterable, Callable, Awaitable
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class Stage:
+    """
+    One step of a staged pipeline.
+
+    The handler receives an item and returns the item to pass to the next
+    stage. Raising an exception drops the item from the pipeline.
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], workers: int = 1):
+        """
+        Initialize a stage.
+
+        Args:
+            name: Stage name used in the report
+            handler: Coroutine function processing one item
+            workers: Number of items this stage processes concurrently
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.busy_seconds = 0.0
+        self.processed = 0
+        self.failed = 0
+
+class PipelineReport:
+    """Timing summary of a pipeline run"""
+
+    def __init__(self, stages: List[Stage], wall_seconds: float, completed: int, failed: int):
+        self.wall_seconds = wall_seconds
+        self.completed = completed
+        self.failed = failed
+        self.stages = {
+            stage.name: {
+                "workers": stage.workers,
+                "processed": stage.processed,
+                "failed": stage.failed,
+                "busy_seconds": round(stage.busy_seconds, 3)
+            }
+            for stage in stages
+        }
+
+    @property
+    def serial_seconds(self) -> float:
+        """Time the same work would take with one item and one stage at a time"""
+        return sum(stage["busy_seconds"] for stage in self.stages.values())
+
+    @property
+    def overlap_gain(self) -> float:
+        """Speed-up from overlapping stages and items, relative to serial execution"""
+        if self.wall_seconds <= 0:
+            return 1.0
+        return self.serial_seconds / self.wall_seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "serial_seconds": round(self.serial_seconds, 3),
+            "overlap_gain": round(self.overlap_gain, 2),
+            "completed": self.completed,
+            "failed": self.failed,
+            "stages": self.stages
+        }
+
+    def summary(self) -> str:
+        """Human readable summary of the run"""
+        lines = [
+            f"Pipeline: {self.completed} completed, {self.failed} failed in {self.wall_seconds:.2f}s "
+            f"(serial {self.serial_seconds:.2f}s, overlap gain {self.overlap_gain:.2f}x)",
+            f"{'stage':<16}{'workers':>8}{'items':>8}{'busy (s)':>12}{'util':>8}"
+        ]
+        for name, stage in self.stages.items():
+            capacity = self.wall_seconds * stage["workers"]
+            utilization = stage["busy_seconds"] / capacity if capacity else 0.0
+            lines.append(
+                f"{name:<16}{stage['workers']:>8}{stage['processed']:>8}"
+                f"{stage['busy_seconds']:>12.2f}{utilization:>8.0%}"
+            )
+        return "\n".join(lines)
+
+class StagedPipeline:
+    """
+    Runs items through a chain of stages connected by bounded queues.
+
+    Every stage has its own worker count, so CPU-bound stages (text
+    extraction) and I/O-bound stages (LLM calls) of different items run at
+    the same time. The bounded queues apply back-pressure: a fast stage
+    waits instead of piling up work in memory when the next one is slow.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4,
+                 on_complete: Optional[Callable[[Any], Any]] = None,
+                 on_error: Optional[Callable[[Any, str, Exception], Any]] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages: Stages in processing order
+            queue_size: Capacity of the queue in front of each stage
+            on_complete: Called with each item that passed every stage
+            on_error: Called with the item, stage name and exception when a stage fails
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_complete = on_complete
+        self.on_error = on_error
+        self.completed = 0
+        self.failed = 0
+
+    def _notify(self, callback: Callable[..., Any], *args: Any) -> None:
+        # A failing callback must not kill the worker, or joining its queue hangs
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"Pipeline callback {getattr(callback, '__name__', callback)} failed: {str(e)}", exc_info=True)
+
+    async def _worker(self, index: int, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]) -> None:
+        stage = self.stages[index]
+        while True:
+            item = await inbox.get()
+            try:
+                start = time.perf_counter()
+                try:
+                    result = await stage.handler(item)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    stage.busy_seconds += time.perf_counter() - start
+                    stage.failed += 1
+                    self.failed += 1
+                    logger.debug(f"Stage {stage.name} failed: {str(e)}")
+                    if self.on_error:
+                        self._notify(self.on_error, item, stage.name, e)
+                    continue
+
+                stage.busy_seconds += time.perf_counter() - start
+                stage.processed += 1
+                if outbox is not None:
+                    await outbox.put(result)
+                else:
+                    self.completed += 1
+                    if self.on_complete:
+                        self._notify(self.on_complete, result)
+            finally:
+                inbox.task_done()
+
+    async def run(self, items: Iterable[Any]) -> PipelineReport:
+        """
+        Process all items and wait for the pipeline to drain.
+
+        Items are pulled from ``items`` lazily as the first queue has room.
+
+        Args:
+            items: Items to feed into the first stage
+
+        Returns:
+            Report with wall time, per-stage busy time and the overlap gain
+        """
+        start = time.perf_counter()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        workers: List[List[asyncio.Task]] = []
+        for index, stage in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            workers.append([
+                asyncio.create_task(self._worker(index, queues[index], outbox))
+                for _ in range(stage.workers)
+            ])
+
+        try:
+            for item in items:
+                await queues[0].put(item)
+
+            # Each stage only hands items forward before marking them done, so
+            # draining the queues in order drains the whole pipeline
+            for queue, stage_workers in zip(queues, workers):
+                await queue.join()
+                for task in stage_workers:
+                    task.cancel()
+        finally:
+            all_workers = [task for stage_workers in workers for task in stage_workers]
+            for task in all_workers:
+                task.cancel()
+            await asyncio.gather(*all_workers, return_exceptions=True)
+
+        report = PipelineReport(self.stages, time.perf_counter() - start, self.completed, self.failed)
+        logger.info(
+            f"Pipeline finished: {report.completed} completed, {report.failed} failed, "
+            f"wall {report.wall_seconds:.2f}s vs serial {report.serial_seconds:.2f}s "
+            f"({report.overlap_gain:.2f}x overlap gain)"
+        )
+        return report
@@ -0,0 +1,313 @@
+"""
+Full-text search index over extracted report text.
+
+Text is indexed in an SQLite FTS5 table as it is stored, so staff can find
+reports mentioning a lab, doctor or parameter without reading every text
+file. Each document has a row in ``documents`` (its ID, original file name
+and run) whose rowid is also its rowid in the ``text_fts`` index, so
+re-indexing or removing a document is a lookup by key rather than a scan.
+
+Searches rank every match with BM25 and fetch one page at a time. FTS5 only
+visits documents containing every term and keeps just the page while
+scoring; ranking can optionally be capped for very large indexes. The index
+is local to each API node; ``index_text.py`` (re)builds it from the text
+store.
+"""
+
+import re
+import html
+import sqlite3
+import logging
+import threading
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.services.write_behind import WriteBehindQueue
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Terms around each match in a snippet
+SNIPPET_TOKENS = 16
+# Marks around matches in snippets, replaced by <mark> once the text is escaped
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+# A quoted phrase, or a term optionally ending in * for a prefix match
+QUERY_TERM = re.compile(r'"([^"]*)"|(\w+)(\*?)', re.UNICODE)
+# Most common indexed terms a prefix is expanded to; FTS5 prefix queries
+# merge the postings of every matching term before returning a row
+PREFIX_EXPANSIONS = 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    document_id TEXT NOT NULL UNIQUE,
+    filename TEXT,
+    run_id TEXT,
+    indexed_at TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS text_fts USING fts5(
+    body,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS text_vocab USING fts5vocab(text_fts, 'row');
+"""
+
+# SQLite's synchronous level for each PERSIST_FSYNC setting (the index is WAL-journaled)
+SYNCHRONOUS = {"always": "FULL", "data": "NORMAL", "none": "OFF"}
+
+def fold_term(term: str) -> str:
+    """Lowercase a term and strip its diacritics, as the index's tokenizer does"""
+    decomposed = unicodedata.normalize("NFKD", term.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+def build_query(q: str, expand: Optional[Callable[[str], List[str]]] = None) -> str:
+    """
+    Turn a search box query into an FTS5 query.
+
+    Terms are quoted so FTS5 operators and punctuation in user input are
+    matched literally; every term must match. ``"..."`` searches a phrase
+    and a trailing ``*`` a prefix.
+
+    Args:
+        q: Query as typed
+        expand: Returns the indexed terms to search for a (folded) prefix;
+            prefixes it has no terms for are left to FTS5
+
+    Returns:
+        The FTS5 query, or "" if the query has no terms
+    """
+    terms = []
+    for match in QUERY_TERM.finditer(q):
+        phrase, term, prefix = match.groups()
+        if phrase is not None:
+            words = re.findall(r"\w+", phrase, re.UNICODE)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+        elif prefix and expand is not None and (expansions := expand(fold_term(term))):
+            terms.append("(" + " OR ".join(f'"{word}"' for word in expansions) + ")")
+        else:
+            terms.append(f'"{term}"{prefix}')
+    return " ".join(terms)
+
+def highlight(snippet: str) -> str:
+    """Escape a snippet for HTML and wrap its matches in <mark>"""
+    return html.escape(snippet).replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+class TextIndex:
+    """
+    SQLite FTS5 index of extracted text, keyed by document ID.
+
+    Each thread gets its own connection; writes are serialized so batches
+    commit as single transactions without lock contention.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the index.
+
+        Args:
+            path: SQLite database file (defaults to settings.TEXT_INDEX_PATH)
+        """
+        self.path = Path(path or settings.TEXT_INDEX_PATH)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={SYNCHRONOUS.get(settings.PERSIST_FSYNC.lower(), 'NORMAL')}")
+        with self._schema_lock:
+            if not self._schema_ready:
+                try:
+                    conn.executescript(SCHEMA)
+                except sqlite3.OperationalError as e:
+                    conn.close()
+                    raise RuntimeError(f"Full-text search needs SQLite with FTS5: {e}")
+                self._schema_ready = True
+        self._local.conn = conn
+        return conn
+
+    def index_many(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Add or replace the text of several documents in one transaction.
+
+        Args:
+            entries: Dicts with ``document_id`` and ``text``, and optionally
+                ``filename`` and ``run_id``
+        """
+        if not entries:
+            return
+        conn = self._connect()
+        now = datetime.now().isoformat()
+        with self._write_lock, conn:
+            for entry in entries:
+                row = conn.execute(
+                    "SELECT id FROM documents WHERE document_id = ?", (entry["document_id"],)
+                ).fetchone()
+                if row is None:
+                    rowid = conn.execute(
+                        "INSERT INTO documents (document_id, filename, run_id, indexed_at) VALUES (?, ?, ?, ?)",
+                        (entry["document_id"], entry.get("filename"), entry.get("run_id"), now)
+                    ).lastrowid
+                else:
+                    rowid = row[0]
+                    conn.execute("DELETE FROM text_fts WHERE rowid = ?", (rowid,))
+                    conn.execute(
+                        "UPDATE documents SET filename = COALESCE(?, filename), run_id = COALESCE(?, run_id), "
+                        "indexed_at = ? WHERE id = ?",
+                        (entry.get("filename"), entry.get("run_id"), now, rowid)
+                    )
+                conn.execute("INSERT INTO text_fts (rowid, body) VALUES (?, ?)", (rowid, entry["text"]))
+
+    def index(self, document_id: str, text: str, filename: Optional[str] = None,
+              run_id: Optional[str] = None) -> None:
+        """Add or replace the text of one document"""
+        self.index_many([{"document_id": document_id, "text": text, "filename": filename, "run_id": run_id}])
+
+    def remove(self, document_id: str) -> bool:
+        """
+        Remove a document from the index.
+
+        Returns:
+            Whether the document was indexed
+        """
+        conn = self._connect()
+        with self._write_lock, conn:
+            row = conn.execute("SELECT id FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM text_fts WHERE rowid = ?", (row[0],))
+            conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+        return True
+
+    def clear(self) -> None:
+        """Remove every document from the index"""
+        conn = self._connect()
+        with self._write_lock, conn:
+            conn.execute("DELETE FROM text_fts")
+            conn.execute("DELETE FROM documents")
+
+    def optimize(self) -> None:
+        """Merge the index's segments, e.g. after a bulk rebuild"""
+        conn = self._connect()
+        with self._write_lock, conn:
+            conn.execute("INSERT INTO text_fts (text_fts) VALUES ('optimize')")
+
+    def count(self) -> int:
+        """Number of indexed documents"""
+        return self._connect().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def prefix_terms(self, prefix: str) -> List[str]:
+        """The indexed terms starting with a prefix that most documents contain"""
+        rows = self._connect().execute(
+            "SELECT term FROM text_vocab WHERE term >= ? AND term < ? ORDER BY doc DESC LIMIT ?",
+            (prefix, prefix + "\U0010ffff", PREFIX_EXPANSIONS)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def search(self, q: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """
+        Find documents whose text matches a query, best matches first.
+
+        Every match is ranked with BM25, using FTS5's own ``ORDER BY rank``
+        so only the requested page is kept while scoring. If
+        settings.TEXT_SEARCH_MAX_CANDIDATES is set, only that many matches
+        (those indexed first-to-last with the highest rowids) are ranked
+        and ``truncated`` says whether others were left out. Prefixes match
+        their PREFIX_EXPANSIONS most common terms. Snippets are built only
+        for the page returned.
+
+        Args:
+            q: Query as typed (see ``build_query``)
+            limit: Maximum number of results
+            offset: Number of results to skip
+
+        Returns:
+            Dict with ``results`` (document_id, filename, run_id, indexed_at,
+            score and a highlighted snippet), ``has_more`` and ``truncated``.
+            Counting every match would visit all of them, so no total is
+            returned.
+
+        Raises:
+            ValueError: If the query has no searchable terms
+        """
+        query = build_query(q, self.prefix_terms)
+        if not query:
+            raise ValueError("Query has no searchable terms")
+
+        conn = self._connect()
+        max_candidates = settings.TEXT_SEARCH_MAX_CANDIDATES
+        if max_candidates > 0:
+            matches = """
+                SELECT rowid, bm25(text_fts) AS rank FROM text_fts
+                WHERE text_fts MATCH ?
+                ORDER BY rowid DESC
+                LIMIT ?
+            """
+            params: tuple = (query, max_candidates)
+        else:
+            matches = """
+                SELECT rowid, rank FROM text_fts
+                WHERE text_fts MATCH ?
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            """
+            params = (query, limit + 1, offset)
+        rows = conn.execute(
+            f"""
+            SELECT d.id, d.document_id, d.filename, d.run_id, d.indexed_at, m.rank
+            FROM ({matches}) m JOIN documents d ON d.id = m.rowid
+            ORDER BY m.rank
+            LIMIT ? OFFSET ?
+            """,
+            (*params, limit + 1, 0 if max_candidates <= 0 else offset)
+        ).fetchall()
+        page = rows[:limit]
+
+        truncated = max_candidates > 0 and conn.execute(
+            "SELECT 1 FROM text_fts WHERE text_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+            (query, max_candidates)
+        ).fetchone() is not None
+
+        snippets: Dict[int, str] = {}
+        if page:
+            rowids = [row[0] for row in page]
+            snippets = dict(conn.execute(
+                f"""
+                SELECT rowid, snippet(text_fts, 0, ?, ?, '…', ?) FROM text_fts
+                WHERE text_fts MATCH ? AND rowid IN ({", ".join("?" * len(rowids))})
+                """,
+                (MATCH_START, MATCH_END, SNIPPET_TOKENS, query, *rowids)
+            ).fetchall())
+
+        return {
+            "results": [
+                {
+                    "document_id": document_id,
+                    "filename": filename,
+                    "run_id": run_id,
+                    "indexed_at": indexed_at,
+                    "score": round(-rank, 4),
+                    "snippet": highlight(snippets.get(rowid, ""))
+                }
+                for rowid, document_id, filename, run_id, indexed_at, rank in page
+            ],
+            "has_more": len(rows) > limit,
+            "truncated": truncated
+        }
+
+# Shared index, and the queue that indexes text as it is stored
+text_index = TextIndex()
+text_index_updates = WriteBehindQueue("text-index", text_index.index_many)
@@ -0,0 +1,125 @@
+"""
+Write-behind queue for updates derived from stored documents
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Callable, List, Optional
+
+from app.config import settings
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """
+    Asyncio queue that applies updates in batches off the request path.
+
+    Savers ``submit`` an update and return once it is queued; a worker
+    collects queued updates into batches and applies each batch in the
+    loop's thread pool, so e.g. many catalog rows share one append and
+    one fsync. Only updates that can be rebuilt from durable data should
+    be queued: a crash loses the updates still in the queue.
+
+    When the queue is not running (CLIs, scripts) updates are applied
+    immediately.
+    """
+
+    def __init__(self, name: str, apply: Callable[[List[Any]], None],
+                 batch_size: Optional[int] = None, interval: Optional[float] = None,
+                 max_size: Optional[int] = None):
+        """
+        Initialize the queue.
+
+        Args:
+            name: Name used in logs and the worker task name
+            apply: Applies a batch of updates; runs in a worker thread
+            batch_size: Max updates per batch (defaults to settings.WRITE_BEHIND_BATCH_SIZE)
+            interval: Seconds to wait for more updates before applying a batch
+                (defaults to settings.WRITE_BEHIND_INTERVAL)
+            max_size: Max queued updates before ``submit`` waits
+                (defaults to settings.WRITE_BEHIND_QUEUE_SIZE)
+        """
+        self.name = name
+        self.apply = apply
+        self.batch_size = batch_size or settings.WRITE_BEHIND_BATCH_SIZE
+        self.interval = settings.WRITE_BEHIND_INTERVAL if interval is None else interval
+        self.max_size = max_size or settings.WRITE_BEHIND_QUEUE_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self) -> None:
+        """Start the worker."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._worker(), name=f"{self.name}-writer")
+
+    async def stop(self) -> None:
+        """Apply the queued updates and stop the worker."""
+        if not self.running:
+            return
+        await self.flush()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._queue = None
+
+    async def flush(self) -> None:
+        """Wait until every update queued so far has been applied."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def submit(self, update: Any) -> None:
+        """
+        Queue an update, waiting only if the queue is full.
+
+        Args:
+            update: Item passed to ``apply`` as part of a batch
+        """
+        if not self.running:
+            await asyncio.get_running_loop().run_in_executor(None, self._apply, [update])
+            return
+        await self._queue.put(update)
+
+    def _apply(self, batch: List[Any]) -> None:
+        start = time.perf_counter()
+        try:
+            self.apply(batch)
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} {self.name} updates: {str(e)}", exc_info=True)
+            return
+        logger.debug(f"Wrote {len(batch)} {self.name} updates in {time.perf_counter() - start:.3f}s")
+
+    async def _collect(self) -> List[Any]:
+        """Wait for an update, then gather more until the batch is full or the interval ends."""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            try:
+                await loop.run_in_executor(None, self._apply, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
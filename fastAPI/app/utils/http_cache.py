@@ -0,0 +1,99 @@
+"""
+HTTP caching helpers: ETags and conditional GET
+"""
+
+import os
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+# Run-scoped resources never change once their analysis is written (resumed
+# runs keep an analysis they already stored, see complete_stored_run)
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Resources addressed by file name can be overwritten; clients revalidate
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+# Digests of files without a stored content hash, keyed by path and stat
+_file_digests: Dict[str, Tuple[int, int, str]] = {}
+_file_digests_lock = threading.Lock()
+MAX_FILE_DIGESTS = 1024
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of a document's bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def file_digest(path: str) -> str:
+    """
+    SHA-256 hex digest of a file, recomputed only when its mtime or size change.
+
+    Args:
+        path: File path
+
+    Returns:
+        The digest
+    """
+    stat = os.stat(path)
+    with _file_digests_lock:
+        cached = _file_digests.get(path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    with open(path, "rb") as f:
+        digest = content_hash(f.read())
+    with _file_digests_lock:
+        if len(_file_digests) >= MAX_FILE_DIGESTS:
+            _file_digests.clear()
+        _file_digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+def make_etag(digest: str, variant: str) -> str:
+    """
+    Strong ETag of one representation of a document.
+
+    Args:
+        digest: Content hash of the document
+        variant: Representation, e.g. "report", "insights:v2" or
+            "report:fields=patient_info"; each gets its own ETag
+
+    Returns:
+        Quoted ETag value
+    """
+    return '"' + hashlib.sha256(f"{digest}|{variant}".encode("utf-8")).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an ETag.
+
+    If-None-Match uses the weak comparison, so a W/ prefix is ignored.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def is_not_modified(request: Request, etag: Optional[str]) -> bool:
+    """Whether the client already has the representation with this ETag"""
+    return etag is not None and etag_matches(request.headers.get("if-none-match"), etag)
+
+def cache_headers(etag: Optional[str], cache_control: str = IMMUTABLE_CACHE_CONTROL) -> Dict[str, str]:
+    """ETag and Cache-Control headers, or none without an ETag"""
+    if etag is None:
+        return {}
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+def not_modified_response(etag: str, cache_control: str = IMMUTABLE_CACHE_CONTROL) -> Response:
+    """304 response without a body"""
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
+
+def set_cache_headers(response: Response, etag: Optional[str], cache_control: str = IMMUTABLE_CACHE_CONTROL) -> None:
+    """Add the ETag and Cache-Control headers to a response"""
+    response.headers.update(cache_headers(etag, cache_control))
@@ -0,0 +1,110 @@
+"""
+Fast JSON encoding and decoding for API responses and stored documents.
+
+Uses orjson when it is installed and the standard library otherwise.
+Stored analyses are written with one top-level key per line and each
+section on that line in compact form, which keeps them small while still
+letting ``report_fields`` locate and decode single sections. With
+``settings.JSON_PRETTY`` documents and responses are indented instead,
+for debugging.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    _PRETTY_OPTIONS = _OPTIONS | orjson.OPT_INDENT_2
+
+def _default(obj: Any) -> Any:
+    """Encode types neither encoder handles natively"""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "dict") and callable(obj.dict):
+        # Pydantic v1 models
+        return obj.dict()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, Path):
+        return str(obj)
+    if hasattr(obj, "tolist"):
+        # numpy arrays and scalars without orjson
+        return obj.tolist()
+    return str(obj)
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """
+    Encode an object as UTF-8 JSON.
+
+    Args:
+        obj: Object to encode
+        pretty: Indent by two spaces instead of writing compact JSON
+
+    Returns:
+        The encoded bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=_PRETTY_OPTIONS if pretty else _OPTIONS)
+    if pretty:
+        return json.dumps(obj, default=_default, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def loads(data: Any) -> Any:
+    """
+    Decode JSON from bytes or str.
+
+    Raises:
+        json.JSONDecodeError: If the data is not valid JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Documents written by json.dump may contain NaN or Infinity,
+            # which orjson rejects; only those take the slow path
+            pass
+    return json.loads(data)
+
+def dump_document(obj: Any, pretty: Optional[bool] = None) -> bytes:
+    """
+    Encode a document for storage.
+
+    Dicts are written with each top-level key on its own line, indented by
+    two spaces and followed by its compact value, so no other line of the
+    document starts that way.
+
+    Args:
+        obj: Document to encode
+        pretty: Indent nested values too (defaults to settings.JSON_PRETTY)
+
+    Returns:
+        The encoded bytes
+    """
+    if pretty is None:
+        pretty = settings.JSON_PRETTY
+    if pretty or not isinstance(obj, dict) or not obj:
+        return dumps(obj, pretty=pretty)
+    return b"{\n" + b",\n".join(
+        b"  " + dumps(str(key)) + b": " + dumps(value)
+        for key, value in obj.items()
+    ) + b"\n}"
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content, pretty=settings.JSON_PRETTY)
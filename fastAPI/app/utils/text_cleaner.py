@@ -1,5 +1,5 @@
 import re
-from typing import List
+from typing import List, Iterable, Iterator
 
 def normalize_whitespace(text: str) -> str:
     """
@@ -73,17 +73,208 @@ def clean_ocr_artifacts(text: str) -> str:
 def enhance_ocr_text(text: str) -> str:
     """
     Enhance OCR text output by cleaning and normalizing it.
-    
+
+    Equivalent to ``normalize_whitespace(clean_ocr_artifacts(text))``, done
+    in a single pass by ``OCRTextNormalizer``.
+
     Args:
         text: Raw OCR text
         
     Returns:
         Enhanced and cleaned text
     """
-    # First clean OCR artifacts
-    cleaned_text = clean_ocr_artifacts(text)
-    
-    # Then normalize whitespace
-    normalized_text = normalize_whitespace(cleaned_text)
-    
-    return normalized_text 
\ No newline at end of file
+    return normalize_ocr_text(text)
+
+# The patterns of clean_ocr_artifacts and normalize_whitespace, compiled once
+ISOLATED_CHARACTER_PATTERN = re.compile(r'\s[@#$%^*_~`|<>]\s')
+DASH_RUN_PATTERN = re.compile(r'[-–—]{2,}')
+SPACES_PATTERN = re.compile(r' {2,}')
+
+# An isolated character match can reach one character past a newline
+ISOLATED_CHARACTERS = set('@#$%^*_~`|<>')
+
+class OCRTextNormalizer:
+    """
+    Single-pass, incremental version of ``enhance_ocr_text``.
+
+    Text is fed in chunks (for example one OCR page at a time) and the
+    normalized text is returned as soon as it can no longer change. The
+    concatenated output always equals ``enhance_ocr_text`` of the
+    concatenated input.
+
+    Isolated characters, dash runs and repeated spaces are replaced with
+    precompiled patterns; the lines are then stripped, classified and
+    written in one loop, a small state machine standing in for the
+    multiline "lone character" substitution and the empty-line collapsing
+    of ``normalize_whitespace``. That substitution also swallows the blank
+    lines around a lone character, leaving one empty line, which is why
+    blank lines are held back until the next non-blank line.
+    """
+
+    def __init__(self):
+        self._buffer = ""        # Raw text not yet safe to clean
+        self._partial = ""       # Cleaned start of a line whose end has not arrived
+        self._blank_lines = 0    # Blank lines that may still be swallowed
+        self._in_tail = False    # Consuming blank lines after a lone character
+        self._tail_lines = 0
+        self._tail_last = ""
+        self._started = False    # A non-empty line has been written
+        self._empty_lines = 0    # Empty lines waiting for the next non-empty one
+
+    def feed(self, chunk: str) -> str:
+        """
+        Consume the next chunk of raw OCR text.
+
+        Args:
+            chunk: Raw text, split anywhere
+
+        Returns:
+            Normalized text that is final so far (possibly empty)
+        """
+        self._buffer += chunk
+        cut = self._safe_cut()
+        if cut <= 0:
+            return ""
+        ready, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        return self._process(ready, final=False)
+
+    def finish(self) -> str:
+        """
+        Flush the remaining input once all chunks were fed.
+
+        Returns:
+            The rest of the normalized text
+        """
+        ready, self._buffer = self._buffer, ""
+        output = self._process(ready, final=True)
+        # Blank lines left over are kept; after a lone character its match
+        # ran to the end of the text, leaving one empty line
+        held = 1 if self._in_tail else self._blank_lines
+        empty_lines = min(self._empty_lines + held, 2)
+        self._blank_lines = 0
+        self._in_tail = False
+
+        if self._started:
+            output += "\n" * empty_lines
+        elif empty_lines > 1:
+            output += "\n" * (empty_lines - 1)
+        self._started = False
+        self._empty_lines = 0
+        return output
+
+    def _safe_cut(self) -> int:
+        """
+        Last position the buffer can be split at without changing any match.
+
+        That is just after a newline that is not followed by an isolated
+        special character, since an isolated character match could span it then.
+        """
+        buffer = self._buffer
+        end = len(buffer) - 1
+        while True:
+            newline = buffer.rfind("\n", 0, end)
+            if newline < 0:
+                return 0
+            if buffer[newline + 1] not in ISOLATED_CHARACTERS:
+                return newline + 1
+            end = newline
+
+    def _process(self, text: str, final: bool) -> str:
+        text = DASH_RUN_PATTERN.sub('-', ISOLATED_CHARACTER_PATTERN.sub(' ', text))
+        text = SPACES_PATTERN.sub(' ', (self._partial + text).replace('\t', ' '))
+        lines = text.split('\n')
+        # An isolated character match may have eaten the trailing newline, so
+        # the last line is only complete at the end of the input
+        self._partial = "" if final else lines.pop()
+
+        # The state lives in locals while looping; this is the hot path
+        output: List[str] = []
+        emit = output.append
+        blank_lines = self._blank_lines
+        in_tail = self._in_tail
+        tail_lines = self._tail_lines
+        tail_last = self._tail_last
+        started = self._started
+        empty_lines = self._empty_lines
+
+        for line in lines:
+            stripped = line.strip()
+
+            if in_tail:
+                if not stripped:
+                    tail_lines += 1
+                    tail_last = line
+                    continue
+                # The match ends before the newline of the last blank line, so
+                # an empty one there starts a line the next match can begin at
+                in_tail = False
+                if tail_lines and not tail_last:
+                    blank_lines = 1
+                elif empty_lines < 2:
+                    empty_lines += 1
+
+            if not stripped:
+                blank_lines += 1
+                continue
+
+            if len(stripped) == 1 and not (stripped.isalnum() or stripped == '_'):
+                # A lone character removes itself and the blank lines around it
+                blank_lines = 0
+                in_tail = True
+                tail_lines = 0
+                tail_last = ""
+                continue
+
+            if blank_lines:
+                empty_lines = min(empty_lines + blank_lines, 2)
+                blank_lines = 0
+
+            # At most one empty line between text; up to two before the first line
+            if started:
+                emit("\n\n" if empty_lines else "\n")
+            elif empty_lines:
+                emit("\n" * empty_lines)
+            emit(stripped)
+            started = True
+            empty_lines = 0
+
+        self._blank_lines = blank_lines
+        self._in_tail = in_tail
+        self._tail_lines = tail_lines
+        self._tail_last = tail_last
+        self._started = started
+        self._empty_lines = empty_lines
+        return "".join(output)
+
+def normalize_ocr_stream(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Normalize OCR text page by page.
+
+    Args:
+        chunks: Raw text chunks, e.g. the OCR output of each page in order
+
+    Yields:
+        Normalized text pieces whose concatenation equals
+        ``enhance_ocr_text`` of the concatenated chunks
+    """
+    normalizer = OCRTextNormalizer()
+    for chunk in chunks:
+        output = normalizer.feed(chunk)
+        if output:
+            yield output
+    output = normalizer.finish()
+    if output:
+        yield output
+
+def normalize_ocr_text(text: str) -> str:
+    """
+    Clean OCR artifacts and normalize whitespace in a single pass.
+
+    Args:
+        text: Raw OCR text
+
+    Returns:
+        Enhanced and cleaned text
+    """
+    normalizer = OCRTextNormalizer()
+    return normalizer.feed(text) + normalizer.finish()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON encoding and decoding on real analyses.
+
+For every analysis in the processed directory (or the given files) the
+script times, per call:
+
+- decoding the stored file with ``json.loads`` and with ``json_io.loads``
+- writing an analysis with ``json.dumps(indent=2)`` and with
+  ``json_io.dump_document``
+- rendering the report response the default FastAPI way
+  (``jsonable_encoder`` then ``json.dumps``) and with ``FastJSONResponse``
+  returned directly
+
+and prints the median (p50) of each with the output sizes. It fails if
+the fast path decodes to a different document.
+
+Usage (from the fastAPI directory):
+    python -m benchmarks.json_serialization
+    python -m benchmarks.json_serialization processed/*.json --repeat 500
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+from typing import Callable, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from app.services.file_store import processed_store
+from app.utils import json_io
+from app.utils.json_io import dump_document, dumps, loads
+
+def p50(func: Callable[[], object], repeat: int) -> float:
+    """Median duration of one call, in microseconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1e6
+
+def default_response(content: object) -> bytes:
+    """What a plain dict returned from a route costs with the default JSONResponse"""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding and decoding")
+    parser.add_argument("inputs", nargs="*", help="Analysis JSON files (default: the processed directory)")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per operation and file")
+    args = parser.parse_args(argv)
+
+    paths = args.inputs or sorted(str(path) for path in processed_store.iter_files() if path.suffix == ".json")
+    if not paths:
+        print("No analyses found")
+        return 1
+    print(f"Fast encoder: {'orjson' if json_io.orjson is not None else 'json (orjson not installed)'}")
+
+    rows = []
+    mismatches = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            raw = f.read()
+        document = json.loads(raw)
+        stored = dump_document(document)
+        if loads(stored) != document:
+            mismatches += 1
+            print(f"MISMATCH in {path}")
+
+        rows.append({
+            "decode": (p50(lambda: json.loads(raw), args.repeat), p50(lambda: loads(raw), args.repeat)),
+            "store": (p50(lambda: json.dumps(document, indent=2), args.repeat),
+                      p50(lambda: dump_document(document), args.repeat)),
+            "respond": (p50(lambda: default_response(document), args.repeat),
+                        p50(lambda: dumps(document), args.repeat)),
+            "bytes": (len(json.dumps(document, indent=2).encode("utf-8")), len(stored)),
+        })
+
+    print(f"{len(paths)} analyses, median of per-file p50 in microseconds")
+    print(f"{'operation':<12}{'stdlib':>12}{'fast':>12}{'speed-up':>10}")
+    for operation in ("decode", "store", "respond"):
+        slow = statistics.median(row[operation][0] for row in rows)
+        fast = statistics.median(row[operation][1] for row in rows)
+        print(f"{operation:<12}{slow:>12.1f}{fast:>12.1f}{slow / fast:>9.2f}x")
+    indented = sum(row["bytes"][0] for row in rows)
+    compact = sum(row["bytes"][1] for row in rows)
+    print(f"\nStored size: {indented:,} bytes indented, {compact:,} bytes with dump_document "
+          f"({compact / indented:.0%})")
+    print(f"Mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark lab value trend queries on a synthetic patient series.
+
+Builds the series of one patient with a report every few days, each
+holding most of a panel of parameters, then times loading the series from
+a fresh store, computing trends over every parameter, and appending one
+more report. Prints the p50 and p95 of each.
+
+Usage (from the fastAPI directory):
+    python -m benchmarks.lab_trends
+    python -m benchmarks.lab_trends --reports 2000 --repeat 50
+"""
+
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from app.services.blob_store import MemoryBlobStore
+from app.services.lab_series import LabSeries, LabSeriesStore, canonical_parameter, to_seconds
+
+PARAMETERS = [
+    ("Hemoglobin", "g/dL"), ("Hematocrit", "%"), ("WBC", "10^3/uL"), ("Platelets", "10^3/uL"),
+    ("Glucose", "mg/dL"), ("HbA1c", "%"), ("Total Cholesterol", "mg/dL"), ("Triglycerides", "mg/dL"),
+    ("HDL", "mg/dL"), ("LDL", "mg/dL"), ("Creatinine", "mg/dL"), ("ALT", "U/L"), ("AST", "U/L"),
+    ("TSH", "uIU/mL"), ("Ferritin", "ng/mL"), ("Vitamin D", "ng/mL"), ("Sodium", "mmol/L"),
+    ("Potassium", "mmol/L"), ("Calcium", "mg/dL"), ("CRP", "mg/L")
+]
+
+def synthetic_rows(rnd: random.Random, reports: int, first_run: int = 0) -> List[Tuple[str, str, int, float, str]]:
+    start = datetime(2015, 1, 1)
+    rows = []
+    for n in range(first_run, first_run + reports):
+        taken = to_seconds(start + timedelta(days=3 * n))
+        for name, unit in rnd.sample(PARAMETERS, rnd.randint(12, len(PARAMETERS))):
+            rows.append((canonical_parameter(name), unit, taken, round(rnd.uniform(1, 250), 1), f"run-{n}"))
+    return rows
+
+def timed(action: Callable[[], object], repeat: int) -> Tuple[float, float]:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return statistics.median(durations), durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark lab value trend queries")
+    parser.add_argument("--reports", type=int, default=1000, help="Reports in the patient's series")
+    parser.add_argument("--window", type=int, default=3, help="Measurements in each rolling mean")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per operation")
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(0)
+    blobs = MemoryBlobStore("trends")
+    LabSeriesStore(blobs).append("patient", synthetic_rows(rnd, args.reports))
+    series = LabSeriesStore(blobs).load("patient")
+    extra = synthetic_rows(rnd, 1, first_run=args.reports)
+
+    operations = [
+        ("load", lambda: LabSeriesStore(blobs, max_entries=0).load("patient")),
+        ("trends (all parameters)", lambda: series.trends(window=args.window)),
+        ("trends (2 parameters)", lambda: series.trends(["Glucose", "LDL"], window=args.window)),
+        ("latest", series.latest),
+        ("merge one report", lambda: LabSeries.merge(series, extra))
+    ]
+    print(f"{len(series)} measurements of {len(series.trends())} parameters over {args.reports} reports")
+    print(f"{'operation':<28}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, action in operations:
+        p50, p95 = timed(action, args.repeat)
+        print(f"{name:<28}{p50:>10.2f}{p95:>10.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
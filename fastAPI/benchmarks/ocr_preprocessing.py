@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark OCR preprocessing settings on sample reports.
+
+For every input page each setting is run end to end (preprocessing plus
+Tesseract) and the latency and accuracy are reported. Accuracy is the
+word-level similarity to a ground truth text file with the same stem as
+the input (e.g. ``sample_report.pdf`` -> ``sample_report.txt``); without
+one, agreement with the baseline setting is reported instead.
+
+Usage (from the fastAPI directory):
+    python -m benchmarks.ocr_preprocessing ../sample_report.pdf path/to/photos/
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import pytesseract
+from pdf2image import convert_from_path
+
+from app.services.image_preprocessing import load_grayscale, preprocess_for_ocr, tesseract_config
+
+DEFAULT_INPUTS = [Path(__file__).resolve().parents[2] / "sample_report.pdf"]
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif', '.webp'}
+
+# name -> (PDF raster DPI, preprocessing options); None means the legacy path
+SETTINGS: Dict[str, Tuple[int, Optional[Dict[str, Any]]]] = {
+    "baseline (otsu, psm 6, 300dpi)": (300, None),
+    "adaptive": (300, {}),
+    "adaptive, no rescale": (300, {"rescale": False}),
+    "adaptive, no crop": (300, {"crop": False}),
+    "adaptive, no deskew": (300, {"deskew": False}),
+    "adaptive, psm 6": (300, {"psm": 6}),
+    "adaptive, 200dpi": (200, {}),
+    "adaptive, 150dpi": (150, {}),
+}
+
+def legacy_ocr(gray: np.ndarray) -> str:
+    """OCR as done before adaptive preprocessing: global Otsu threshold and PSM 6"""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return pytesseract.image_to_string(binary, config=tesseract_config(6))
+
+def load_pages(path: Path, dpi: int) -> List[Tuple[np.ndarray, Optional[float]]]:
+    """Load the grayscale pages of a PDF or image"""
+    if path.suffix.lower() == ".pdf":
+        return [(np.array(page.convert("L")), float(dpi)) for page in convert_from_path(path, dpi=dpi, grayscale=True)]
+    return [load_grayscale(str(path))]
+
+def similarity(text: str, reference: str) -> float:
+    """Word-level similarity between two texts (1.0 is identical)"""
+    return SequenceMatcher(None, text.split(), reference.split(), autojunk=False).ratio()
+
+def find_inputs(paths: List[str]) -> List[Path]:
+    inputs = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            inputs.extend(sorted(
+                p for p in path.iterdir()
+                if p.suffix.lower() in IMAGE_EXTENSIONS or p.suffix.lower() == ".pdf"
+            ))
+        elif path.exists():
+            inputs.append(path)
+        else:
+            print(f"Skipping missing input {path}", file=sys.stderr)
+    return inputs
+
+def run_setting(path: Path, dpi: int, options: Optional[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    """OCR one input with one setting, returning per-page latency and the text"""
+    latencies = []
+    text = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = load_pages(path, dpi)
+        page_texts = []
+        for gray, page_dpi in pages:
+            if options is None:
+                page_texts.append(legacy_ocr(gray))
+            else:
+                binary, metadata = preprocess_for_ocr(gray, page_dpi, options)
+                page_texts.append(pytesseract.image_to_string(binary, config=metadata["config"]))
+        latencies.append((time.perf_counter() - start) / max(1, len(pages)))
+        text = "\n".join(page_texts)
+    return {"latency": statistics.median(latencies), "text": text}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark OCR preprocessing settings")
+    parser.add_argument("inputs", nargs="*", help="PDF/image files or directories (default: sample_report.pdf)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per setting; the median is reported")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    inputs = find_inputs(args.inputs) if args.inputs else [p for p in DEFAULT_INPUTS if p.exists()]
+    if not inputs:
+        print("No inputs found", file=sys.stderr)
+        return 1
+
+    results: Dict[str, Dict[str, List[float]]] = {name: {"latency": [], "accuracy": []} for name in SETTINGS}
+    for path in inputs:
+        truth_path = path.with_suffix(".txt")
+        truth = truth_path.read_text(encoding="utf-8") if truth_path.exists() else None
+        print(f"{path.name}: {'ground truth ' + truth_path.name if truth else 'no ground truth, comparing to baseline'}")
+
+        reference = truth
+        for name, (dpi, options) in SETTINGS.items():
+            outcome = run_setting(path, dpi, options, args.repeat)
+            if reference is None:
+                # The first setting is the baseline the others are compared to
+                reference = outcome["text"]
+            results[name]["latency"].append(outcome["latency"])
+            results[name]["accuracy"].append(similarity(outcome["text"], reference))
+
+    baseline_latency = statistics.mean(next(iter(results.values()))["latency"])
+    print()
+    print(f"{'setting':<32}{'s/page':>10}{'speedup':>10}{'accuracy':>10}")
+    summary = {}
+    for name, values in results.items():
+        latency = statistics.mean(values["latency"])
+        accuracy = statistics.mean(values["accuracy"])
+        summary[name] = {"seconds_per_page": round(latency, 4), "accuracy": round(accuracy, 4)}
+        print(f"{name:<32}{latency:>10.3f}{baseline_latency / latency:>9.2f}x{accuracy:>10.3f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"inputs": [str(p) for p in inputs], "settings": summary}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark serial against parallel PyMuPDF text extraction.
+
+Each PDF is extracted with one process and with page ranges spread over
+worker pools of increasing size. The script reports the total time, the
+time until the first page is available from ``iter_pages`` and the
+speed-up, and checks that every mode returns the same text. Without
+inputs a synthetic lab archive of ``--pages`` pages is generated.
+
+Usage (from the fastAPI directory):
+    python -m benchmarks.pdf_extraction
+    python -m benchmarks.pdf_extraction path/to/archive.pdf --workers 1 2 4 8
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from app.services.pdf_processor import iter_pages, page_count
+
+REPORT_LINES = [
+    "Hemoglobin            13.5   g/dL      12.0 - 15.5",
+    "WBC Count             7200   /uL       4000 - 11000",
+    "Platelet Count        250    x10^3/uL  150 - 400",
+    "Glucose, Fasting      98     mg/dL     70 - 100",
+    "Total Cholesterol     212    mg/dL     < 200",
+    "TSH                   2.1    mIU/L     0.4 - 4.0",
+]
+
+def make_archive(path: str, pages: int) -> None:
+    """Write a synthetic lab archive with a results table on every page"""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 72
+        page.insert_text((72, y), f"Laboratory Report - Page {page_num + 1}", fontsize=14)
+        for _ in range(6):
+            for line in REPORT_LINES:
+                y += 16
+                page.insert_text((72, y), line, fontname="cour", fontsize=9)
+    doc.save(path)
+    doc.close()
+
+def timed_extract(pdf_path: str, executor: Optional[ProcessPoolExecutor]) -> Tuple[float, float, str]:
+    """Extract a PDF, returning (seconds to first page, total seconds, text)"""
+    start = time.perf_counter()
+    first_page = None
+    pages = []
+    for text in iter_pages(pdf_path, parallel=executor is not None, executor=executor):
+        if first_page is None:
+            first_page = time.perf_counter() - start
+        pages.append(text)
+    return first_page or 0.0, time.perf_counter() - start, "".join(pages)
+
+def benchmark(pdf_path: str, worker_counts: List[int], repeat: int) -> bool:
+    """Benchmark one PDF, returning whether all modes extracted the same text"""
+    count = page_count(pdf_path)
+    print(f"\n{Path(pdf_path).name}: {count} pages")
+    print(f"{'mode':<16}{'first page s':>14}{'total s':>10}{'pages/s':>10}{'speed-up':>10}")
+
+    serial = min((timed_extract(pdf_path, None) for _ in range(repeat)), key=lambda r: r[1])
+    reference_text = serial[2]
+    print(f"{'serial':<16}{serial[0]:>14.3f}{serial[1]:>10.3f}{count / serial[1]:>10.1f}{1.0:>9.2f}x")
+
+    consistent = True
+    for workers in worker_counts:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Warm the pool up so process start-up is not measured
+            list(executor.map(abs, range(workers)))
+            result = min((timed_extract(pdf_path, executor) for _ in range(repeat)), key=lambda r: r[1])
+        if result[2] != reference_text:
+            consistent = False
+            print(f"TEXT MISMATCH with {workers} workers")
+        print(f"{f'{workers} workers':<16}{result[0]:>14.3f}{result[1]:>10.3f}"
+              f"{count / result[1]:>10.1f}{serial[1] / result[1]:>9.2f}x")
+    return consistent
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark parallel PDF text extraction")
+    parser.add_argument("inputs", nargs="*", help="PDF files (default: a generated archive)")
+    parser.add_argument("--pages", type=int, default=400, help="Pages of the generated archive")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({2, 4, os.cpu_count() or 1}), help="Pool sizes to compare")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode; the fastest is reported")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        inputs = args.inputs
+        if not inputs:
+            generated = os.path.join(temp_dir, f"lab_archive_{args.pages}p.pdf")
+            make_archive(generated, args.pages)
+            inputs = [generated]
+
+        consistent = all([benchmark(path, args.workers, args.repeat) for path in inputs])
+    return 0 if consistent else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark the reference range engine on synthetic reports.
+
+Generates reports with a mix of range formats ("a-b", "a – b", "<x",
+">x", "a to b", units and thousands separators) and compares the
+per-parameter string splitting previously done on every request with
+``evaluate_reports``, which parses each distinct range once and compares
+all values as arrays. Directions are checked to agree wherever the old
+logic could determine one.
+
+Usage (from the fastAPI directory):
+    python -m benchmarks.reference_ranges
+    python -m benchmarks.reference_ranges --reports 10000 --parameters 30
+"""
+
+import sys
+import time
+import random
+import argparse
+from typing import Dict, Any, List, Optional
+
+from app.services import reference_ranges
+from app.services.reference_ranges import evaluate_reports
+
+# name -> (low, high, unit); None marks an open bound
+PARAMETERS = {
+    "Hemoglobin": (12.0, 15.5, "g/dL"),
+    "WBC Count": (4000, 11000, "/uL"),
+    "Platelet Count": (150, 400, "x10^3/uL"),
+    "Glucose, Fasting": (70, 100, "mg/dL"),
+    "Total Cholesterol": (None, 200, "mg/dL"),
+    "HDL Cholesterol": (40, None, "mg/dL"),
+    "Triglycerides": (None, 150, "mg/dL"),
+    "TSH": (0.4, 4.0, "mIU/L"),
+    "Creatinine": (0.6, 1.2, "mg/dL"),
+    "Sodium": (135, 145, "mmol/L"),
+    "Potassium": (3.5, 5.1, "mmol/L"),
+    "HbA1c": (None, 5.7, "%"),
+    "Vitamin D": (30, 100, "ng/mL"),
+    "ALT": (7, 56, "U/L"),
+}
+
+def format_range(low: Optional[float], high: Optional[float], unit: str, rng: random.Random) -> str:
+    """Write a range the way different labs do"""
+    if low is None:
+        return rng.choice([f"<{high}", f"< {high} {unit}", f"Up to {high}"])
+    if high is None:
+        return rng.choice([f">{low}", f"> {low} {unit}"])
+    if high >= 1000:
+        return f"{low:,} - {high:,} {unit}"
+    return rng.choice([f"{low}-{high}", f"{low} – {high}", f"{low} to {high} {unit}", f"{low} - {high}"])
+
+def synthetic_report(rng: random.Random, parameters: int) -> Dict[str, Any]:
+    """A processed analysis with one section of results"""
+    results = []
+    for idx in range(parameters):
+        name, (low, high, unit) = rng.choice(list(PARAMETERS.items()))
+        center = low if high is None else high if low is None else (low + high) / 2
+        value = round(center * rng.uniform(0.5, 1.5), 2)
+        results.append({
+            "name": f"{name} {idx}",
+            "value": value if rng.random() < 0.8 else str(value),
+            "unit": unit,
+            "reference_range": format_range(low, high, unit, rng)
+        })
+    return {"test_sections": [{"section_name": "Results", "parameters": results}]}
+
+def legacy_direction(value: Any, ref_range: str) -> Optional[str]:
+    """Direction as derived per parameter before the range engine"""
+    if not isinstance(value, (int, float)):
+        return None
+    try:
+        if "-" in ref_range:
+            min_val, max_val = ref_range.split("-", 1)
+            min_val = float(min_val.strip().replace("<", "").replace(">", ""))
+            max_val = float(max_val.strip().replace("<", "").replace(">", ""))
+            return "low" if value < min_val else "high" if value > max_val else None
+        if "<" in ref_range:
+            return "high" if value > float(ref_range.replace("<", "").strip()) else None
+        if ">" in ref_range:
+            return "low" if value < float(ref_range.replace(">", "").strip()) else None
+    except ValueError:
+        pass
+    return None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the reference range engine")
+    parser.add_argument("--reports", type=int, default=10000, help="Synthetic reports")
+    parser.add_argument("--parameters", type=int, default=30, help="Results per report")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    reports = [synthetic_report(rng, args.parameters) for _ in range(args.reports)]
+    total = args.reports * args.parameters
+    print(f"{args.reports} reports, {total} results")
+
+    start = time.perf_counter()
+    legacy = [
+        legacy_direction(param["value"], param["reference_range"])
+        for report in reports
+        for section in report["test_sections"]
+        for param in section["parameters"]
+    ]
+    legacy_seconds = time.perf_counter() - start
+
+    reference_ranges.parse_range.cache_clear()
+    start = time.perf_counter()
+    parameters, report_index, evaluation = evaluate_reports(reports)
+    engine_seconds = time.perf_counter() - start
+
+    # Steady state: the range strings of earlier reports are already parsed
+    start = time.perf_counter()
+    evaluate_reports(reports)
+    warm_seconds = time.perf_counter() - start
+
+    directions = evaluation.directions
+    disagreements = sum(
+        1 for old, new in zip(legacy, directions)
+        if old is not None and old != new
+    )
+    legacy_known = sum(1 for old in legacy if old is not None)
+
+    print(f"{'method':<28}{'seconds':>10}{'results/s':>14}")
+    for name, seconds in [
+        ("per-parameter parsing", legacy_seconds),
+        ("range engine (cold cache)", engine_seconds),
+        ("range engine (warm cache)", warm_seconds),
+    ]:
+        print(f"{name:<28}{seconds:>10.3f}{total / seconds:>14,.0f}")
+
+    print(f"\nAbnormal: {int(evaluation.abnormal.sum())} of {len(evaluation)} "
+          f"in {len(set(report_index[evaluation.abnormal].tolist()))} reports")
+    print(f"Ranges understood: engine {int((evaluation.codes != reference_ranges.UNKNOWN).sum())} results; "
+          f"old logic flagged {legacy_known} as abnormal")
+    print(f"Disagreements where the old logic found a direction: {disagreements}")
+    return 1 if disagreements else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark sparse fieldsets against parsing whole reports.
+
+For every analysis in the processed directory (or the given files), the
+requested fields are read by decoding only the top-level sections that
+hold them and compared with projecting the fully parsed report. The
+script reports the parse time of both and the response size with and
+without the projection, and fails if the two ever differ.
+
+Usage (from the fastAPI directory):
+    python -m benchmarks.report_fields
+    python -m benchmarks.report_fields --fields patient_info,abnormal_parameters --repeat 2000
+"""
+
+import sys
+import json
+import time
+import argparse
+from typing import List, Optional
+
+from app.services.file_store import processed_store
+from app.services.report_fields import parse_fields, project, load_sections, top_level_keys
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark sparse report fieldsets")
+    parser.add_argument("inputs", nargs="*", help="Analysis JSON files (default: the processed directory)")
+    parser.add_argument("--fields", default="patient_info,abnormal_parameters", help="Fields to project")
+    parser.add_argument("--repeat", type=int, default=1000, help="Parses per file and method")
+    args = parser.parse_args(argv)
+
+    fields = parse_fields(args.fields)
+    keys = top_level_keys(fields)
+    paths = args.inputs or sorted(str(path) for path in processed_store.iter_files() if path.suffix == ".json")
+    if not paths:
+        print("No analyses found")
+        return 1
+
+    print(f"{'file':<52}{'bytes':>9}{'projected':>11}{'full s':>9}{'sections s':>12}{'speed-up':>10}")
+    mismatches = 0
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            expected = project(json.loads(text), fields)
+        full_seconds = time.perf_counter() - start
+
+        sections = load_sections(text, keys)
+        if sections is None:
+            print(f"{path[-52:]:<52}{len(text):>9}  not laid out with indent=2, parsed whole")
+            continue
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            projected = project(load_sections(text, keys), fields)
+        sections_seconds = time.perf_counter() - start
+
+        if projected != expected:
+            mismatches += 1
+            print(f"MISMATCH in {path}")
+        size = len(json.dumps(projected).encode("utf-8"))
+        print(f"{path[-52:]:<52}{len(text):>9}{size:>11}{full_seconds:>9.3f}{sections_seconds:>12.3f}"
+              f"{full_seconds / sections_seconds:>9.2f}x")
+
+    print(f"\nMismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
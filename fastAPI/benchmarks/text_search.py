@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark full-text search latency on a synthetic index.
+
+Builds an index of generated lab reports in a temporary file (or uses an
+existing one with ``--index``), then times each query and prints the p50
+and p95 per query. Queries mix terms found in almost every report (the
+costly case for ranking), rare terms, prefixes and phrases.
+
+Usage (from the fastAPI directory):
+    python -m benchmarks.text_search
+    python -m benchmarks.text_search --documents 1000000 --repeat 50
+    python -m benchmarks.text_search --index index/text_search.db "hemoglobin" "dr smith"
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from typing import List, Optional
+
+from app.services.text_index import TextIndex
+
+PARAMETERS = [
+    "Hemoglobin", "Hematocrit", "WBC", "RBC", "Platelets", "MCV", "MCH", "Glucose", "HbA1c",
+    "Cholesterol", "Triglycerides", "HDL", "LDL", "Creatinine", "Urea", "ALT", "AST", "TSH",
+    "Ferritin", "Vitamin D", "Vitamin B12", "Sodium", "Potassium", "Calcium", "CRP"
+]
+LABS = ["Acme Diagnostics", "City Pathology", "Northside Labs", "Metro Clinical", "Sunrise Health"]
+DOCTORS = ["Dr. Smith", "Dr. Patel", "Dr. Garcia", "Dr. Chen", "Dr. Okafor", "Dr. Müller"]
+
+DEFAULT_QUERIES = ["hemoglobin", "glucose cholesterol", "\"dr patel\"", "vitam*", "ferritin northside", "zzz"]
+
+def synthetic_report(rnd: random.Random, number: int) -> str:
+    lines = [
+        f"{rnd.choice(LABS)} - Laboratory Report {number}",
+        f"Referred by {rnd.choice(DOCTORS)}",
+        f"Patient ID P{rnd.randrange(10**6):06d}  Sample {rnd.randrange(10**8)}"
+    ]
+    for name in rnd.sample(PARAMETERS, rnd.randint(8, 18)):
+        lines.append(f"{name} {rnd.uniform(0.5, 300):.1f} ref {rnd.uniform(0.1, 50):.1f}-{rnd.uniform(50, 400):.1f}")
+    return "\n".join(lines)
+
+def build_index(index: TextIndex, documents: int, batch_size: int = 5000) -> None:
+    rnd = random.Random(0)
+    start = time.perf_counter()
+    for first in range(0, documents, batch_size):
+        index.index_many([
+            {"document_id": f"doc-{n}", "text": synthetic_report(rnd, n)}
+            for n in range(first, min(first + batch_size, documents))
+        ])
+    index.optimize()
+    print(f"Indexed {documents} documents in {time.perf_counter() - start:.1f}s")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark full-text search latency")
+    parser.add_argument("queries", nargs="*", help="Queries to time (default: a built-in mix)")
+    parser.add_argument("--index", help="Existing index to query instead of building one")
+    parser.add_argument("--documents", type=int, default=100000, help="Synthetic documents to index")
+    parser.add_argument("--page-size", type=int, default=20, help="Results per query")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query")
+    args = parser.parse_args(argv)
+
+    temp_dir = None
+    if args.index:
+        index = TextIndex(args.index)
+    else:
+        temp_dir = tempfile.TemporaryDirectory()
+        index = TextIndex(os.path.join(temp_dir.name, "text_search.db"))
+        build_index(index, args.documents)
+
+    try:
+        print(f"{'query':<28}{'results':>9}{'p50 ms':>10}{'p95 ms':>10}")
+        slowest = 0.0
+        for query in args.queries or DEFAULT_QUERIES:
+            durations = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                found = index.search(query, args.page_size)
+                durations.append((time.perf_counter() - start) * 1000)
+            durations.sort()
+            p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+            slowest = max(slowest, p95)
+            results = f"{len(found['results'])}{'+' if found['has_more'] else ''}"
+            print(f"{query[:27]:<28}{results:>9}{statistics.median(durations):>10.1f}{p95:>10.1f}")
+        print(f"Slowest p95: {slowest:.1f} ms over {index.count()} documents")
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Build the lab value series behind the dashboard trends from stored analyses.
+
+Results are added to the series as analyses complete; this adds results of
+analyses stored before the series existed, or rebuilds them after they were
+lost. Rows are replaced per run, so running it again does not duplicate
+measurements. The API can keep running while the series are built.
+
+Usage:
+    python build_trends.py
+    python build_trends.py --rebuild --batch-size 1000
+"""
+
+import sys
+import time
+import logging
+import argparse
+from typing import Any, List, Optional
+
+from app.config import settings
+from app.services.lab_series import lab_series
+from app.services.report_cache import report_files
+from app.services.report_pack import decode_document
+
+logger = logging.getLogger("build_trends")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the lab value series from stored analyses")
+    parser.add_argument("--rebuild", action="store_true", help="Remove every series first")
+    parser.add_argument("--batch-size", type=int, default=500, help="Analyses added per batch")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log each analysis")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format=settings.LOG_FORMAT
+    )
+
+    if args.rebuild:
+        print(f"Removed {lab_series.clear()} series")
+
+    start = time.perf_counter()
+    batch: List[Any] = []
+    analyses = rows = failed = 0
+    for store, info in report_files():
+        try:
+            analysis = decode_document(store.get(info.key))
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            failed += 1
+            print(f"Failed: {info.key}: {e}", file=sys.stderr)
+            continue
+
+        batch.append(analysis)
+        logger.debug(f"Reading {info.key}")
+        if len(batch) >= args.batch_size:
+            rows += lab_series.append_reports(batch)
+            analyses += len(batch)
+            batch = []
+            print(f"Read {analyses} analyses...", end="\r", flush=True)
+
+    rows += lab_series.append_reports(batch)
+    analyses += len(batch)
+
+    print(f"Added {rows} results from {analyses} analyses in {time.perf_counter() - start:.1f}s, {failed} failed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
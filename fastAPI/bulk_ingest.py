@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Bulk ingest a directory of blood test reports.
+
+Runs the same pipeline stages as the API as a staged pipeline, so text
+extraction (in a process pool) of some reports overlaps with LLM analysis
+of others. Results are written to the processed store and the report
+catalog. Progress is checkpointed so an interrupted ingest can be
+restarted and will skip finished files.
+
+Usage:
+    python bulk_ingest.py /path/to/reports --provider claude --llm-concurrency 4
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.analysis_pipeline import (
+    AnalysisRun,
+    extract_stage,
+    compact_stage,
+    llm_stage,
+    parse_stage,
+    persist_stage,
+    analysis_records,
+    complete_stored_run
+)
+from app.services.staged_pipeline import Stage, StagedPipeline, PipelineReport
+from app.services.text_index import text_index_updates
+from app.services.run_store import create_run, update_run
+
+logger = logging.getLogger("bulk_ingest")
+
+SUPPORTED_EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif', '.webp'}
+
+class Checkpoint:
+    """
+    JSON Lines log of per-file progress.
+
+    A file is identified by its absolute path, size and modification time,
+    so a file that changed since it was ingested is processed again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partial line from a crash
+                        continue
+                    self.entries[entry["key"]] = entry
+
+    @staticmethod
+    def key(file_path: Path) -> str:
+        stat = file_path.stat()
+        return f"{file_path.resolve()}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    def get(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        return self.entries.get(self.key(file_path))
+
+    def record(self, file_path: Path, **fields) -> None:
+        entry = {"key": self.key(file_path), "path": str(file_path), "time": time.time(), **fields}
+        self.entries[entry["key"]] = entry
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+def find_reports(directory: Path, recursive: bool = True) -> List[Path]:
+    """List supported report files in a directory"""
+    pattern = "**/*" if recursive else "*"
+    return sorted(
+        path for path in directory.glob(pattern)
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS
+    )
+
+class BulkIngest:
+    """Drives the analysis pipeline over many files"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.checkpoint = Checkpoint(Path(args.checkpoint))
+        self.stage_totals: Dict[str, float] = {}
+        self.stage_counts: Dict[str, int] = {}
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.pages = 0
+        self.report: Optional[PipelineReport] = None
+
+    def should_skip(self, file_path: Path) -> bool:
+        entry = self.checkpoint.get(file_path)
+        if not entry:
+            return False
+        if entry["status"] == "completed":
+            return True
+        # The run_id is reused on retry; a run that stored its analysis is
+        # finished rather than analyzed again (its responses are cached as immutable)
+        if entry.get("run_id") and complete_stored_run(entry["run_id"]):
+            self.checkpoint.record(file_path, run_id=entry["run_id"], status="completed", pages=entry.get("pages", 0))
+            return True
+        return entry["status"] == "failed" and not self.args.retry_failed
+
+    def start_run(self, file_path: Path) -> AnalysisRun:
+        """Create the run for a file, reusing the run_id of an interrupted attempt"""
+        entry = self.checkpoint.get(file_path) or {}
+        run_id = entry.get("run_id") or str(uuid.uuid4())
+        self.checkpoint.record(file_path, run_id=run_id, status="started")
+        create_run(run_id, self.args.provider, self.args.model, file_path.name, status="started")
+        return AnalysisRun(
+            run_id, run_id, file_path, file_path.name,
+            self.args.provider, self.args.model, context=self.args.context
+        )
+
+    def finish_run(self, run: AnalysisRun, error: Optional[str] = None) -> None:
+        """Checkpoint a finished run and add its timings to the totals"""
+        outcome = "failed" if error else "completed"
+        run.observe(outcome)
+
+        pages = run.page_count if run.text else 0
+        self.checkpoint.record(run.file_path, run_id=run.run_id, status=outcome, pages=pages, error=error)
+        for stage, seconds in run.timer.durations.items():
+            self.stage_totals[stage] = self.stage_totals.get(stage, 0.0) + seconds
+            self.stage_counts[stage] = self.stage_counts.get(stage, 0) + 1
+
+        if error:
+            self.failed += 1
+            print(f"[failed] {run.file_path}: {error}")
+        else:
+            self.completed += 1
+            self.pages += pages
+            print(f"[ok]     {run.file_path} ({pages} pages, {time.time() - run.start_time:.1f}s)")
+
+    def on_error(self, run: AnalysisRun, stage: str, error: Exception) -> None:
+        if isinstance(error, HTTPException):
+            message = str(error.detail)
+        else:
+            message = str(error)
+            logger.error(f"[{run.run_id}] Error in {stage} stage for {run.file_path}: {message}", exc_info=error)
+        update_run(run.run_id, status="failed", error=message)
+        self.finish_run(run, error=message)
+
+    def build_pipeline(self, executor: ProcessPoolExecutor) -> StagedPipeline:
+        """Build the extract -> compact -> LLM -> validate -> persist pipeline"""
+        args = self.args
+
+        async def extract(run: AnalysisRun) -> AnalysisRun:
+            return await extract_stage(run, executor, delete_unsupported=False)
+
+        async def compact(run: AnalysisRun) -> AnalysisRun:
+            return compact_stage(run)
+
+        async def validate(run: AnalysisRun) -> AnalysisRun:
+            return parse_stage(run)
+
+        return StagedPipeline(
+            [
+                Stage("extract", extract, workers=args.extract_workers),
+                Stage("compact", compact),
+                Stage("llm", llm_stage, workers=args.llm_concurrency),
+                Stage("validate", validate),
+                Stage("persist", persist_stage, workers=2)
+            ],
+            queue_size=args.queue_size,
+            on_complete=self.finish_run,
+            on_error=self.on_error
+        )
+
+    async def run(self, files: List[Path]) -> None:
+        todo = []
+        for file_path in files:
+            if self.should_skip(file_path):
+                self.skipped += 1
+            else:
+                todo.append(file_path)
+
+        print(f"Found {len(files)} reports, {len(todo)} to process, {self.skipped} already done")
+
+        # Views, catalog rows and text index updates are written in batches
+        await analysis_records.start()
+        await text_index_updates.start()
+        try:
+            with ProcessPoolExecutor(max_workers=self.args.extract_workers) as executor:
+                pipeline = self.build_pipeline(executor)
+                # Runs are created lazily as the pipeline has room for them
+                self.report = await pipeline.run(self.start_run(file_path) for file_path in todo)
+        finally:
+            await analysis_records.stop()
+            await text_index_updates.stop()
+
+    def print_summary(self, elapsed: float) -> None:
+        minutes = elapsed / 60 if elapsed else 0
+        print()
+        print(f"Processed {self.completed} reports ({self.pages} pages) in {elapsed:.1f}s; "
+              f"{self.failed} failed, {self.skipped} skipped")
+        if minutes:
+            print(f"Throughput: {self.completed / minutes:.1f} docs/min, {self.pages / minutes:.1f} pages/min")
+
+        if self.report:
+            print()
+            print(self.report.summary())
+
+        if self.stage_totals:
+            print()
+            print(f"{'stage':<24}{'total (s)':>12}{'mean (s)':>12}{'count':>8}")
+            for stage, total in sorted(self.stage_totals.items(), key=lambda item: -item[1]):
+                count = self.stage_counts[stage]
+                print(f"{stage:<24}{total:>12.2f}{total / count:>12.3f}{count:>8}")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk ingest a directory of blood test reports")
+    parser.add_argument("directory", help="Directory containing PDF or image reports")
+    parser.add_argument("--provider", default=settings.DEFAULT_LLM_PROVIDER, help="LLM provider")
+    parser.add_argument("--model", default=settings.DEFAULT_LLM_MODEL, help="LLM model")
+    parser.add_argument("--context", help="Additional context passed to the LLM for every report")
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 2,
+                        help="Processes used for text extraction")
+    parser.add_argument("--llm-concurrency", type=int, default=4,
+                        help="Maximum concurrent LLM calls")
+    parser.add_argument("--queue-size", type=int, default=4,
+                        help="Documents buffered between pipeline stages")
+    parser.add_argument("--checkpoint", default=os.path.join(settings.INDEX_DIR, "bulk_ingest.jsonl"),
+                        help="Checkpoint file used to resume an interrupted ingest")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Process files that failed in an earlier run again")
+    parser.add_argument("--no-recursive", action="store_true", help="Do not descend into subdirectories")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log pipeline progress")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format=settings.LOG_FORMAT
+    )
+
+    directory = Path(args.directory)
+    if not directory.is_dir():
+        print(f"Error: {directory} is not a directory", file=sys.stderr)
+        return 1
+
+    files = find_reports(directory, recursive=not args.no_recursive)
+    ingest = BulkIngest(args)
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(ingest.run(files))
+    except KeyboardInterrupt:
+        print("\nInterrupted; run again to resume from the checkpoint", file=sys.stderr)
+    ingest.print_summary(time.perf_counter() - start)
+    return 1 if ingest.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Build the full-text search index from the text store.
+
+New text is indexed as it is stored; this indexes text stored before the
+index existed, or rebuilds the index after it was lost or copied to a new
+API node. Documents that belong to an analysis run are linked to the run
+and its original file name from the run store. The API can keep running
+while the index is built.
+
+Usage:
+    python index_text.py
+    python index_text.py --rebuild --batch-size 1000
+"""
+
+import sys
+import time
+import logging
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.blob_store import get_blob_store
+from app.services.run_store import run_store
+from app.services.text_index import text_index
+
+logger = logging.getLogger("index_text")
+
+def run_documents() -> Dict[str, Tuple[str, Optional[str]]]:
+    """Run ID and original file name of each document analyzed by a run"""
+    documents = {}
+    if not run_store.runs_dir.is_dir():
+        return documents
+    for path in run_store.runs_dir.glob("*.json"):
+        run_data = run_store.get(path.stem)
+        document_id = (run_data or {}).get("metadata", {}).get("document_id")
+        if document_id:
+            documents[document_id] = (run_data["run_id"], run_data.get("filename"))
+    return documents
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the full-text search index from the text store")
+    parser.add_argument("--rebuild", action="store_true", help="Clear the index first")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents indexed per transaction")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log each document")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format=settings.LOG_FORMAT
+    )
+
+    try:
+        if args.rebuild:
+            text_index.clear()
+        before = text_index.count()
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    texts = get_blob_store("text")
+    runs = run_documents()
+    start = time.perf_counter()
+    batch: List[Dict[str, Any]] = []
+    indexed = failed = 0
+    for info in texts.list():
+        if not info.key.endswith(".txt"):
+            continue
+        document_id = info.key[:-len(".txt")]
+        try:
+            text = texts.get(info.key).decode("utf-8", errors="replace")
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            failed += 1
+            print(f"Failed: {info.key}: {e}", file=sys.stderr)
+            continue
+
+        run_id, filename = runs.get(document_id, (None, None))
+        batch.append({"document_id": document_id, "text": text, "filename": filename, "run_id": run_id})
+        logger.debug(f"Indexing {info.key}")
+        if len(batch) >= args.batch_size:
+            text_index.index_many(batch)
+            indexed += len(batch)
+            batch = []
+            print(f"Indexed {indexed} documents...", end="\r", flush=True)
+
+    text_index.index_many(batch)
+    indexed += len(batch)
+    text_index.optimize()
+
+    print(f"Indexed {indexed} documents in {time.perf_counter() - start:.1f}s, {failed} failed; "
+          f"{text_index.count()} in the index ({before} before)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
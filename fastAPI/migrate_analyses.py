@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Convert stored analyses between JSON and report packs.
+
+Report packs (see app/services/report_pack.py) are compressed and carry
+the listing fields in a small header. Every analysis in the processed
+blob store is converted, checked to decode to the same document, written
+and recorded with fresh views and catalog rows. The originals are removed
+unless --keep is given. Readers accept both formats, so the API can keep
+running during a migration.
+
+Usage:
+    python migrate_analyses.py                      # JSON -> packs in the processed store
+    python migrate_analyses.py --to json            # packs -> JSON
+    python migrate_analyses.py --codec zlib --dry-run
+"""
+
+import sys
+import logging
+import argparse
+from typing import List, Optional
+
+from app.config import settings
+from app.services.analysis_pipeline import record_analysis
+from app.services.blob_store import BlobStore, get_blob_store
+from app.services.report_pack import (
+    PACK_SUFFIX, available_codec, converted_name, decode_document, decode_pack, encode_pack
+)
+from app.utils.http_cache import content_hash
+from app.utils.json_io import dump_document, loads
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+def convert(store: BlobStore, key: str, to_format: str, codec: str) -> bytes:
+    """Encode one analysis in the target format, verifying it decodes back"""
+    document = decode_document(store.get(key))
+    if to_format == "pack":
+        data = encode_pack(document, codec)
+        decoded = decode_pack(data)
+    else:
+        data = dump_document(document)
+        decoded = loads(data)
+    if decoded != document:
+        raise ValueError("converted document does not decode to the original")
+    return data
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Convert stored analyses between JSON and report packs")
+    parser.add_argument("--to", choices=["pack", "json"], default="pack", help="Target format")
+    parser.add_argument("--codec", default=settings.ANALYSIS_PACK_CODEC,
+                        help="Pack compression: zstd (if installed) or zlib")
+    parser.add_argument("--keep", action="store_true",
+                        help="Keep the original files (lookups may then find either copy)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be converted")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log each file")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format=settings.LOG_FORMAT
+    )
+
+    store = get_blob_store("processed")
+    source_suffix = ".json" if args.to == "pack" else PACK_SUFFIX
+    infos = sorted(
+        (info for info in store.list() if info.key.endswith("_analysis" + source_suffix)),
+        key=lambda info: info.key
+    )
+    codec = available_codec(args.codec)
+    if args.to == "pack" and codec != args.codec.lower():
+        print(f"Codec {args.codec} is not available, using {codec}", file=sys.stderr)
+
+    converted = failed = 0
+    bytes_before = bytes_after = 0
+    for info in infos:
+        target = converted_name(info.key, args.to)
+        try:
+            data = convert(store, info.key, args.to, codec)
+        except Exception as e:
+            failed += 1
+            print(f"Failed: {info.key}: {e}", file=sys.stderr)
+            continue
+
+        bytes_before += info.size
+        bytes_after += len(data)
+        converted += 1
+        logger.info(f"{info.key} -> {target}: {info.size} -> {len(data)} bytes")
+        if args.dry_run:
+            continue
+
+        store.put(target, data)
+        record_analysis(target, decode_document(data), content_hash(data))
+        if not args.keep:
+            store.delete(info.key)
+
+    action = "Would convert" if args.dry_run else "Converted"
+    print(f"{action} {converted} of {len(infos)} analyses to {args.to}"
+          f"{f' ({codec})' if args.to == 'pack' else ''}, {failed} failed")
+    if bytes_before:
+        print(f"Size: {bytes_before:,} -> {bytes_after:,} bytes ({bytes_after / bytes_before:.0%})")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
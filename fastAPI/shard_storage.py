@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Move files from the flat upload, text, processed and views directories
+into their shard directories (see app/services/file_store.py).
+
+Lookups find a file at its shard path or at the root, and each move is
+a rename, so this can run while the API is serving. Analyses that are
+moved get their views and catalog row rewritten with the new location.
+Only the local blob backend (BLOB_BACKEND=local) is sharded.
+Uploads of runs that have not finished are left where their job expects
+them; run the tool again once they are done.
+
+Usage:
+    python shard_storage.py --dry-run
+    python shard_storage.py
+    python shard_storage.py --stores processed views
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.services.analysis_pipeline import record_analysis
+from app.services.blob_store import LOCAL_AREAS
+from app.services.file_store import FileStore, processed_store, text_store, upload_store
+from app.services.report_pack import is_analysis_file, read_document
+from app.services.run_store import run_store
+from app.utils.http_cache import file_digest
+
+logger = logging.getLogger("shard_storage")
+
+STORES: Dict[str, FileStore] = {
+    "uploads": upload_store,
+    "text": text_store,
+    "views": LOCAL_AREAS["views"],
+    "processed": processed_store,
+}
+
+def unsharded_files(store: FileStore) -> List[Path]:
+    """Files still in the root of a store"""
+    if not store.root.is_dir():
+        return []
+    return sorted(
+        Path(entry.path) for entry in os.scandir(store.root)
+        if entry.is_file() and not entry.name.endswith(".tmp")
+    )
+
+def pending_uploads() -> set:
+    """Uploads that unfinished runs will read from their current path"""
+    return {
+        Path(run["job"]["file_path"]).resolve()
+        for run in run_store.list_incomplete()
+        if run.get("job", {}).get("file_path")
+    }
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Move stored files into shard directories")
+    parser.add_argument("--stores", nargs="+", choices=list(STORES), default=list(STORES),
+                        help="Stores to migrate")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the files that would move")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log each file")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format=settings.LOG_FORMAT
+    )
+
+    if settings.BLOB_BACKEND.lower() != "local":
+        print(f"BLOB_BACKEND is {settings.BLOB_BACKEND}; only local storage is sharded", file=sys.stderr)
+        return 1
+
+    if settings.STORAGE_SHARD_DEPTH == 0:
+        print("STORAGE_SHARD_DEPTH is 0; files are stored unsharded", file=sys.stderr)
+        return 1
+
+    pending = pending_uploads() if "uploads" in args.stores else set()
+    failed = 0
+    start = time.perf_counter()
+    for name in args.stores:
+        store = STORES[name]
+        files = unsharded_files(store)
+        moved = skipped = 0
+        for path in files:
+            if name == "uploads" and path.resolve() in pending:
+                skipped += 1
+                continue
+            if args.dry_run:
+                moved += 1
+                continue
+            try:
+                target = store.migrate(path)
+                if target is None:
+                    continue
+                moved += 1
+                if name == "processed" and is_analysis_file(target.name) and "_analysis" in target.name:
+                    # Views and catalog rows point at the analysis by location
+                    record_analysis(target.name, read_document(target), file_digest(str(target)))
+            except Exception as e:
+                failed += 1
+                print(f"Failed: {path}: {e}", file=sys.stderr)
+
+        action = "would move" if args.dry_run else "moved"
+        print(f"{name}: {action} {moved} of {len(files)} files in {store.root}"
+              f"{f', {skipped} pending uploads left in place' if skipped else ''}")
+
+    print(f"Done in {time.perf_counter() - start:.1f}s, {failed} failed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+"""
+Shared test fixtures.
+"""
+
+import pytest
+
+from app.config import settings
+
+@pytest.fixture(autouse=True)
+def scratch_dir(monkeypatch, tmp_path_factory):
+    """Keep working copies made by the stores out of the source tree"""
+    path = tmp_path_factory.mktemp("scratch")
+    monkeypatch.setattr(settings, "SCRATCH_DIR", str(path))
+    return path
@@ -0,0 +1,80 @@
+"""
+Contract tests for the blob store backends.
+
+The local and in-memory backends must behave the same for every operation
+the routes and pipeline use.
+"""
+
+import pytest
+
+from app.services.blob_store import LocalBlobStore, MemoryBlobStore
+from app.services.file_store import FileStore
+
+@pytest.fixture(params=["local", "memory"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBlobStore("processed")
+    return LocalBlobStore("processed", FileStore(str(tmp_path / "processed")))
+
+def test_put_get_stat(store):
+    info = store.put("run_analysis.json", b'{"a": 1}')
+    assert info.key == "run_analysis.json"
+    assert info.size == 8
+    assert store.get("run_analysis.json") == b'{"a": 1}'
+    assert store.exists("run_analysis.json")
+    assert store.stat("run_analysis.json").version == info.version
+
+def test_missing(store):
+    assert store.stat("missing.json") is None
+    assert not store.exists("missing.json")
+    assert not store.delete("missing.json")
+    with pytest.raises(FileNotFoundError):
+        store.get("missing.json")
+
+def test_rewrite_changes_version(store):
+    first = store.put("report.json", b"one")
+    second = store.put("report.json", b"two")
+    assert first.version != second.version
+    assert store.get("report.json") == b"two"
+
+def test_read_range(store):
+    store.put("pack.bin", bytes(range(100)))
+    assert store.read_range("pack.bin", 10, 20) == bytes(range(10, 20))
+    assert store.read_range("pack.bin", 90) == bytes(range(90, 100))
+    assert b"".join(store.iter_chunks("pack.bin", 5, 50, chunk_size=7)) == bytes(range(5, 50))
+
+def test_delete_and_list(store):
+    for key in ("a.txt", "b.txt", "c.txt"):
+        store.put(key, key.encode())
+    assert store.delete("b.txt")
+    assert sorted(info.key for info in store.list()) == ["a.txt", "c.txt"]
+
+def test_keys_keep_last_path_component(store):
+    store.put("../../etc/passwd", b"x")
+    assert store.get("passwd") == b"x"
+
+def test_multipart(store):
+    with store.multipart("upload.pdf") as upload:
+        upload.write(b"part one, ")
+        upload.write(b"part two")
+        assert not store.exists("upload.pdf")
+        info = upload.complete()
+    assert info.size == 18
+    assert store.get("upload.pdf") == b"part one, part two"
+
+def test_uncompleted_multipart_leaves_nothing(store):
+    with pytest.raises(RuntimeError):
+        with store.multipart("upload.pdf") as upload:
+            upload.write(b"partial")
+            raise RuntimeError("client went away")
+    with store.multipart("other.pdf") as upload:
+        upload.write(b"never completed")
+    assert not store.exists("upload.pdf")
+    assert not store.exists("other.pdf")
+
+def test_put_file_and_local_path(store, tmp_path):
+    source = tmp_path / "scan.png"
+    source.write_bytes(b"\x89PNG data")
+    store.put_file("doc.png", source)
+    with store.local_path("doc.png") as path:
+        assert path.read_bytes() == b"\x89PNG data"
@@ -0,0 +1,68 @@
+"""
+Tests for the lab value trend endpoints of the dashboard.
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import dashboard
+from app.services.blob_store import MemoryBlobStore
+from app.services.lab_series import LabSeriesStore
+
+def report(run_id, date, hemoglobin, glucose):
+    return {
+        "metadata": {"run_id": run_id},
+        "patient_info": {"name": "Jane Doe"},
+        "report_info": {"report_date": date},
+        "test_sections": [{"section_name": "CBC", "parameters": [
+            {"name": "Hemoglobin (Hb)", "value": hemoglobin, "unit": "g/dL", "reference_range": "12-16"},
+            {"name": "Fasting Blood Sugar", "value": f"{glucose} mg/dL", "unit": "mg/dL"},
+            {"name": "Remarks", "value": "see note", "unit": ""}
+        ]}]
+    }
+
+@pytest.fixture
+def client(monkeypatch):
+    store = LabSeriesStore(MemoryBlobStore("trends"))
+    store.append_reports([
+        report("r1", "2024-01-01", 12.0, 110),
+        report("r2", "2024-02-01", 13.0, 100),
+        report("r3", "2024-03-01", 14.0, 90)
+    ])
+    monkeypatch.setattr(dashboard, "lab_series", store)
+    app = FastAPI()
+    app.include_router(dashboard.router)
+    return TestClient(app)
+
+def test_trends(client):
+    response = client.get("/trends", params={
+        "user_id": "Jane Doe", "metrics": ["Hb"], "window": 2,
+        "start_date": "2023-12-01T00:00:00", "end_date": "2024-12-01T00:00:00"
+    })
+    assert response.status_code == 200
+    trends = response.json()["trends"]
+    assert [trend["metric"] for trend in trends] == ["hemoglobin"]
+    points = trends[0]["data_points"]
+    assert [point["value"] for point in points] == [12.0, 13.0, 14.0]
+    assert [point["rolling_mean"] for point in points] == [12.0, 12.5, 13.5]
+    assert trends[0]["trend"] == "increasing"
+    assert trends[0]["change_rate"] == pytest.approx(16.67)
+
+def test_rerun_replaces_results(client):
+    dashboard.lab_series.append_reports([report("r2", "2024-02-01", 12.5, 100)])
+    response = client.get("/trends", params={
+        "user_id": "jane doe", "metrics": ["hemoglobin"],
+        "start_date": "2023-12-01T00:00:00", "end_date": "2024-12-01T00:00:00"
+    })
+    assert [point["value"] for point in response.json()["trends"][0]["data_points"]] == [12.0, 12.5, 14.0]
+
+def test_trends_unknown_user(client):
+    assert client.get("/trends", params={"user_id": "nobody"}).status_code == 404
+
+def test_summary_rejects_unknown_timeframe(client):
+    assert client.get("/summary", params={"user_id": "jane doe", "timeframe": "hourly"}).status_code == 422
+
+def test_summary_without_results(client):
+    response = client.get("/summary", params={"user_id": "jane doe", "timeframe": "weekly"})
+    assert response.status_code == 404
@@ -0,0 +1,89 @@
+"""
+Tests for the document routes' use of the upload store.
+"""
+
+import pytest
+
+from app.routes import documents
+from app.services.blob_store import MemoryBlobStore
+from app.utils.json_io import dumps
+
+@pytest.fixture
+def stores(monkeypatch):
+    stores = {area: MemoryBlobStore(area) for area in ("uploads", "text")}
+    monkeypatch.setattr(documents, "get_blob_store", stores.__getitem__)
+    return stores
+
+@pytest.fixture
+def uploads(stores):
+    return stores["uploads"]
+
+@pytest.mark.parametrize("key", ["doc-1.pdf", "doc-1.jpeg", "doc-1.dat"])
+def test_delete_upload_uses_the_recorded_key(stores, uploads, key):
+    uploads.put(key, b"data")
+    uploads.put("doc-2.pdf", b"other")
+    stores["text"].put("doc-1" + documents.UPLOAD_RECORD_SUFFIX, dumps({"key": key, "filename": "scan"}))
+    assert documents.delete_upload("doc-1")
+    assert [info.key for info in uploads.list()] == ["doc-2.pdf"]
+    assert list(stores["text"].list()) == []
+
+@pytest.mark.parametrize("key", ["doc-1.pdf", "doc-1.jpeg"])
+def test_delete_unrecorded_upload_by_extension(uploads, key):
+    uploads.put(key, b"data")
+    uploads.put("doc-2.pdf", b"other")
+    assert documents.delete_upload("doc-1")
+    assert [info.key for info in uploads.list()] == ["doc-2.pdf"]
+
+def test_delete_unrecorded_upload_without_listing(uploads, monkeypatch):
+    uploads.put("doc-1.dat", b"data")
+
+    def unexpected_list(*args):
+        raise AssertionError("upload store listed to delete one upload")
+    monkeypatch.setattr(uploads, "list", unexpected_list)
+    assert not documents.delete_upload("doc-1")
+    assert uploads.exists("doc-1.dat")
+
+def test_delete_upload_missing(uploads):
+    uploads.put("doc-2.pdf", b"other")
+    assert not documents.delete_upload("doc-1")
+    assert uploads.exists("doc-2.pdf")
+
+def test_rejected_upload_is_not_stored(uploads, monkeypatch, tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.services.file_store import FileStore
+
+    monkeypatch.setattr(documents, "upload_store", FileStore(str(tmp_path), depth=0))
+    app = FastAPI()
+    app.include_router(documents.router)
+    response = TestClient(app).post("/upload", files={"file": ("notes.txt", b"plain text", "text/plain")})
+    assert response.status_code == 400
+    assert list(uploads.list()) == []
+    assert list(tmp_path.iterdir()) == []
+
+def test_upload_records_its_key_for_delete(stores, uploads, monkeypatch, tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.services.file_store import FileStore
+
+    async def fake_extract(path, file_info=None):
+        return "Hemoglobin 13.5", {}
+
+    async def no_index(entry):
+        pass
+    monkeypatch.setattr(documents, "upload_store", FileStore(str(tmp_path), depth=0))
+    monkeypatch.setattr(documents, "extract_text_from_file", fake_extract)
+    monkeypatch.setattr(documents.text_index_updates, "submit", no_index)
+    monkeypatch.setattr(documents.text_index, "remove", lambda document_id: True)
+    app = FastAPI()
+    app.include_router(documents.router)
+    client = TestClient(app)
+
+    response = client.post("/upload", files={"file": ("scan.dat", b"%PDF-1.4\n%%EOF\n", "application/octet-stream")})
+    assert response.status_code == 200
+    document_id = response.json()["id"]
+    assert [info.key for info in uploads.list()] == [f"{document_id}.dat"]
+
+    assert client.delete(f"/{document_id}").status_code == 200
+    assert list(uploads.list()) == []
+    assert list(stores["text"].list()) == []
@@ -0,0 +1,37 @@
+"""
+Tests for single-image OCR through the page cache.
+"""
+
+import numpy as np
+from PIL import Image
+
+from app.services import image_processor, ocr_cache
+from app.services.ocr_cache import OCRCache
+
+def test_process_image_uses_ocr_cache(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_image_to_string(image, config=""):
+        calls.append(config)
+        return "Hemoglobin 13.5 g/dL"
+
+    monkeypatch.setattr(ocr_cache.pytesseract, "image_to_string", fake_image_to_string)
+    monkeypatch.setattr(image_processor, "ocr_cache", OCRCache(cache_dir=str(tmp_path / "cache"), enabled=True))
+
+    image_path = tmp_path / "report.png"
+    pixels = np.full((200, 400), 255, dtype=np.uint8)
+    pixels[80:120, 50:350] = 0
+    Image.fromarray(pixels).save(image_path)
+
+    first = image_processor.process_image(str(image_path))
+    output_path = tmp_path / "report.txt"
+    second = image_processor.process_image(str(image_path), str(output_path))
+
+    assert first == second
+    assert "Hemoglobin" in first
+    assert len(calls) == 1
+    assert output_path.read_text(encoding="utf-8") == second
+
+    _, metadata = image_processor.ocr_page_image(str(image_path))
+    assert metadata["cache_hit"] is True
+    assert len(calls) == 1
@@ -0,0 +1,53 @@
+"""
+Tests for resuming interrupted analysis runs.
+"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services import analysis_pipeline, blob_store, job_queue, run_store
+from app.services.blob_store import MemoryBlobStore
+from app.services.lab_series import LabSeriesStore
+from app.services.report_catalog import ReportCatalog
+
+@pytest.fixture
+def runs(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "BLOB_BACKEND", "memory")
+    monkeypatch.setattr(blob_store, "_stores", {})
+    monkeypatch.setattr(analysis_pipeline, "report_catalog", ReportCatalog(str(tmp_path / "index")))
+    monkeypatch.setattr(analysis_pipeline, "lab_series", LabSeriesStore(MemoryBlobStore("trends")))
+    store = run_store.RunStore(str(tmp_path / "runs"))
+    monkeypatch.setattr(run_store, "run_store", store)
+    monkeypatch.setattr(job_queue, "run_store", store)
+    return store
+
+def interrupted_run(runs, run_id, upload):
+    upload.write_bytes(b"%PDF-1.4")
+    runs.create(run_id, "claude", "m", "report.pdf", "saving_results", job={
+        "document_id": run_id, "file_path": str(upload)
+    })
+
+def resume(queue):
+    async def resume_and_drain():
+        queue._queue = asyncio.Queue()
+        queue._resume_incomplete()
+        return [queue._queue.get_nowait() for _ in range(queue._queue.qsize())]
+    return asyncio.run(resume_and_drain())
+
+def test_run_with_stored_analysis_is_not_analyzed_again(runs, tmp_path):
+    interrupted_run(runs, "run-1", tmp_path / "run-1.pdf")
+    stored = {"metadata": {"run_id": "run-1"}, "patient_info": {"name": "Jane Doe"}}
+    analysis_pipeline.write_analysis("run-1_analysis.json", stored)
+
+    assert resume(job_queue.JobQueue()) == []
+    run_data = runs.get("run-1")
+    assert run_data["status"] == "completed"
+    assert run_data["metadata"]["json_path"] == "memory://processed/run-1_analysis.json"
+    assert [row["run_id"] for row in analysis_pipeline.report_catalog.rows()] == ["run-1"]
+
+def test_run_without_analysis_is_resumed(runs, tmp_path):
+    interrupted_run(runs, "run-2", tmp_path / "run-2.pdf")
+    assert resume(job_queue.JobQueue()) == ["run-2"]
+    assert runs.get("run-2")["status"] == "queued"
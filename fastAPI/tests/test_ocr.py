@@ -0,0 +1,28 @@
+"""
+Tests for saving OCR batch uploads.
+"""
+
+import io
+import asyncio
+from pathlib import Path
+
+from fastapi import UploadFile
+
+from app.config import settings
+from app.routes import ocr
+
+def test_save_batch_uploads(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "SCRATCH_DIR", str(tmp_path))
+    files = [
+        UploadFile(file=io.BytesIO(b"first"), filename="page.png"),
+        UploadFile(file=io.BytesIO(b"second" * 100000), filename="page.png"),
+        UploadFile(file=io.BytesIO(b"third"), filename="../report.pdf")
+    ]
+
+    scratch_dir, saved = asyncio.run(ocr.save_batch_uploads(files))
+
+    assert Path(scratch_dir).parent == tmp_path
+    assert [filename for filename, _ in saved] == ["page.png", "page.png", "report.pdf"]
+    assert len({path for _, path in saved}) == 3
+    assert [Path(path).read_bytes() for _, path in saved] == [b"first", b"second" * 100000, b"third"]
+    assert all(Path(path).parent == Path(scratch_dir) for _, path in saved)
@@ -0,0 +1,68 @@
+"""
+Tests for reference range parsing and evaluation.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from app.services.reference_ranges import HIGH, LOW, NORMAL, UNKNOWN, evaluate, evaluate_bounds, parse_range, parse_value
+
+@pytest.mark.parametrize("text, bounds", [
+    ("12-16", (12.0, 16.0)),
+    ("<5", (-math.inf, 5.0)),
+    (">= 40", (40.0, math.inf)),
+    ("12.0 – 15.5", (12.0, 15.5)),
+    ("4,000 - 11,000 /uL", (4000.0, 11000.0)),
+    ("0.4 to 4.0 mIU/L", (0.4, 4.0)),
+    ("Less than 200 mg/dL", (-math.inf, 200.0)),
+    ("16-12", (12.0, 16.0)),
+    ("<-5", (-math.inf, -5.0)),
+])
+def test_parse_range(text, bounds):
+    assert parse_range(text) == bounds
+
+@pytest.mark.parametrize("text", ["", "Negative", "see comment", "N/A"])
+def test_unparseable_range_has_nan_bounds(text):
+    low, high = parse_range(text)
+    assert math.isnan(low) and math.isnan(high)
+
+@pytest.mark.parametrize("value, expected", [
+    (13.5, 13.5),
+    (7, 7.0),
+    ("7,200 /uL", 7200.0),
+    (" 4.5 mg", 4.5),
+    (True, math.nan),
+    ("Positive", math.nan),
+    (None, math.nan),
+])
+def test_parse_value(value, expected):
+    parsed = parse_value(value)
+    assert parsed == expected or (math.isnan(expected) and math.isnan(parsed))
+
+def test_evaluate_bounds():
+    result = evaluate_bounds(
+        np.array([10.0, 20.0, 14.0, 12.0, np.nan, 14.0, 3.0, 50.0]),
+        np.array([12.0, 12.0, 12.0, 12.0, 12.0, np.nan, -np.inf, 40.0]),
+        np.array([16.0, 16.0, 16.0, 16.0, 16.0, np.nan, 5.0, np.inf]),
+    )
+
+    assert result.codes.tolist() == [LOW, HIGH, NORMAL, NORMAL, UNKNOWN, UNKNOWN, NORMAL, NORMAL]
+    assert result.directions.tolist() == ["low", "high", "normal", "normal", "unknown", "unknown", "normal", "normal"]
+    assert result.abnormal.tolist() == [True, True, False, False, False, False, False, False]
+    assert result.deviation[:4].tolist() == [0.5, 1.0, 0.0, 0.0]
+    assert np.isnan(result.deviation[4:6]).all()
+    assert len(result) == 8
+
+def test_evaluate_bounds_open_ranges_scale_by_bound():
+    result = evaluate_bounds([10.0, 20.0], [-np.inf, 40.0], [5.0, np.inf])
+
+    assert result.codes.tolist() == [HIGH, LOW]
+    assert result.deviation.tolist() == [1.0, 0.5]
+
+def test_evaluate_range_strings():
+    result = evaluate([10, "17.2", "Positive", 150, 3], ["12-16", "12 - 16", "Negative", "< 200", None])
+
+    assert result.directions.tolist() == ["low", "high", "unknown", "normal", "unknown"]
+    assert evaluate([], []).codes.shape == (0,)
@@ -0,0 +1,118 @@
+"""
+Tests for the in-process report cache.
+"""
+
+import time
+import threading
+
+import pytest
+
+from app.config import settings
+from app.services import blob_store, report_cache as report_cache_module
+from app.services.blob_store import get_blob_store
+from app.services.report_cache import ReportCache
+from app.utils.json_io import dump_document
+
+def analysis(name):
+    return {"metadata": {"run_id": "run-1"}, "patient_info": {"name": name}}
+
+@pytest.fixture
+def processed(monkeypatch):
+    monkeypatch.setattr(settings, "BLOB_BACKEND", "memory")
+    monkeypatch.setattr(blob_store, "_stores", {})
+    return get_blob_store("processed")
+
+def test_overwritten_blob_is_reloaded(processed):
+    cache = ReportCache()
+    processed.put("run-1_analysis.json", dump_document(analysis("Jane")))
+
+    first = cache.get("run-1")
+    assert first["patient_info"]["name"] == "Jane"
+    assert cache.get("run-1") is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    processed.put("run-1_analysis.json", dump_document(analysis("Janet")))
+    assert cache.get("run-1")["patient_info"]["name"] == "Janet"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    processed.delete("run-1_analysis.json")
+    assert cache.get("run-1") is None
+    assert cache.source("run-1") is None
+
+def test_concurrent_gets_load_once(processed, monkeypatch):
+    cache = ReportCache()
+    processed.put("run-1_analysis.json", dump_document(analysis("Jane")))
+    find_report = report_cache_module.find_report
+    waiters = 7
+    calls = []
+
+    def slow_find_report(run_id):
+        calls.append(run_id)
+        # Hold the load until every other lookup waits on it
+        deadline = time.monotonic() + 5
+        while cache.coalesced < waiters and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return find_report(run_id)
+    monkeypatch.setattr(report_cache_module, "find_report", slow_find_report)
+
+    results = [None] * (waiters + 1)
+
+    def lookup(index):
+        results[index] = cache.get("run-1")
+    threads = [threading.Thread(target=lookup, args=(index,)) for index in range(waiters + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert calls == ["run-1"]
+    assert (cache.misses, cache.coalesced) == (1, waiters)
+    assert all(result is results[0] for result in results)
+    assert results[0]["patient_info"]["name"] == "Jane"
+
+def test_failed_load_is_not_cached(processed):
+    cache = ReportCache()
+    processed.put("run-1_analysis.json", b"{not json")
+
+    with pytest.raises(ValueError):
+        cache.get("run-1")
+    with pytest.raises(ValueError):
+        cache.get("run-1")
+    assert cache.source("run-1") is None
+    assert cache._loading == {}
+
+    processed.put("run-1_analysis.json", dump_document(analysis("Jane")))
+    assert cache.get("run-1")["patient_info"]["name"] == "Jane"
+    assert cache.misses == 3
+
+def test_failed_load_reaches_waiting_lookups(processed, monkeypatch):
+    cache = ReportCache()
+    processed.put("run-1_analysis.json", dump_document(analysis("Jane")))
+    find_report = report_cache_module.find_report
+    failures = []
+
+    def failing_find_report(run_id):
+        if not failures:
+            failures.append(run_id)
+            deadline = time.monotonic() + 5
+            while cache.coalesced < 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            raise OSError("store unavailable")
+        return find_report(run_id)
+    monkeypatch.setattr(report_cache_module, "find_report", failing_find_report)
+
+    errors = []
+
+    def lookup():
+        try:
+            cache.get("run-1")
+        except OSError as e:
+            errors.append(e)
+    threads = [threading.Thread(target=lookup) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(errors) == 2
+    assert cache.get("run-1")["patient_info"]["name"] == "Jane"
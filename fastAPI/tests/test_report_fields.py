@@ -0,0 +1,106 @@
+"""
+Tests for sparse fieldsets and section reads of stored reports.
+"""
+
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.routes import health_analysis
+from app.services import analysis_pipeline, blob_store
+from app.services.blob_store import MemoryBlobStore
+from app.services.lab_series import LabSeriesStore
+from app.services.report_cache import ReportCache
+from app.services.report_catalog import ReportCatalog
+from app.services.report_fields import SECTION_MARKER, load_sections, parse_fields, project, section_spans
+from app.utils.json_io import dump_document
+
+DOCUMENT = {
+    "metadata": {"run_id": "run-1", "provider": "claude", "tags": ["a", "b"]},
+    "file_info": {"file_id": "run-1", "filename": "report.pdf"},
+    "patient_info": {"name": "Jane \"JD\" Doe", "age": 42},
+    "notes": "first line\n  \"quoted\": value\n}",
+    "trick\n  \"key": {"nested": {"deeper": "\n  \"x\": 1"}},
+    "lab_results": [{"parameter": "Hemoglobin", "value": 13.5, "flags": []}],
+    "empty": {},
+    "count": 3,
+}
+
+@pytest.mark.parametrize("encode", [
+    lambda doc: dump_document(doc, pretty=False).decode("utf-8"),
+    lambda doc: dump_document(doc, pretty=True).decode("utf-8"),
+    lambda doc: json.dumps(doc, indent=2),
+], ids=["compact", "pretty", "indent-2"])
+def test_section_marker_only_starts_top_level_keys(encode):
+    text = encode(DOCUMENT)
+
+    spans = section_spans(text)
+    assert spans is not None
+    assert list(spans) == list(DOCUMENT)
+    assert text.count(SECTION_MARKER) == len(DOCUMENT)
+    assert load_sections(text, DOCUMENT) == DOCUMENT
+    assert load_sections(text, ["notes", "missing"]) == {"notes": DOCUMENT["notes"]}
+
+@pytest.mark.parametrize("text", [
+    json.dumps(DOCUMENT),
+    json.dumps(DOCUMENT, indent=4),
+    "[1, 2]",
+    '{\n  "a": 1\n',
+])
+def test_other_layouts_are_not_split(text):
+    assert section_spans(text) is None
+    assert load_sections(text, ["metadata"]) is None
+
+def test_parse_fields():
+    assert parse_fields(" patient_info, metadata.run_id,,patient_info ") == ["patient_info", "metadata.run_id"]
+    with pytest.raises(ValueError):
+        parse_fields("metadata..run_id")
+
+def test_project_whole_section_absorbs_sub_paths():
+    data = {"a": {"b": 1, "c": 2}, "d": {"e": 3}}
+
+    assert project(data, ["a.b", "a"]) == {"a": {"b": 1, "c": 2}}
+    assert project(data, ["a", "a.b"]) == {"a": {"b": 1, "c": 2}}
+    assert project(data, ["a.b", "d.e", "a.x", "missing"]) == {"a": {"b": 1}, "d": {"e": 3}}
+    assert project(data, ["a.b.c"]) == {}
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "BLOB_BACKEND", "memory")
+    monkeypatch.setattr(blob_store, "_stores", {})
+    catalog = ReportCatalog(str(tmp_path))
+    monkeypatch.setattr(analysis_pipeline, "report_catalog", catalog)
+    monkeypatch.setattr(health_analysis, "report_catalog", catalog)
+    monkeypatch.setattr(analysis_pipeline, "lab_series", LabSeriesStore(MemoryBlobStore("trends")))
+    monkeypatch.setattr(health_analysis, "report_cache", ReportCache())
+    app = FastAPI()
+    app.include_router(health_analysis.router)
+    return TestClient(app)
+
+@pytest.mark.parametrize("suffix", [".json", ".rpk"])
+@pytest.mark.parametrize("fields", [
+    "patient_info",
+    "patient_info.name,lab_results",
+    "metadata.run_id,metadata",
+    "notes,missing.field",
+])
+def test_fields_match_projection_of_full_report(client, suffix, fields):
+    key = f"run-1_analysis{suffix}"
+    digest = analysis_pipeline.write_analysis(key, DOCUMENT)
+    analysis_pipeline.record_analysis(key, DOCUMENT, digest)
+    cache = health_analysis.report_cache
+
+    partial = client.get("/reports/run-1", params={"fields": fields})
+    assert partial.status_code == 200
+    assert cache.partial == 1 and cache.misses == 0
+
+    full = client.get("/reports/run-1")
+    assert full.status_code == 200
+    assert partial.json() == project(full.json(), parse_fields(fields))
+
+    cached = client.get("/reports/run-1", params={"fields": fields})
+    assert cached.json() == partial.json()
+    assert cache.partial == 1 and cache.hits >= 1
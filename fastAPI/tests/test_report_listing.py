@@ -0,0 +1,78 @@
+"""
+Tests for the report listing served from the report catalog.
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.routes import health_analysis
+from app.services import analysis_pipeline, blob_store
+from app.services.blob_store import MemoryBlobStore
+from app.services.lab_series import LabSeriesStore
+from app.services.report_catalog import ReportCatalog
+from app.utils.json_io import dumps
+
+def analysis(run_id, name):
+    return {
+        "metadata": {"run_id": run_id, "provider": "claude", "model_used": "m",
+                     "processing_timestamp": "2024-05-01T10:00:00", "tokens_in": 5, "tokens_out": 7},
+        "file_info": {"file_id": run_id, "filename": f"{run_id}.pdf"},
+        "patient_info": {"name": name},
+        "report_info": {"report_id": f"LAB-{run_id}"}
+    }
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "BLOB_BACKEND", "memory")
+    monkeypatch.setattr(blob_store, "_stores", {})
+    catalog = ReportCatalog(str(tmp_path))
+    monkeypatch.setattr(analysis_pipeline, "report_catalog", catalog)
+    monkeypatch.setattr(health_analysis, "report_catalog", catalog)
+    monkeypatch.setattr(analysis_pipeline, "lab_series", LabSeriesStore(MemoryBlobStore("trends")))
+    app = FastAPI()
+    app.include_router(health_analysis.router)
+    return TestClient(app)
+
+def store_analysis(document):
+    key = f"{document['metadata']['run_id']}_analysis.json"
+    digest = analysis_pipeline.write_analysis(key, document)
+    analysis_pipeline.record_analyses([(key, document, digest)])
+    return key
+
+def listing(client):
+    response = client.get("/reports")
+    assert response.status_code == 200
+    return {report["run_id"]: report for report in response.json()["reports"]}
+
+def test_listing_served_from_catalog(client, monkeypatch):
+    store_analysis(analysis("run-1", "Jane Doe"))
+
+    def unexpected_read(*args):
+        raise AssertionError("analysis read despite a current catalog row")
+    monkeypatch.setattr(health_analysis, "read_summary", unexpected_read)
+
+    report = listing(client)["run-1"]
+    assert "error" not in report
+    assert report["patient_name"] == "Jane Doe"
+    assert report["report_date"] == "2024-05-01"
+    assert report["tokens"] == {"in": 5, "out": 7}
+    assert report["medical_report_id"] == "LAB-run-1"
+    assert report["filename"] == "run-1_analysis.json"
+
+def test_changed_or_uncataloged_files_are_read(client):
+    key = store_analysis(analysis("run-1", "Jane Doe"))
+    # Rewritten without a new catalog row
+    blob_store.get_blob_store("processed").put(key, dumps(analysis("run-1", "John Roe")))
+    # Never cataloged
+    blob_store.get_blob_store("processed").put("run-2_analysis.json", dumps(analysis("run-2", "Ann Poe")))
+
+    reports = listing(client)
+    assert reports["run-1"]["patient_name"] == "John Roe"
+    assert reports["run-2"]["patient_name"] == "Ann Poe"
+
+def test_listing_without_catalog(client, tmp_path):
+    store_analysis(analysis("run-1", "Jane Doe"))
+    (tmp_path / "catalog.jsonl").unlink()
+    assert listing(client)["run-1"]["patient_name"] == "Jane Doe"
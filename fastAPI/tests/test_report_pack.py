@@ -0,0 +1,133 @@
+"""
+Tests for report packs and the analysis storage migration.
+"""
+
+import json
+from functools import partial
+
+import pytest
+
+import migrate_analyses
+from app.config import settings
+from app.services import analysis_pipeline, blob_store, report_pack
+from app.services.blob_store import MemoryBlobStore, get_blob_store
+from app.services.lab_series import LabSeriesStore
+from app.services.report_catalog import ReportCatalog
+from app.services.report_pack import (
+    MAGIC, PREAMBLE_SIZE, decode_document, decode_pack, encode_pack, read_header, read_pack_sections, read_summary
+)
+from app.utils.json_io import dump_document
+
+CODECS = [
+    "zlib",
+    pytest.param("zstd", marks=pytest.mark.skipif(report_pack.zstandard is None, reason="zstandard not installed"))
+]
+
+def analysis(run_id="run-1"):
+    return {
+        "metadata": {"run_id": run_id, "provider": "claude", "model_used": "m", "tokens_in": 5},
+        "patient_info": {"name": "Jane Doe", "age": 42},
+        "test_info": {"date": "2024-05-01"},
+        "lab_results": [{"parameter": "Hemoglobin", "value": 13.5, "unit": "g/dL", "reference_range": "12-16"}],
+        "notes": "Line one\nline two"
+    }
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_pack_round_trip(codec):
+    document = analysis()
+    data = encode_pack(document, codec)
+
+    assert data.startswith(MAGIC)
+    assert decode_pack(data) == document
+    assert list(decode_pack(data)) == list(document)
+    assert decode_document(data) == document
+
+    header = read_header(partial(lambda data, start, end: data[start:end], data))
+    assert header["codec"] == codec
+    assert set(header["sections"]) == set(document)
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_range_reads_over_blob_store(codec):
+    store = MemoryBlobStore("processed")
+    document = analysis()
+    store.put("run-1_analysis.rpk", encode_pack(document, codec))
+    reads = []
+
+    def read_range(start, end):
+        reads.append((start, end))
+        return store.read_range("run-1_analysis.rpk", start, end)
+
+    summary = read_summary(read_range)
+    assert summary == {
+        "patient_info": {"name": "Jane Doe"},
+        "test_info": {"date": "2024-05-01"},
+        "metadata": {"run_id": "run-1", "provider": "claude", "model_used": "m", "tokens_in": 5}
+    }
+    assert all(end is not None for _, end in reads)
+
+    summary_again, sections = read_pack_sections(read_range, ["lab_results", "notes", "missing"])
+    assert summary_again == summary
+    assert sections == {"lab_results": document["lab_results"], "notes": document["notes"]}
+
+def test_json_documents_are_not_packs():
+    document = analysis()
+    data = dump_document(document)
+    read_range = partial(lambda data, start, end: data[start:end], data)
+
+    assert decode_document(data) == document
+    assert decode_document(json.dumps(document, indent=2).encode()) == document
+    assert read_header(read_range) is None
+    assert read_pack_sections(read_range, ["notes"]) is None
+    assert read_summary(read_range) == document
+
+@pytest.mark.parametrize("codec", CODECS)
+@pytest.mark.parametrize("corrupt", [
+    lambda data: data[:PREAMBLE_SIZE - 2],
+    lambda data: data[:PREAMBLE_SIZE + 10],
+    lambda data: data[:-4],
+    lambda data: data[:PREAMBLE_SIZE] + b"[" + data[PREAMBLE_SIZE + 1:],
+    lambda data: data[:-8] + bytes(8),
+], ids=["preamble", "header", "section", "header-json", "section-bytes"])
+def test_corrupt_pack_raises_value_error(codec, corrupt):
+    data = corrupt(encode_pack(analysis(), codec))
+    with pytest.raises(ValueError):
+        decode_document(data)
+
+@pytest.fixture
+def processed(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "BLOB_BACKEND", "memory")
+    monkeypatch.setattr(blob_store, "_stores", {})
+    monkeypatch.setattr(analysis_pipeline, "report_catalog", ReportCatalog(str(tmp_path)))
+    monkeypatch.setattr(analysis_pipeline, "lab_series", LabSeriesStore(MemoryBlobStore("trends")))
+    return get_blob_store("processed")
+
+def analysis_keys(store):
+    return sorted(info.key for info in store.list() if "_analysis" in info.key)
+
+def test_migrate_to_packs_and_back(processed):
+    documents = {run_id: analysis(run_id) for run_id in ("run-1", "run-2")}
+    for run_id, document in documents.items():
+        processed.put(f"{run_id}_analysis.json", dump_document(document))
+    processed.put("run-3_analysis.json", b"{not json")
+
+    assert migrate_analyses.main(["--codec", "zlib"]) == 1
+    assert analysis_keys(processed) == ["run-1_analysis.rpk", "run-2_analysis.rpk", "run-3_analysis.json"]
+    for run_id, document in documents.items():
+        data = processed.get(f"{run_id}_analysis.rpk")
+        assert data.startswith(MAGIC)
+        assert decode_document(data) == document
+    rows = analysis_pipeline.report_catalog.rows()
+    assert {row["key"] for row in rows} >= {"run-1_analysis.rpk", "run-2_analysis.rpk"}
+
+    processed.delete("run-3_analysis.json")
+    assert migrate_analyses.main(["--to", "json", "--keep"]) == 0
+    assert analysis_keys(processed) == [
+        "run-1_analysis.json", "run-1_analysis.rpk", "run-2_analysis.json", "run-2_analysis.rpk"
+    ]
+    assert decode_document(processed.get("run-1_analysis.json")) == documents["run-1"]
+
+def test_migrate_dry_run_changes_nothing(processed):
+    processed.put("run-1_analysis.json", dump_document(analysis()))
+
+    assert migrate_analyses.main(["--dry-run"]) == 0
+    assert analysis_keys(processed) == ["run-1_analysis.json"]
@@ -0,0 +1,43 @@
+"""
+Tests for the staged pipeline.
+"""
+
+import asyncio
+
+from app.services.staged_pipeline import Stage, StagedPipeline
+
+async def passthrough(item):
+    return item
+
+async def fail_odd(item):
+    if item % 2:
+        raise ValueError(item)
+    return item
+
+def run(pipeline, items):
+    # A worker lost to a failing callback used to hang run() forever
+    return asyncio.run(asyncio.wait_for(pipeline.run(items), timeout=10))
+
+def test_results_and_failures():
+    completed, failed = [], []
+    pipeline = StagedPipeline(
+        [Stage("first", fail_odd, workers=2), Stage("second", passthrough)],
+        on_complete=completed.append,
+        on_error=lambda item, stage, e: failed.append((item, stage))
+    )
+    report = run(pipeline, range(10))
+    assert sorted(completed) == [0, 2, 4, 6, 8]
+    assert sorted(failed) == [(n, "first") for n in (1, 3, 5, 7, 9)]
+    assert (report.completed, report.failed) == (5, 5)
+
+def test_failing_callbacks_do_not_stop_the_pipeline():
+    def disk_full(*args):
+        raise OSError("No space left on device")
+
+    pipeline = StagedPipeline(
+        [Stage("first", fail_odd), Stage("second", passthrough)],
+        on_complete=disk_full,
+        on_error=disk_full
+    )
+    report = run(pipeline, range(10))
+    assert (report.completed, report.failed) == (5, 5)
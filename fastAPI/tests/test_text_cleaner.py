@@ -0,0 +1,59 @@
+"""
+Equivalence tests for the single-pass OCR text normalizer.
+
+``normalize_ocr_text`` and ``normalize_ocr_stream`` (fed the text in
+random chunks) must give exactly what the multi-pass
+``normalize_whitespace(clean_ocr_artifacts(text))`` gives, on the sample
+reports and on random OCR-like text.
+"""
+
+import random
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from app.utils.text_cleaner import normalize_ocr_text, normalize_ocr_stream
+from benchmarks.text_normalizer import reference, synthetic_page
+
+SAMPLES = sorted(Path(__file__).resolve().parents[2].glob("sample_report*.txt"))
+
+# Characters the artifact and whitespace rules react to, plus some text
+FUZZ_ALPHABET = [
+    'a', 'b', '1', ':', '.', ',', '_', ' ', ' ', '\t', '\n', '\n', '\n',
+    '#', '|', '@', '-', '–', '—', '\xa0', '\r', '\f'
+]
+
+def random_split(text: str, rng: random.Random, max_parts: int = 8) -> List[str]:
+    """Split text at random points"""
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, max_parts))))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+def assert_equivalent(text: str, rng: random.Random) -> None:
+    expected = reference(text)
+    assert normalize_ocr_text(text) == expected
+    for _ in range(5):
+        chunks = random_split(text, rng)
+        assert "".join(normalize_ocr_stream(chunks)) == expected, chunks
+
+def test_samples_found():
+    assert SAMPLES, "sample_report*.txt not found in the repository root"
+
+@pytest.mark.parametrize("path", SAMPLES, ids=lambda path: path.name)
+def test_sample_report(path):
+    rng = random.Random(path.name)
+    text = path.read_text(encoding="utf-8")
+    assert_equivalent(text, rng)
+    # As it would arrive from OCR, after a page of noisy text
+    assert_equivalent(synthetic_page(rng) + text, rng)
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_text(seed):
+    rng = random.Random(seed)
+    for _ in range(1000):
+        text = "".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 120)))
+        assert_equivalent(text, rng)
+
+@pytest.mark.parametrize("text", ["", "\n", "   ", "\f", "a\r\nb", "|\n|\n", "—\xa0—"])
+def test_edge_cases(text):
+    assert_equivalent(text, random.Random(0))
@@ -0,0 +1,63 @@
+"""
+Tests for the full-text search index.
+"""
+
+import pytest
+
+from app.config import settings
+from app.services.text_index import TextIndex, build_query
+
+@pytest.fixture
+def index(tmp_path):
+    index = TextIndex(str(tmp_path / "text_search.db"))
+    # d0 mentions ferritin far more than the rest and was indexed first
+    index.index_many([
+        {"document_id": f"d{n}", "text": "ferritin " * (20 if n == 0 else 1) + "filler words " * 10}
+        for n in range(12)
+    ])
+    index.index("other", "hemoglobin only")
+    return index
+
+def page_through(index, query, page_size=3):
+    found, offset = [], 0
+    while True:
+        page = index.search(query, page_size, offset)
+        found += [hit["document_id"] for hit in page["results"]]
+        if not page["has_more"]:
+            return found, page["truncated"]
+        offset += page_size
+
+def test_ranks_every_match(index, monkeypatch):
+    monkeypatch.setattr(settings, "TEXT_SEARCH_MAX_CANDIDATES", 0)
+    found, truncated = page_through(index, "ferritin")
+    assert found[0] == "d0"
+    assert sorted(found) == sorted(f"d{n}" for n in range(12))
+    assert not truncated
+
+def test_capped_search_says_truncated(index, monkeypatch):
+    monkeypatch.setattr(settings, "TEXT_SEARCH_MAX_CANDIDATES", 5)
+    found, truncated = page_through(index, "ferritin")
+    assert len(found) == 5
+    assert truncated
+
+def test_snippets_are_escaped_and_marked(index):
+    index.index("html", "<b>Ferritin</b> 120 ng/mL")
+    hit = index.search("ferritin", 20)["results"]
+    snippet = next(result["snippet"] for result in hit if result["document_id"] == "html")
+    assert "&lt;b&gt;<mark>Ferritin</mark>&lt;/b&gt;" in snippet
+
+def test_reindex_and_remove(index):
+    index.index("other", "ferritin now")
+    assert "other" in [hit["document_id"] for hit in index.search("ferritin", 20)["results"]]
+    assert index.remove("other")
+    assert not index.remove("other")
+    assert index.search("hemoglobin", 20)["results"] == []
+
+def test_prefix_and_phrase(index):
+    assert index.search("ferr*", 1)["results"]
+    assert index.search('"filler words"', 1)["results"]
+
+def test_build_query_quotes_user_input(index):
+    assert build_query('AND OR "a b" c* NEAR(') == '"AND" "OR" "a b" "c"* "NEAR"'
+    with pytest.raises(ValueError):
+        index.search("!!!")